@@ -1,13 +1,9 @@
 import streamlit as st
-import os
-import numpy as np
-import asyncio
+from urllib.parse import urlsplit
 from uuid import uuid4
+from src.config import settings
 from src.utils.logger_config import setup_logger
-from src.ingestion.document_parser import TextProcessor
-from src.external_services.embedding_client import EmbeddingClient
-from src.external_services.llm_client import LLMClient
-from src.external_services.asr_client import ASRClient
+from src.interaction.api_client import RAGServiceClient, ServiceError
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -19,40 +15,24 @@ st.set_page_config(
 # --- Logger ---
 logger = setup_logger("CRAS_App")
 
-# --- Caching and Model Loading ---
-# Use Streamlit's cache to load heavy models only once
+# --- Service Connection ---
+# Models, indexes and caches live in the RAG service; this script only renders the UI.
+# Use Streamlit's cache to connect (or start the service) only once
 @st.cache_resource
-def get_llm_client():
-    logger.info("Loading LLM Client...")
-    return LLMClient()
-
-@st.cache_resource
-def get_asr_client():
-    logger.info("Loading ASR Client...")
-    return ASRClient()
-
-@st.cache_resource
-def get_embedding_client():
-    logger.info("Loading Embedding Client...")
-
-    class EmbeddingClient:
-        def embed_texts(self, texts):
-            logger.warning("Using placeholder embedding client. All embeddings will be random.")
-            return [np.random.rand(384) for _ in texts] # Assuming a 384-dim model
-        def embed_query(self, text):
-            return np.random.rand(384)
-    return EmbeddingClient()
-
-@st.cache_resource
-def get_text_processor():
-    logger.info("Loading Text Processor Client...")
-    return TextProcessor()
-
-# --- Load Models ---
-llm_client = get_llm_client()
-asr_client = get_asr_client()
-embedding_client = get_embedding_client()
-text_processor = get_text_processor()
+def get_service_client():
+    client = RAGServiceClient(settings.SERVICE_URL)
+    if not client.is_available():
+        if not settings.SERVICE_AUTOSTART:
+            raise RuntimeError(f"No RAG service answers at {settings.SERVICE_URL}. Start it with: python -m src.interaction.api_server")
+        # Host the service in this process, shared by every session; imported here so a
+        # remote service never loads model code into the UI
+        from src.interaction.api_server import serve_in_background
+        logger.info(f"Starting the RAG service at {settings.SERVICE_URL}...")
+        url = urlsplit(settings.SERVICE_URL)
+        serve_in_background(host=url.hostname, port=url.port)
+    return client
+
+service = get_service_client()
 
 
 # --- Session State Management ---
@@ -63,92 +43,56 @@ if "session_id" not in st.session_state:
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
-if "vector_store" not in st.session_state:
-    # This is our simplified, in-memory vector store for this session
-    st.session_state.vector_store = {
-        "chunks": [],
-        "embeddings": []
-    }
-
-if "processed_files" not in st.session_state:
-    st.session_state.processed_files = set()
+session_id = st.session_state.session_id
 
-def run_async(awaitable):
+# --- Helper Functions ---
+def stream_response(question, placeholder):
     """
-    Runs an awaitable coroutine and blocks until it is complete.
-    This is a replacement for asyncio.run() in Streamlit.
+    Streams the answer from the service into a placeholder, re-rendering as each delta arrives.
+    Returns the text, its sources, and the final event (None if the answer did not complete).
     """
+    response_text = ""
+    sources = []
+    final = None
+    # Retrieval happens before the first delta arrives
+    placeholder.markdown("_Searching your documents..._")
     try:
-        # Try to get the running event loop
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        # If no loop is running, create a new one
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-    
-    return loop.run_until_complete(awaitable)
-
-# --- Helper Functions ---
-def find_relevant_chunks(query_embedding, top_k=3):
-    """Finds the most relevant text chunks from the vector store."""
-    if not st.session_state.vector_store["embeddings"]:
-        return []
-
-    embeddings = np.array(st.session_state.vector_store["embeddings"])
-    # Cosine similarity calculation
-    similarities = np.dot(embeddings, query_embedding) / (np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_embedding))
-    
-    # Get the indices of the top_k most similar chunks
-    top_k_indices = np.argsort(similarities)[-top_k:][::-1]
-    
-    relevant_chunks = [st.session_state.vector_store["chunks"][i] for i in top_k_indices]
-    return relevant_chunks
-
-async def process_files(uploaded_files):
-    """Processes uploaded files: parse, chunk, embed, and store."""
-    for uploaded_file in uploaded_files:
-        # Avoid re-processing the same file
-        if uploaded_file.name in st.session_state.processed_files:
-            continue
-
-        with st.spinner(f"Processing {uploaded_file.name}..."):
-            # Save the file temporarily to get a file path
-            temp_dir = "./data/temp_files"
-            os.makedirs(temp_dir, exist_ok=True)
-            file_path = os.path.join(temp_dir, uploaded_file.name)
-            
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-
-            # 1. Parse / Transcribe
-            file_extension = os.path.splitext(uploaded_file.name)[1].lower()
-            if file_extension in [".mp3", ".wav", ".m4a"]:
-                text = await asr_client.transcribe(file_path, language = "en")
-                text = text_processor.clean_text(text)
-            elif file_extension == ".pdf":
-                text = text_processor.extract_text_from_pdf(file_path)
-            else:
-                text = text_processor.read_text_file(file_path)
-
-            if not text:
-                st.sidebar.error(f"Failed to extract text from {uploaded_file.name}")
-                continue
-
-            # 2. Chunk
-            chunks = text_processor.chunk_text(text=text)
-
-            # 3. Embed and Store
-            if chunks:
-                chunk_embeddings = embedding_client.embed_texts(chunks)
-                st.session_state.vector_store["chunks"].extend(chunks)
-                st.session_state.vector_store["embeddings"].extend(chunk_embeddings)
-            
-            # Mark as processed
-            st.session_state.processed_files.add(uploaded_file.name)
-            st.sidebar.success(f"Processed {uploaded_file.name} ({len(chunks)} chunks)")
-            
-            # Clean up temp file
-            os.remove(file_path)
+        for event in service.chat(question, session_id=session_id):
+            if event["type"] == "sources":
+                sources = event["sources"]
+            elif event["type"] == "delta":
+                response_text += event["text"]
+                placeholder.markdown(response_text + "▌")
+            elif event["type"] == "error":
+                response_text += f"\n\n{event['message']}"
+            elif event["type"] == "done":
+                final = event
+    except ServiceError as e:
+        if e.busy:
+            logger.warning("RAG service is busy; request rejected.")
+            response_text += "\n\nThe assistant is busy with other requests. Please try again in a moment."
+        else:
+            response_text += f"\n\nError: {e}"
+    except OSError as e:
+        logger.error(f"Lost the connection to the RAG service: {e}", exc_info=True)
+        response_text += f"\n\nError: Could not reach the assistant service. Error: {type(e).__name__}"
+    placeholder.markdown(response_text)
+    return response_text, sources, final
+
+def process_files(uploaded_files):
+    """Sends uploaded files to the service to be parsed, chunked, embedded, and stored."""
+    files = [(uploaded_file.name, uploaded_file.getvalue()) for uploaded_file in uploaded_files]
+    try:
+        for event in service.ingest(files, session_id=session_id):
+            if event["type"] == "skipped":
+                if event["duplicate_of"] != event["name"]:
+                    st.sidebar.info(f"{event['name']} has the same content as {event['duplicate_of']}; skipping.")
+            elif event["type"] == "processed":
+                st.sidebar.success(f"Processed {event['name']} ({event['chunk_count']} chunks)")
+            elif event["type"] in ("failed", "error"):
+                st.sidebar.error(event.get("error") or event.get("message"))
+    except ServiceError as e:
+        st.sidebar.error("The assistant is busy processing other files. Please try again in a moment." if e.busy else str(e))
 
 
 # --- UI Layout ---
@@ -162,18 +106,29 @@ with st.sidebar:
         type=["pdf", "txt", "mp3", "wav", "m4a"],
         accept_multiple_files=True
     )
-    
+
     if uploaded_files:
         if st.button("Process Files"):
-            # Run the async function using asyncio
-            run_async(process_files(uploaded_files))
+            with st.spinner(f"Processing {len(uploaded_files)} file(s)..."):
+                process_files(uploaded_files)
 
     st.header("Processed Files")
-    if st.session_state.processed_files:
-        for f_name in st.session_state.processed_files:
+    processed_files = service.sources(session_id)
+    if processed_files:
+        for f_name in processed_files:
             st.markdown(f"- `{f_name}`")
     else:
-        st.info("No files processed yet for this session.")
+        st.info("No files processed yet.")
+
+    # The TTS model is only loaded once speech is requested
+    speak_answers = st.toggle("Read answers aloud", value=False)
+
+    with st.expander("Model status"):
+        status = service.status()
+        for model in status["models"]:
+            icon = "✅" if model["state"] == "ready" else ("❌" if model["error"] else "⏳")
+            st.markdown(f"{icon} **{model['name']}**: {model['state']}" + (f" ({model['error']})" if model["error"] else ""))
+        st.code(status["profile"])
 
 
 # --- Chat Interface ---
@@ -191,25 +146,26 @@ if prompt := st.chat_input("Ask a question about your documents..."):
 
     # Prepare and display the assistant's response
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            # Embed the user's query
-            query_embedding = embedding_client.embed_query(prompt)
-
-            # Find relevant context from the vector store
-            context_chunks = find_relevant_chunks(query_embedding)
-            
-            if not context_chunks:
-                response_text = "I couldn't find any relevant information in the uploaded documents to answer your question. Please try processing a file first."
-                st.markdown(response_text)
-            else:
-                # Build the prompt for the LLM
-                context_str = "\n\n---\n\n".join(context_chunks)
-                system_prompt = "You are a helpful research assistant. Answer the user's question based *only* on the following context provided. If the answer is not in the context, say so."
-                full_prompt = f"CONTEXT:\n{context_str}\n\nQUESTION:\n{prompt}"
-                
-                # Generate the response
-                response_text = run_async(llm_client.generate_text(full_prompt, system_prompt=system_prompt))
-                st.markdown(response_text)
-            
+        response_text, sources, final = stream_response(prompt, st.empty())
+
+        if sources:
+            st.caption("Sources: " + "; ".join(sources))
+        if final and final.get("cached"):
+            cached = final["cached"]
+            st.caption(f"Answered from cache (similar question: \"{cached['question']}\", similarity {cached['similarity']:.2f})")
+        elif final and final.get("stats") and final["stats"]["time_to_first_token"] is not None:
+            stats = final["stats"]
+            st.caption(
+                f"First token in {stats['time_to_first_token']:.2f}s · {stats['tokens_per_second']:.1f} tokens/s · "
+                f"{stats['cached_prompt_tokens']}/{stats['prompt_tokens']} prompt tokens reused from cache"
+            )
+
+        if speak_answers and response_text:
+            try:
+                with st.spinner("Reading the answer aloud..."):
+                    st.audio(service.speak(response_text), format="audio/wav")
+            except ServiceError as e:
+                st.caption(f"Error: {e}")
+
     # Add assistant's response to session state
-    st.session_state.messages.append({"role": "assistant", "content": response_text})
\ No newline at end of file
+    st.session_state.messages.append({"role": "assistant", "content": response_text})
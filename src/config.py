@@ -1,27 +1,125 @@
 import os
-from typing import Optional
+from typing import List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file='.env', env_file_encoding='utf-f8', extra='ignore')
 
+    # Model Backends (see external_services/backends.py); "auto" uses MLX/MeloTTS on Apple Silicon, CPU engines elsewhere
+    ASR_BACKEND: str = "auto" # "mlx" (Lightning Whisper MLX), "faster-whisper" (CTranslate2, CPU) or "fake"
+    LLM_BACKEND: str = "auto" # "mlx" (MLX LM), "llama-cpp" (GGUF, CPU) or "fake"
+    TTS_BACKEND: str = "auto" # "melo" (MeloTTS), "piper" (ONNX, CPU) or "fake"
+    EMBEDDING_BACKEND: str = "auto" # "sentence-transformers", "onnx" (ONNX Runtime, CPU) or "fake"
+
     # ASR Configuration (Lightning Whisper MLX)
     ASR_MODEL_NAME: str = "large-v3"  # Model size: "tiny", "base", "small", "medium", "large-v2", "large-v3"
     ASR_QUANTIZATION: Optional[str] = None # Quantization: "4bit", "8bit", or None
     ASR_BATCH_SIZE: int = 15 # Adjust based on your VRAM
+    ASR_SEGMENTED: bool = True # Split audio on silence and stream segment transcripts to the chunker
+    ASR_SEGMENT_SECONDS: float = 30.0 # Longest segment; Whisper decodes 30-second windows
+    ASR_MIN_SILENCE_SECONDS: float = 0.5 # Shortest pause a segment may be cut at
+    ASR_SILENCE_DB: float = -40.0 # Frames quieter than this (dBFS) count as silence
+    ASR_SEGMENT_WORKERS: int = 2 # Segments of one file transcribed at once
+    ASR_CHECKPOINT_DIR: str = "./data/asr_checkpoints" # Completed segments of unfinished transcriptions; "" disables
+    ASR_COMPUTE_TYPE: str = "int8" # faster-whisper weights: "int8", "int8_float32" or "float32"
+    ASR_CPU_THREADS: int = 0 # Threads per faster-whisper worker; 0 uses CTranslate2's default
 
     # LLM Configuration (MLX LM)
     # For MLX LM, this is typically a Hugging Face model identifier or local path
     # LLM_MODEL_PATH:str = "mlx-community/Phi-3.5-mini-instruct-4bit"
     LLM_MODEL_PATH: str = "mlx-community/Meta-Llama-3.1-8B-Instruct-8bit"
+    LLM_PROMPT_CACHE_MAX_BYTES: int = 2 * 1024**3 # Memory cap for reusable prompt-prefix KV caches; 0 disables
+    LLM_MAX_BATCH_SIZE: int = 8 # Sequences decoded together by the LLM request scheduler
+    LLM_MAX_QUEUED_REQUESTS: int = 64 # Requests allowed to wait for a batch slot before new ones are rejected
+    LLM_GGUF_MODEL_PATH: str = "bartowski/Meta-Llama-3.1-8B-Instruct-GGUF" # llama.cpp: local .gguf file or Hugging Face repo
+    LLM_GGUF_FILE: str = "*Q4_K_M.gguf" # File (glob) to download when LLM_GGUF_MODEL_PATH is a repo
+    LLM_CONTEXT_LENGTH: int = 8192 # llama.cpp context window, in tokens
+    LLM_CPU_THREADS: int = 0 # llama.cpp threads; 0 uses its default
 
     # TTS Configuration (MeloTTS)
     TTS_MELOTTS_VOICE: str = "EN" # Example voice, MeloTTS supports various
     TTS_MELOTTS_SPEAKER_ID: Optional[str] = "EN-US" # e.g., "EN-Default" for some MeloTTS versions
     TTS_MELOTTS_DEVICE: str = "mps" # For Apple Silicon, can also be "cpu"
+    TTS_PIPER_MODEL_PATH: str = "./data/voices/en_US-lessac-medium.onnx" # Piper voice (.onnx with its .onnx.json)
 
     # Embedding Model
     EMBEDDING_MODEL_NAME: str = "all-MiniLM-L6-v2"
+    EMBEDDING_MAX_SEQ_LENGTH: int = 256 # Word pieces the embedding model reads per input (all-MiniLM-L6-v2: 256)
+    EMBEDDING_BATCH_SIZE: int = 64 # Texts per forward pass; inputs are sorted by length so batches need little padding
+    EMBEDDING_PRECISION: str = "float32" # Output of EmbeddingClient.embed_texts: "float32", "float16" or "int8"
+    EMBEDDING_WORKERS: int = 1 # 1 embeds in-process; N > 1 starts N CPU worker processes, one model each; 0 uses every core
+    EMBEDDING_WORKER_THREADS: int = 0 # Torch threads per embedding worker; 0 splits the cores evenly between workers
+    QUERY_EMBEDDING_CACHE_SIZE: int = 4096 # Query embeddings kept in memory (LRU); 0 disables the memory tier
+    QUERY_EMBEDDING_CACHE_DIR: str = "" # Optional on-disk tier shared across restarts, e.g. "./data/cache/queries"
+    EMBEDDING_ONNX_FILE: str = "" # onnx backend: model file to load, e.g. "onnx/model_qint8_avx512.onnx"; "" exports on load
+
+    # Chunking
+    CHUNK_LENGTH_UNIT: str = "chars" # "chars" (1000/200 characters) or "tokens" (sized to EMBEDDING_MAX_SEQ_LENGTH)
+    CHUNK_TOKEN_OVERLAP: int = 32 # Overlap between token-sized chunks, in tokens
+
+    # Vector Index
+    VECTOR_INDEX_BACKEND: str = "exact" # "exact" (brute-force cosine) or "ivf" (approximate)
+    IVF_NLIST: int = 256 # Number of inverted lists (k-means centroids)
+    IVF_NPROBE: int = 8 # Lists scanned per query; higher means better recall, slower search
+    VECTOR_INDEX_PRECISION: str = "float32" # In-memory vector storage: "float32", "float16" (1/2 memory) or "int8" (1/4)
+
+    # Hybrid Retrieval
+    HYBRID_SEARCH: bool = True # Fuse BM25 keyword search with vector search (finds exact identifiers and names)
+    HYBRID_RRF_K: int = 60 # Reciprocal rank fusion constant; larger values flatten the rank weighting
+    HYBRID_CANDIDATES: int = 20 # Candidates taken from each retriever before fusion
+    RETRIEVAL_MMR_CANDIDATES: int = 10 # Results re-ranked for diversity (MMR) before keeping top_k; 0 disables
+    RETRIEVAL_MMR_LAMBDA: float = 0.7 # 1.0 ranks by relevance only; lower values favor chunks unlike those already picked
+
+    # Knowledge Base Persistence
+    PERSIST_KNOWLEDGE_BASE: bool = True # Keep chunks and embeddings on disk across restarts
+    KNOWLEDGE_BASE_DIR: str = "./data/knowledge_base"
+
+    # Answer Cache (repeated and near-duplicate questions)
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95 # Minimum cosine similarity between questions to reuse an answer
+    ANSWER_CACHE_MAX_ENTRIES: int = 1024 # Least recently used answers are evicted beyond this; 0 disables the cache
+    ANSWER_CACHE_TTL_SECONDS: float = 24 * 3600 # Age after which a cached answer is regenerated; 0 never expires
+
+    # Ingestion Cache (content-addressed outputs of parsing, ASR, chunking and embedding)
+    INGESTION_CACHE_DIR: str = "./data/cache"
+
+    # Text Cleaning
+    TEXT_CLEAN_SPACY_PROCESSES: int = 1 # Processes spaCy lemmatization fans out to (keep 1 inside pipeline workers)
+    TEXT_CLEAN_SPACY_BATCH_WORDS: int = 5000 # Words per document handed to nlp.pipe
+
+    # Ingestion Pipeline
+    INGEST_CPU_WORKERS: int = 0 # Processes for PDF extraction and text cleaning; 0 uses every core
+    INGEST_ASR_WORKERS: int = 1 # Concurrent transcriptions; segmented ones get ASR_SEGMENT_WORKERS threads each
+    INGEST_EMBED_BATCH_SIZE: int = 256 # Chunks coalesced across files per embedding call
+    INGEST_MAX_FILES_IN_FLIGHT: int = 8 # Files processed concurrently (bounds memory)
+    INGEST_PDF_PAGES_PER_TASK: int = 32 # PDF pages extracted per process-pool task
+    DEDUP_CHUNKS: bool = True # Drop chunks that repeat an earlier chunk of the same document before embedding
+    DEDUP_SIMILARITY_THRESHOLD: float = 0.85 # Estimated Jaccard similarity (MinHash over word 3-grams) of a near duplicate
+
+    # Model Warm Pool (app startup)
+    PRELOAD_MODELS: List[str] = ["embedding", "llm"] # Loaded in background threads at startup; others ("asr", "tts") on first use
+    MODEL_WARMUP: bool = True # Run a tiny inference after loading so the first request does not pay for kernel compilation
+
+    # Model Executors (each model's blocking calls run on its own bounded thread pool)
+    ASR_EXECUTOR_WORKERS: int = 2 # Concurrent transcriptions (or transcript segments) outside the ingestion pipeline
+    LLM_EXECUTOR_WORKERS: int = 2 # Concurrent generations through LLMClient.stream_text (the LLM scheduler has its own thread)
+    TTS_EXECUTOR_WORKERS: int = 1
+    EMBEDDING_EXECUTOR_WORKERS: int = 2 # Query embeddings and ingestion batches (one at a time) run here, never behind ASR or TTS
+    ASR_TIMEOUT_SECONDS: float = 3600 # Per call; 0 waits indefinitely
+    LLM_TIMEOUT_SECONDS: float = 300 # Whole generation, including time waiting for a thread
+    TTS_TIMEOUT_SECONDS: float = 300
+    EMBEDDING_TIMEOUT_SECONDS: float = 120
+
+    # RAG Service (ingest/search/chat API; app.py is a client of it)
+    SERVICE_HOST: str = "127.0.0.1" # Address `python -m src.interaction.api_server` listens on
+    SERVICE_PORT: int = 8765
+    SERVICE_URL: str = "http://127.0.0.1:8765" # Service the app talks to
+    SERVICE_AUTOSTART: bool = True # If nothing answers at SERVICE_URL, the app runs the service in its own process
+    SERVICE_MAX_CONCURRENT_CHATS: int = 8 # Chats retrieving or generating at once; the LLM scheduler batches them
+    SERVICE_MAX_CONCURRENT_INGESTS: int = 1 # Ingestion runs at once (each already processes files in parallel)
+    SERVICE_MAX_QUEUED_REQUESTS: int = 32 # Requests waiting per endpoint; beyond this the service answers 503 (busy)
+    SERVICE_MAX_UPLOAD_MB: int = 512 # Largest request body accepted
+    SERVICE_SESSION_IDLE_MINUTES: float = 120 # In-memory sessions (without a persistent knowledge base) are dropped after this
+    SERVICE_CLIENT_TIMEOUT_SECONDS: float = 600 # How long a client waits for the service to send anything
 
     # Logging Level
     LOG_LEVEL: str = "INFO"
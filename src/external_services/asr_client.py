@@ -3,10 +3,15 @@ import sys
 import time
 import traceback # Import traceback module
 import asyncio
-from typing import Optional
+from concurrent.futures import Executor
+from typing import AsyncIterator, Optional
+import numpy as np
 from tqdm import tqdm
 from ..config import settings
+from ..ingestion.ingestion_cache import hash_file
 from ..utils.logger_config import setup_logger
+from .model_executor import get_model_executor
+from .segmented_asr import SAMPLE_RATE, SegmentedTranscriber, TranscriptSegment, load_audio
 
 try:
     from lightning_whisper_mlx import LightningWhisperMLX
@@ -17,36 +22,31 @@ except ImportError:
 # Setup a logger specific to this module
 logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
 
-class ASRClient:
+class BaseASRClient:
     """
-    Client for Automatic Speech Recognition using lightning-whisper-mlx.
+    Transcription shared by the ASR backends: whole-file `transcribe` and
+    segmented `transcribe_stream`. Subclasses load a model, set `model_name`,
+    `quant` and `model`, and implement `_transcribe_file` (an audio file) and
+    `_transcribe_samples` (16 kHz float32 samples), each returning a
+    Whisper-style result dict with a "text" entry.
     """
-    def __init__(self,
-                 model_name: Optional[str] = None,
-                 quant: Optional[str] = None,
-                 batch_size: Optional[int] = None):
-        if not LightningWhisperMLX:
-            logger.critical("lightning_whisper_mlx library is required but not installed. ASRClient cannot be initialized.")
-            raise ImportError("lightning_whisper_mlx library is required for ASRClient.")
+    model_name: str
+    quant: Optional[str] = None
+    model = None
 
-        self.model_name = model_name or settings.ASR_MODEL_NAME
-        self.quant = quant or settings.ASR_QUANTIZATION
-        self.batch_size = batch_size or settings.ASR_BATCH_SIZE
-        
-        logger.info(f"Initializing ASRClient with model: {self.model_name}, quant: {self.quant}, batch_size: {self.batch_size}")
-        
-        self.model = None
-        try:
-            self.model = LightningWhisperMLX(
-                model=self.model_name,
-                batch_size=self.batch_size,
-                quant=self.quant
-            )
-            logger.info(f"LightningWhisperMLX model '{self.model_name}' (quant: {self.quant or 'None'}) initialized successfully.")
-        except Exception as e:
-            logger.error(f"Error initializing LightningWhisperMLX model '{self.model_name}': {e}")
-            logger.error(traceback.format_exc()) # Log the full traceback
-            raise # Re-raise the exception to indicate failure
+    def _transcribe_file(self, audio_file_path: str, language: str) -> dict:
+        raise NotImplementedError
+
+    def _transcribe_samples(self, audio, language: str) -> dict:
+        raise NotImplementedError
+
+    def _load_audio(self, audio_file_path: str):
+        """Decodes a file to 16 kHz mono samples for segmented transcription."""
+        return load_audio(audio_file_path)
+
+    def warm_up(self):
+        """Transcribes a second of silence, so the first real request finds the model initialized."""
+        self._transcribe_samples(np.zeros(SAMPLE_RATE, dtype=np.float32), "en")
 
     async def _spinner(self, message: str, start_time: float):
         """A simple, text-based spinner coroutine."""
@@ -59,9 +59,13 @@ class ASRClient:
                 sys.stdout.flush()
                 await asyncio.sleep(0.1)
 
-    async def transcribe(self, audio_file_path: str, language: str) -> str:
+    async def transcribe(self, audio_file_path: str, language: str, executor: Optional[Executor] = None,
+                         timeout: Optional[float] = None) -> str:
         """
         Transcribes an audio file with a progress bar indicating activity.
+        The model runs on the ASR executor (see model_executor), or on `executor`
+        if one is given. A transcription taking longer than `timeout` seconds
+        (ASR_TIMEOUT_SECONDS by default) is abandoned and reported as an error.
         """
         if not self.model:
             logger.error("ASR model not initialized. Cannot transcribe.")
@@ -70,7 +74,7 @@ class ASRClient:
         logger.info(f"Preparing to transcribe audio file: {audio_file_path}")
         
         # This is the synchronous, blocking call we need to run
-        blocking_transcribe_call = self.model.transcribe
+        blocking_transcribe_call = self._transcribe_file
         
         spinner_task = None
         start_time = time.time()
@@ -82,12 +86,13 @@ class ASRClient:
             # Start the spinner as a concurrent task
             spinner_task = asyncio.create_task(self._spinner("Transcribing Audio...", start_time=start_time))
             # Run the blocking function in a separate thread so the UI doesn't freeze
-            result = await loop.run_in_executor(
-                None,  # Use the default thread pool executor
-                blocking_transcribe_call,
-                audio_file_path,
-                language
-            )
+            if executor is None:
+                result = await get_model_executor("asr").run(blocking_transcribe_call, audio_file_path, language, timeout=timeout)
+            else:
+                timeout = settings.ASR_TIMEOUT_SECONDS if timeout is None else timeout
+                result = await asyncio.wait_for(
+                    loop.run_in_executor(executor, blocking_transcribe_call, audio_file_path, language), timeout or None
+                )
 
         except Exception as e:
             logger.error(f"Error during transcription of '{audio_file_path}': {e}")
@@ -108,4 +113,109 @@ class ASRClient:
         if not transcription:
             logger.warning(f"Transcription resulted in empty text for {audio_file_path}.")
 
-        return transcription
\ No newline at end of file
+        return transcription
+
+    async def transcribe_stream(
+        self,
+        audio_file_path: str,
+        language: str,
+        executor: Optional[Executor] = None,
+        content_hash: Optional[str] = None,
+        workers: Optional[int] = None,
+    ) -> AsyncIterator[TranscriptSegment]:
+        """
+        Transcribes an audio file segment by segment (split on silence) and
+        yields timestamped TranscriptSegments in time order as they complete.
+        Finished segments are checkpointed under the file's content hash, so a
+        crashed transcription resumes where it left off. Segments run on the
+        ASR executor unless `executor` is given. See SegmentedTranscriber.
+        """
+        if not self.model:
+            raise RuntimeError("ASR model not initialized. Cannot transcribe.")
+        if content_hash is None:
+            content_hash = await asyncio.get_running_loop().run_in_executor(None, hash_file, audio_file_path)
+        transcriber = SegmentedTranscriber(self._transcribe_samples, workers=workers, audio_loader=self._load_audio)
+        checkpoint_key = f"{content_hash}|{self.model_name}|{self.quant}|{language}"
+        executor = executor or get_model_executor("asr")
+        async for segment in transcriber.stream(audio_file_path, language, executor=executor, checkpoint_key=checkpoint_key):
+            yield segment
+
+
+class ASRClient(BaseASRClient):
+    """
+    Client for Automatic Speech Recognition using lightning-whisper-mlx.
+    """
+    def __init__(self,
+                 model_name: Optional[str] = None,
+                 quant: Optional[str] = None,
+                 batch_size: Optional[int] = None):
+        if not LightningWhisperMLX:
+            logger.critical("lightning_whisper_mlx library is required but not installed. ASRClient cannot be initialized.")
+            raise ImportError("lightning_whisper_mlx library is required for ASRClient.")
+
+        self.model_name = model_name or settings.ASR_MODEL_NAME
+        self.quant = quant or settings.ASR_QUANTIZATION
+        self.batch_size = batch_size or settings.ASR_BATCH_SIZE
+        
+        logger.info(f"Initializing ASRClient with model: {self.model_name}, quant: {self.quant}, batch_size: {self.batch_size}")
+        
+        self.model = None
+        try:
+            self.model = LightningWhisperMLX(
+                model=self.model_name,
+                batch_size=self.batch_size,
+                quant=self.quant
+            )
+            logger.info(f"LightningWhisperMLX model '{self.model_name}' (quant: {self.quant or 'None'}) initialized successfully.")
+        except Exception as e:
+            logger.error(f"Error initializing LightningWhisperMLX model '{self.model_name}': {e}")
+            logger.error(traceback.format_exc()) # Log the full traceback
+            raise # Re-raise the exception to indicate failure
+
+    def _transcribe_file(self, audio_file_path: str, language: str) -> dict:
+        return self.model.transcribe(audio_file_path, language)
+
+    def _transcribe_samples(self, audio, language: str) -> dict:
+        return self.model.transcribe(audio, language)
+
+
+class FasterWhisperASRClient(BaseASRClient):
+    """
+    Client for Automatic Speech Recognition on CPU using faster-whisper
+    (CTranslate2), with int8 weights by default. `num_workers` model
+    replicas let that many segments be transcribed in parallel threads.
+    """
+    def __init__(self,
+                 model_name: Optional[str] = None,
+                 compute_type: Optional[str] = None,
+                 cpu_threads: Optional[int] = None,
+                 num_workers: Optional[int] = None,
+                 device: str = "cpu"):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise ImportError("faster-whisper library is required for FasterWhisperASRClient (pip install faster-whisper).") from e
+
+        self.model_name = model_name or settings.ASR_MODEL_NAME
+        # Recorded as `quant` so cached transcripts are keyed by the weights' precision
+        self.quant = compute_type or settings.ASR_COMPUTE_TYPE
+        cpu_threads = settings.ASR_CPU_THREADS if cpu_threads is None else cpu_threads
+        num_workers = num_workers or settings.ASR_SEGMENT_WORKERS
+
+        logger.info(f"Initializing FasterWhisperASRClient with model: {self.model_name}, compute type: {self.quant}, "
+                    f"{num_workers} worker(s) x {cpu_threads or 'default'} thread(s)")
+        try:
+            self.model = WhisperModel(self.model_name, device=device, compute_type=self.quant,
+                                      cpu_threads=cpu_threads, num_workers=num_workers)
+        except Exception as e:
+            logger.error(f"Error initializing faster-whisper model '{self.model_name}': {e}", exc_info=True)
+            raise
+
+    def _transcribe_file(self, audio_file_path: str, language: str) -> dict:
+        # Whole files go through faster-whisper's own VAD, which skips silence
+        segments, _ = self.model.transcribe(audio_file_path, language=language, vad_filter=True)
+        return {"text": " ".join(segment.text.strip() for segment in segments)}
+
+    def _transcribe_samples(self, audio, language: str) -> dict:
+        segments, _ = self.model.transcribe(audio, language=language)
+        return {"text": " ".join(segment.text.strip() for segment in segments)}
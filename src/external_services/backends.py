@@ -0,0 +1,104 @@
+# src/external_services/backends.py
+import importlib
+import platform
+from typing import Any, Callable, Dict, List, Optional, Union
+from ..config import settings
+from ..utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+# Backends are ".module:attribute" paths, imported only when selected, so
+# choosing a CPU engine never imports MLX and listing backends loads nothing.
+_BACKENDS: Dict[str, Dict[str, Union[str, Callable[..., Any]]]] = {
+    "asr": {
+        "mlx": ".asr_client:ASRClient",
+        "faster-whisper": ".asr_client:FasterWhisperASRClient",
+        "fake": ".fake_backends:FakeASRClient",
+    },
+    "llm": {
+        "mlx": ".llm_client:LLMClient",
+        "llama-cpp": ".llm_client:LlamaCppLLMClient",
+        "fake": ".fake_backends:FakeLLMClient",
+    },
+    "tts": {
+        "melo": ".tts_client:TTSClient",
+        "piper": ".tts_client:PiperTTSClient",
+        "fake": ".fake_backends:FakeTTSClient",
+    },
+    "embedding": {
+        "sentence-transformers": ".embedding_client:EmbeddingClient",
+        "onnx": ".embedding_client:OnnxEmbeddingClient",
+        "fake": ".fake_backends:FakeEmbeddingClient",
+    },
+}
+
+# What "auto" resolves to on Apple Silicon and everywhere else
+_AUTO_BACKENDS = {
+    "asr": ("mlx", "faster-whisper"),
+    "llm": ("mlx", "llama-cpp"),
+    "tts": ("melo", "piper"),
+    "embedding": ("sentence-transformers", "sentence-transformers"),
+}
+
+
+def is_apple_silicon() -> bool:
+    return platform.system() == "Darwin" and platform.machine() == "arm64"
+
+
+def register_backend(modality: str, name: str, factory: Union[str, Callable[..., Any]]):
+    """
+    Adds (or replaces) a backend. `factory` is a client class or callable,
+    or a "module:attribute" path to one (relative to this package when it
+    starts with a dot), and is called with the client's keyword arguments.
+    """
+    if modality not in _BACKENDS:
+        raise ValueError(f"Unknown modality '{modality}'. Expected one of {sorted(_BACKENDS)}.")
+    _BACKENDS[modality][name] = factory
+
+
+def available_backends(modality: str) -> List[str]:
+    """Names of the registered backends of a modality ("asr", "llm", "tts" or "embedding")."""
+    return sorted(_BACKENDS[modality])
+
+
+def resolve_backend(modality: str, backend: Optional[str] = None) -> str:
+    """
+    The backend to use for a modality: the one given, else the modality's
+    `<MODALITY>_BACKEND` setting; "auto" picks the MLX/Metal engines on
+    Apple Silicon and the CPU engines elsewhere.
+    """
+    if modality not in _BACKENDS:
+        raise ValueError(f"Unknown modality '{modality}'. Expected one of {sorted(_BACKENDS)}.")
+    backend = (backend or getattr(settings, f"{modality.upper()}_BACKEND", "auto")).lower()
+    if backend == "auto":
+        apple, other = _AUTO_BACKENDS[modality]
+        backend = apple if is_apple_silicon() else other
+    if backend not in _BACKENDS[modality]:
+        raise ValueError(f"Unknown {modality} backend '{backend}'. Expected one of {available_backends(modality)} or 'auto'.")
+    return backend
+
+
+def _load_factory(factory: Union[str, Callable[..., Any]]) -> Callable[..., Any]:
+    if callable(factory):
+        return factory
+    module_name, attribute = factory.split(":")
+    return getattr(importlib.import_module(module_name, package=__package__), attribute)
+
+
+def create_client(modality: str, backend: Optional[str] = None, **kwargs) -> Any:
+    """Creates the client of a modality with the selected backend, passing on `kwargs`."""
+    backend = resolve_backend(modality, backend)
+    logger.info(f"Creating {modality} client with the '{backend}' backend.")
+    return _load_factory(_BACKENDS[modality][backend])(**kwargs)
+
+
+def create_asr_client(backend: Optional[str] = None, **kwargs):
+    return create_client("asr", backend, **kwargs)
+
+
+def create_llm_client(backend: Optional[str] = None, **kwargs):
+    return create_client("llm", backend, **kwargs)
+
+
+def create_tts_client(backend: Optional[str] = None, **kwargs):
+    return create_client("tts", backend, **kwargs)
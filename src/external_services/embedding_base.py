@@ -0,0 +1,27 @@
+# src/external_services/embedding_base.py
+from typing import List, Optional
+import numpy as np
+from .model_executor import get_model_executor
+
+
+class BaseEmbeddingClient:
+    """
+    Async access shared by the embedding backends. Subclasses implement the
+    blocking `embed_texts` and `embed_query`; `aembed_texts` and
+    `aembed_query` run them on the embedding model's executor. This module
+    imports no model library, so the multi-process pool's parent process
+    stays light.
+    """
+
+    def embed_texts(self, texts: List[str], batch_size: Optional[int] = None, precision: Optional[str] = None) -> np.ndarray:
+        raise NotImplementedError
+
+    def embed_query(self, text: str) -> np.ndarray:
+        raise NotImplementedError
+
+    async def aembed_texts(self, texts: List[str], batch_size: Optional[int] = None, precision: Optional[str] = None,
+                           timeout: Optional[float] = None) -> np.ndarray:
+        return await get_model_executor("embedding").run(self.embed_texts, texts, batch_size, precision, timeout=timeout)
+
+    async def aembed_query(self, text: str, timeout: Optional[float] = None) -> np.ndarray:
+        return await get_model_executor("embedding").run(self.embed_query, text, timeout=timeout)
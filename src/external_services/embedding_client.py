@@ -1,6 +1,6 @@
 # src/core/external_services/embedding_client.py
 import time
-from typing import List
+from typing import List, Optional, Union
 import numpy as np
 
 # This library will need to be installed: pip install sentence-transformers
@@ -12,54 +12,146 @@ except ImportError:
     SentenceTransformer = None
 
 from ..config import settings
+from ..memory.vector_index import PRECISIONS, quantize
+from .embedding_base import BaseEmbeddingClient
+from .query_cache import QueryEmbeddingCache
 from ..utils.logger_config import setup_logger
 
 logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
 
-class EmbeddingClient:
+class EmbeddingClient(BaseEmbeddingClient):
     """
     A client for generating text embeddings using SentenceTransformer models.
+
+    Texts are sorted by length and encoded in batches of `batch_size`, so each
+    batch pads to a similar length, and results are returned in input order.
+    Embeddings are L2-normalized (so retrieval can use a plain dot product)
+    and returned as float32, float16 or int8 (see memory.vector_index.quantize).
+    Query embeddings are cached (see QueryEmbeddingCache); pass
+    `query_cache=False` to disable the cache.
     """
-    def __init__(self, model_name: str = None):
+    def __init__(
+        self,
+        model_name: str = None,
+        batch_size: Optional[int] = None,
+        precision: Optional[str] = None,
+        normalize: bool = True,
+        sort_by_length: bool = True,
+        device: Optional[str] = None,
+        query_cache: Union[QueryEmbeddingCache, bool, None] = None,
+    ):
         if not SentenceTransformer:
             raise ImportError("sentence_transformers library is required for EmbeddingClient.")
 
         # Use the provided model name or get it from settings, with a default fallback
         self.model_name = model_name or getattr(settings, 'EMBEDDING_MODEL_NAME', None)
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.precision = precision or settings.EMBEDDING_PRECISION
+        if self.precision not in PRECISIONS:
+            raise ValueError(f"Unknown embedding precision '{self.precision}'. Expected one of {sorted(PRECISIONS)}.")
+        if self.precision != "float32" and not normalize:
+            raise ValueError("float16/int8 output requires normalized embeddings.")
+        self.normalize = normalize
+        self.sort_by_length = sort_by_length
+        # None uses a cache configured from Settings; False disables caching
+        self.query_cache = QueryEmbeddingCache() if query_cache is None else (None if query_cache is False else query_cache)
         self.model = None
         
         logger.info(f"Initializing EmbeddingClient with model: {self.model_name}")
         try:
             # The model is downloaded from Hugging Face automatically
-            self.model = SentenceTransformer(self.model_name)
+            self.model = self._load_model(device)
             logger.info(f"SentenceTransformer model '{self.model_name}' loaded successfully.")
         except Exception as e:
             logger.error(f"Error loading SentenceTransformer model '{self.model_name}': {e}", exc_info=True)
             raise
 
-    def embed_texts(self, texts: List[str]) -> List[np.ndarray]:
+    def _load_model(self, device: Optional[str]):
+        return SentenceTransformer(self.model_name, device=device)
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def warm_up(self):
+        """Encodes one short text, so the first real request finds the model initialized."""
+        self.encode_batch(["warm-up"])
+
+    def encode_batch(self, texts: List[str]) -> np.ndarray:
+        """One forward pass over a batch, as float32, without sorting."""
+        return self.model.encode(
+            texts,
+            batch_size=len(texts),
+            convert_to_numpy=True,
+            normalize_embeddings=self.normalize,
+            show_progress_bar=False,
+        ).astype(np.float32, copy=False)
+
+    def embed_texts(self, texts: List[str], batch_size: Optional[int] = None, precision: Optional[str] = None) -> np.ndarray:
         """
-        Generates embeddings for a list of texts.
+        Generates embeddings for a list of texts, one row per text in input
+        order, in the client's precision unless another is given.
         """
         if not self.model:
             logger.error("Embedding model not initialized.")
             return []
 
+        batch_size = batch_size or self.batch_size
+        precision = precision or self.precision
         logger.info(f"Generating embeddings for {len(texts)} text chunk(s)...")
         start_time = time.time()
         try:
-            embeddings = self.model.encode(texts, convert_to_numpy=True)
+            if not texts:
+                return np.empty((0, self.dimension), dtype=PRECISIONS[precision])
+            # Longest first: similar lengths share a batch, and an out-of-memory batch shows up immediately
+            order = list(range(len(texts)))
+            if self.sort_by_length:
+                order.sort(key=lambda i: len(texts[i]), reverse=True)
+            embeddings = None
+            for batch_start in range(0, len(order), batch_size):
+                rows = order[batch_start:batch_start + batch_size]
+                batch = self.encode_batch([texts[i] for i in rows])
+                if embeddings is None:
+                    embeddings = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+                embeddings[rows] = batch
             duration = time.time() - start_time
-            logger.info(f"Successfully generated embeddings in {duration:.2f} seconds.")
-            return embeddings
+            logger.info(f"Successfully generated embeddings in {duration:.2f} seconds ({len(texts) / max(duration, 1e-9):.0f} texts/s).")
+            return quantize(embeddings, precision)
         except Exception as e:
             logger.error(f"Error during text embedding: {e}", exc_info=True)
             return []
 
     def embed_query(self, text: str) -> np.ndarray:
         """
-        Generates an embedding for a single text query.
+        Generates a float32 embedding for a single text query.
         """
-        # Simply uses the batch embedding method for a single item
-        result = self.embed_texts([text])
-        return result[0] if result is not None and len(result) > 0 else np.array([])
\ No newline at end of file
+        cache_key = f"{self.model_name}|normalize={self.normalize}"
+        if self.query_cache is not None:
+            cached = self.query_cache.get(cache_key, text)
+            if cached is not None:
+                return cached
+        # A single text needs no sorting or batching; queries are never stored, so always full precision
+        try:
+            embedding = self.encode_batch([text])[0]
+        except Exception as e:
+            logger.error(f"Error during query embedding: {e}", exc_info=True)
+            return np.array([])
+        if self.query_cache is not None:
+            self.query_cache.put(cache_key, text, embedding)
+        return embedding
+
+
+class OnnxEmbeddingClient(EmbeddingClient):
+    """
+    EmbeddingClient running the model with ONNX Runtime on CPU (requires
+    optimum[onnxruntime]), which is markedly faster than PyTorch there.
+    `onnx_file` selects a file from the model's onnx/ folder, e.g. one of
+    its int8-quantized exports; by default the model is exported on load.
+    """
+    def __init__(self, *args, onnx_file: Optional[str] = None, **kwargs):
+        self.onnx_file = onnx_file if onnx_file is not None else settings.EMBEDDING_ONNX_FILE
+        super().__init__(*args, **kwargs)
+
+    def _load_model(self, device: Optional[str]):
+        model_kwargs = {"file_name": self.onnx_file} if self.onnx_file else None
+        return SentenceTransformer(self.model_name, device=device or "cpu", backend="onnx", model_kwargs=model_kwargs)
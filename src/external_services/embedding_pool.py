@@ -0,0 +1,318 @@
+# src/external_services/embedding_pool.py
+import functools
+import math
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Optional, Set, Union
+import numpy as np
+from ..config import settings
+from ..memory.vector_index import PRECISIONS, quantize
+from ..utils.logger_config import setup_logger
+from .embedding_base import BaseEmbeddingClient
+from .query_cache import QueryEmbeddingCache
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+# How often an idle worker looks at the query queue while waiting for batch work
+_IDLE_POLL_SECONDS = 0.01
+
+
+def _load_embedding_client(model_name: Optional[str], batch_size: int):
+    # Imported in the worker so the parent process never loads a model
+    from .backends import create_client
+    return create_client("embedding", model_name=model_name, batch_size=batch_size, precision="float32",
+                         device="cpu", query_cache=False)
+
+
+def _next_task(queries, tasks):
+    """The next query if one is waiting, else the next batch shard."""
+    while True:
+        try:
+            return queries.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return tasks.get(timeout=_IDLE_POLL_SECONDS)
+        except queue.Empty:
+            pass
+
+
+def _worker_main(client_factory: Callable[[], Any], threads: int, queries, tasks, results):
+    """
+    Worker process: loads one model, then embeds batches of texts straight
+    into the caller's shared-memory output buffer until it receives None.
+    Queries are taken before batch shards.
+    """
+    try:
+        if threads > 0:
+            try:
+                import torch
+                torch.set_num_threads(threads)
+            except ImportError:
+                pass
+        client = client_factory()
+        dim = client.dimension
+    except Exception as e:
+        results.put(("failed", os.getpid(), f"{type(e).__name__}: {e}"))
+        return
+    results.put(("ready", os.getpid(), dim))
+
+    while True:
+        task = _next_task(queries, tasks)
+        if task is None:
+            return
+        task_id, shm_name, total_rows, rows, texts = task
+        try:
+            embeddings = client.encode_batch(texts)
+            shm = SharedMemory(name=shm_name)
+            try:
+                out = np.ndarray((total_rows, dim), dtype=np.float32, buffer=shm.buf)
+                out[rows] = embeddings
+                del out # The buffer cannot be closed while a view of it exists
+            finally:
+                shm.close()
+            results.put(("done", task_id, None))
+        except Exception as e:
+            results.put(("error", task_id, f"{type(e).__name__}: {e}"))
+
+
+class _PendingCall:
+    """Shards of one embed call that are still running, and the errors of those that failed."""
+    def __init__(self, task_ids: Set[int]):
+        self.pending = task_ids
+        self.errors: List[str] = []
+        self.done = threading.Event()
+
+
+class MultiProcessEmbeddingClient(BaseEmbeddingClient):
+    """
+    Drop-in replacement for EmbeddingClient that spreads embedding work over
+    several worker processes, each with its own copy of the model.
+
+    A call sorts its texts by length, shards them into batches (small enough
+    that every worker gets one) and puts them on a shared task queue, so idle
+    workers pick up the next batch. Workers write their rows directly into a
+    shared-memory buffer allocated for the call; only the texts and a short
+    completion message cross process boundaries.
+
+    Calls may overlap; a thread routes each completion message to its call.
+    Queries (`embed_query`) go on a queue of their own that workers check
+    before taking the next shard, so a query waits for the shards already
+    being encoded, never for a whole batch queued ahead of it.
+    """
+
+    def __init__(
+        self,
+        num_workers: Optional[int] = None,
+        model_name: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        precision: Optional[str] = None,
+        threads_per_worker: Optional[int] = None,
+        client_factory: Optional[Callable[[], Any]] = None,
+        start_timeout: float = 600.0,
+        query_cache: Union[QueryEmbeddingCache, bool, None] = None,
+    ):
+        self.num_workers = num_workers or settings.EMBEDDING_WORKERS or os.cpu_count() or 1
+        self.model_name = model_name or settings.EMBEDDING_MODEL_NAME
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.precision = precision or settings.EMBEDDING_PRECISION
+        if self.precision not in PRECISIONS:
+            raise ValueError(f"Unknown embedding precision '{self.precision}'. Expected one of {sorted(PRECISIONS)}.")
+        if threads_per_worker is None:
+            threads_per_worker = settings.EMBEDDING_WORKER_THREADS or max(1, (os.cpu_count() or 1) // self.num_workers)
+        self.threads_per_worker = threads_per_worker
+        # None uses a cache configured from Settings; False disables caching
+        self.query_cache = QueryEmbeddingCache() if query_cache is None else (None if query_cache is False else query_cache)
+        client_factory = client_factory or functools.partial(_load_embedding_client, self.model_name, self.batch_size)
+
+        # Spawned rather than forked: torch and the caller's threads do not survive a fork
+        context = multiprocessing.get_context("spawn")
+        self._queries = context.Queue()
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+        self._lock = threading.Lock()
+        self._next_task_id = 0
+        self._calls: Dict[int, _PendingCall] = {} # Task id -> the call waiting for it
+        self._failure: Optional[str] = None
+        self._closed = False
+        logger.info(f"Starting {self.num_workers} embedding worker(s) for '{self.model_name}' "
+                    f"({self.threads_per_worker} thread(s) each)...")
+        self._workers = [
+            context.Process(
+                target=_worker_main,
+                args=(client_factory, self.threads_per_worker, self._queries, self._tasks, self._results),
+                daemon=True,
+                name=f"embed-{i}",
+            )
+            for i in range(self.num_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+        try:
+            self.dimension = self._wait_until_ready(start_timeout)
+        except Exception:
+            self.close()
+            raise
+        self._dispatcher = threading.Thread(target=self._dispatch_results, name="embed-results", daemon=True)
+        self._dispatcher.start()
+        logger.info(f"Embedding pool ready ({self.num_workers} workers, dimension {self.dimension}).")
+
+    def _wait_until_ready(self, timeout: float) -> int:
+        dims = set()
+        deadline = time.monotonic() + timeout
+        for _ in self._workers:
+            kind, _, payload = self._get_result(deadline)
+            if kind == "failed":
+                raise RuntimeError(f"Embedding worker failed to load the model: {payload}")
+            dims.add(payload)
+        if len(dims) != 1:
+            raise RuntimeError(f"Embedding workers disagree on the embedding dimension: {sorted(dims)}")
+        return dims.pop()
+
+    def _get_result(self, deadline: Optional[float] = None):
+        """Next message from the workers; fails if a worker died or the deadline passes."""
+        while True:
+            try:
+                return self._results.get(timeout=1.0)
+            except queue.Empty:
+                dead = [w.name for w in self._workers if not w.is_alive()]
+                if dead:
+                    raise RuntimeError(f"Embedding worker(s) {', '.join(dead)} exited unexpectedly.")
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError("Timed out waiting for the embedding workers.")
+
+    def _dispatch_results(self):
+        """Hands each completion message to the call waiting for it, until the pool closes."""
+        while not self._closed:
+            try:
+                kind, task_id, payload = self._get_result(deadline=time.monotonic())
+            except TimeoutError:
+                continue
+            except RuntimeError as e:
+                with self._lock:
+                    self._failure = str(e)
+                    calls, self._calls = set(self._calls.values()), {}
+                for call in calls:
+                    call.done.set()
+                return
+            with self._lock:
+                call = self._calls.pop(task_id, None)
+            if call is None:
+                continue
+            if kind == "error":
+                call.errors.append(payload)
+            call.pending.discard(task_id)
+            if not call.pending:
+                call.done.set()
+
+    def _shard_size(self, count: int, batch_size: int) -> int:
+        """At most batch_size texts per task, but small enough that every worker gets work."""
+        return max(1, min(batch_size, math.ceil(count / self.num_workers)))
+
+    def embed_texts(self, texts: List[str], batch_size: Optional[int] = None, precision: Optional[str] = None) -> np.ndarray:
+        """
+        Generates embeddings for a list of texts, one row per text in input
+        order, in the client's precision unless another is given.
+        """
+        return self._embed(texts, batch_size, precision, self._tasks)
+
+    def _embed(self, texts: List[str], batch_size: Optional[int], precision: Optional[str], task_queue) -> np.ndarray:
+        if self._closed:
+            logger.error("Embedding pool is closed.")
+            return []
+        precision = precision or self.precision
+        if not texts:
+            return np.empty((0, self.dimension), dtype=PRECISIONS[precision])
+
+        logger.info(f"Generating embeddings for {len(texts)} text chunk(s) on {self.num_workers} worker(s)...")
+        start_time = time.time()
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        shard_size = self._shard_size(len(texts), batch_size or self.batch_size)
+        shm = SharedMemory(create=True, size=len(texts) * self.dimension * 4)
+        try:
+            shards = [order[i:i + shard_size] for i in range(0, len(order), shard_size)]
+            with self._lock:
+                if self._failure is not None:
+                    raise RuntimeError(self._failure)
+                task_ids = range(self._next_task_id, self._next_task_id + len(shards))
+                self._next_task_id += len(shards)
+                call = _PendingCall(set(task_ids))
+                self._calls.update((task_id, call) for task_id in task_ids)
+            for task_id, rows in zip(task_ids, shards):
+                task_queue.put((task_id, shm.name, len(texts), rows, [texts[i] for i in rows]))
+
+            # Wait for every shard, even after an error, so no worker writes to a freed buffer
+            call.done.wait()
+            if self._failure is not None and call.pending:
+                raise RuntimeError(self._failure)
+            if call.errors:
+                logger.error(f"Error during text embedding: {call.errors[0]}")
+                return []
+            out = np.ndarray((len(texts), self.dimension), dtype=np.float32, buffer=shm.buf)
+            embeddings = out.copy()
+            del out
+        except RuntimeError as e:
+            logger.error(f"Error during text embedding: {e}", exc_info=True)
+            return []
+        finally:
+            shm.close()
+            shm.unlink()
+
+        duration = time.time() - start_time
+        logger.info(f"Successfully generated embeddings in {duration:.2f} seconds ({len(texts) / max(duration, 1e-9):.0f} texts/s).")
+        return quantize(embeddings, precision)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """
+        Generates a float32 embedding for a single text query.
+        """
+        cache_key = f"{self.model_name}|normalize=True"
+        if self.query_cache is not None:
+            cached = self.query_cache.get(cache_key, text)
+            if cached is not None:
+                return cached
+        # Jumps the shards of batches already queued
+        result = self._embed([text], None, "float32", self._queries)
+        if len(result) == 0:
+            return np.array([])
+        if self.query_cache is not None:
+            self.query_cache.put(cache_key, text, result[0])
+        return result[0]
+
+    def close(self):
+        """Stops the worker processes."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+        dispatcher = getattr(self, "_dispatcher", None)
+        if dispatcher is not None:
+            dispatcher.join(timeout=5)
+        logger.info("Embedding pool stopped.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def create_embedding_client():
+    """
+    Creates the embedding client selected in Settings: a single in-process
+    model (EMBEDDING_WORKERS = 1) or a pool of worker processes, each
+    running the EMBEDDING_BACKEND engine.
+    """
+    if settings.EMBEDDING_WORKERS == 1:
+        from .backends import create_client
+        return create_client("embedding")
+    return MultiProcessEmbeddingClient()
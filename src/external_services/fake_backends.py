@@ -0,0 +1,159 @@
+# src/external_services/fake_backends.py
+import hashlib
+import time
+import wave
+from typing import Iterator, List, Optional
+import numpy as np
+from ..config import settings
+from ..memory.vector_index import PRECISIONS, quantize
+from ..utils.logger_config import setup_logger
+from .asr_client import BaseASRClient
+from .embedding_base import BaseEmbeddingClient
+from .llm_client import BaseLLMClient, GenerationStats
+from .segmented_asr import SAMPLE_RATE
+from .tts_client import BaseTTSClient
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+# Deterministic stand-ins for the model backends: outputs depend only on the
+# inputs, and optional delays emulate a model's cost, so benchmarks measure
+# the pipeline around the models without loading any.
+
+_VOCABULARY = (
+    "the pump valve pressure seal system flow motor check inspect replace manual report meeting "
+    "schedule budget team result data model test sample value measure review update safety"
+).split()
+
+
+def _seeded_rng(*parts) -> np.random.Generator:
+    digest = hashlib.blake2b("\x1f".join(str(p) for p in parts).encode("utf-8"), digest_size=8).digest()
+    return np.random.default_rng(int.from_bytes(digest, "little"))
+
+
+def _fake_words(rng: np.random.Generator, count: int) -> str:
+    words = [_VOCABULARY[i] for i in rng.integers(0, len(_VOCABULARY), size=count)]
+    return " ".join(words).capitalize() + "." if words else ""
+
+
+class FakeASRClient(BaseASRClient):
+    """
+    Transcribes any file: its bytes are read as 16 kHz 16-bit PCM, and each
+    second of "audio" becomes about `words_per_second` words chosen by a hash
+    of the samples. `realtime_factor` seconds of work are simulated per
+    second of audio.
+    """
+    def __init__(self, model_name: str = "fake-asr", words_per_second: float = 2.5, realtime_factor: float = 0.0, **_):
+        self.model_name = model_name
+        self.quant = None
+        self.model = self
+        self.words_per_second = words_per_second
+        self.realtime_factor = realtime_factor
+
+    def _load_audio(self, audio_file_path: str) -> np.ndarray:
+        with open(audio_file_path, "rb") as f:
+            data = f.read()
+        return np.frombuffer(data[:len(data) // 2 * 2], dtype=np.int16)
+
+    def _transcribe_samples(self, audio, language: str) -> dict:
+        seconds = len(audio) / SAMPLE_RATE
+        if self.realtime_factor:
+            time.sleep(seconds * self.realtime_factor)
+        rng = _seeded_rng(self.model_name, language, hashlib.blake2b(np.asarray(audio).tobytes(), digest_size=16).hexdigest())
+        return {"text": _fake_words(rng, max(1, int(seconds * self.words_per_second)))}
+
+    def _transcribe_file(self, audio_file_path: str, language: str) -> dict:
+        return self._transcribe_samples(self._load_audio(audio_file_path), language)
+
+
+class FakeLLMClient(BaseLLMClient):
+    """
+    Answers with `response_tokens` words chosen by a hash of the prompt, one
+    word per token. `prefill_seconds` and `token_seconds` simulate the cost
+    of reading the prompt and of decoding each token.
+    """
+    def __init__(self, model_path: str = "fake-llm", response_tokens: int = 64,
+                 prefill_seconds: float = 0.0, token_seconds: float = 0.0, **_):
+        self.model_path = model_path
+        self.model = self
+        self.response_tokens = response_tokens
+        self.prefill_seconds = prefill_seconds
+        self.token_seconds = token_seconds
+
+    def iter_deltas(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: int = 512,
+        stats: Optional[GenerationStats] = None,
+    ) -> Iterator[str]:
+        stats = stats if stats is not None else GenerationStats()
+        stats.prompt_tokens = len((system_prompt or "").split()) + len(prompt.split())
+        rng = _seeded_rng(self.model_path, system_prompt, prompt)
+        words = _fake_words(rng, self.response_tokens).split()
+        if self.prefill_seconds:
+            time.sleep(self.prefill_seconds)
+        for i, word in enumerate(words[:max_tokens]):
+            if self.token_seconds:
+                time.sleep(self.token_seconds)
+            stats.generation_tokens = i + 1
+            yield word if i == 0 else " " + word
+
+
+class FakeTTSClient(BaseTTSClient):
+    """Writes a quiet tone lasting `seconds_per_word` per word of the text to a WAV file."""
+
+    def __init__(self, seconds_per_word: float = 0.3, delay_seconds: float = 0.0, **_):
+        self.seconds_per_word = seconds_per_word
+        self.delay_seconds = delay_seconds
+
+    def _synthesize_to_file(self, text: str, output_file_path: str):
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        t = np.arange(int(max(1, len(text.split())) * self.seconds_per_word * SAMPLE_RATE)) / SAMPLE_RATE
+        samples = (0.1 * np.sin(2 * np.pi * 220 * t) * 32767).astype(np.int16)
+        with wave.open(output_file_path, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(SAMPLE_RATE)
+            wav_file.writeframes(samples.tobytes())
+
+
+class FakeEmbeddingClient(BaseEmbeddingClient):
+    """
+    Feature-hashing embeddings: every lowercase word adds a signed unit to
+    one of `dim` dimensions chosen by its hash, and the sum is L2-normalized.
+    Texts sharing words are therefore similar, so retrieval over fake
+    embeddings still behaves sensibly. `seconds_per_text` simulates model cost.
+    """
+    def __init__(self, model_name: Optional[str] = None, dim: int = 384, precision: Optional[str] = None,
+                 seconds_per_text: float = 0.0, **_):
+        self.dim = dim
+        self.model_name = model_name or f"fake-hashing-{self.dim}"
+        self.precision = precision or settings.EMBEDDING_PRECISION
+        if self.precision not in PRECISIONS:
+            raise ValueError(f"Unknown embedding precision '{self.precision}'. Expected one of {sorted(PRECISIONS)}.")
+        self.seconds_per_text = seconds_per_text
+
+    @property
+    def dimension(self) -> int:
+        return self.dim
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            value = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[value % self.dim] += 1.0 if value >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            vector[0] = 1.0 # Empty text: any fixed unit vector
+            return vector
+        return vector / norm
+
+    def embed_texts(self, texts: List[str], batch_size: Optional[int] = None, precision: Optional[str] = None) -> np.ndarray:
+        if self.seconds_per_text:
+            time.sleep(self.seconds_per_text * len(texts))
+        embeddings = np.stack([self._embed(text) for text in texts]) if texts else np.empty((0, self.dim), dtype=np.float32)
+        return quantize(embeddings, precision or self.precision)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self._embed(text)
@@ -1,29 +1,287 @@
 # cras_project/cras_core/external_services/llm_client.py
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator, Iterator
+from dataclasses import dataclass
+import asyncio
+import os
+import threading
 import time
 from ..config import settings
 from ..utils.logger_config import setup_logger
-from huggingface_hub import login
+from .model_executor import ModelTimeoutError, get_model_executor
+from .prompt_cache import PromptPrefixCache
 try:
-    from mlx_lm import load, generate
+    from mlx_lm import load, stream_generate
+    from mlx_lm.models.cache import make_prompt_cache, trim_prompt_cache, can_trim_prompt_cache
 except ImportError:
     print("Warning: mlx_lm not found. LLMClient will not function.")
     load = None
-    generate = None
+    stream_generate = None
+    make_prompt_cache = None
+    trim_prompt_cache = None
+    can_trim_prompt_cache = None
+try:
+    # Batched KV caches arrived in mlx_lm 0.28; without them step_batch falls back to one sequence at a time
+    import mlx.core as mx
+    from mlx_lm.models.cache import BatchKVCache, KVCache
+except ImportError:
+    mx = None
+    BatchKVCache = None
+    KVCache = None
 
 logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
 
-class LLMClient:
+@dataclass
+class GenerationStats:
+    """Latency and throughput of a single generation."""
+    prompt_tokens: int = 0
+    cached_prompt_tokens: int = 0 # Prompt tokens whose prefill was skipped thanks to the prefix cache
+    generation_tokens: int = 0
+    time_to_first_token: Optional[float] = None
+    tokens_per_second: float = 0.0
+    total_seconds: float = 0.0
+
+    def finish(self, start_time: float):
+        """Fills in the totals once a generation that began at `start_time` (perf_counter) ends."""
+        self.total_seconds = time.perf_counter() - start_time
+        decode_seconds = self.total_seconds - (self.time_to_first_token or 0.0)
+        if self.generation_tokens > 1 and decode_seconds > 0:
+            self.tokens_per_second = (self.generation_tokens - 1) / decode_seconds
+
+    def summary(self) -> str:
+        return (
+            f"{self.generation_tokens} tokens in {self.total_seconds:.2f}s "
+            f"(first token {self.time_to_first_token or 0.0:.2f}s, {self.tokens_per_second:.1f} tokens/s, "
+            f"{self.cached_prompt_tokens}/{self.prompt_tokens} prompt tokens from cache)"
+        )
+
+
+# Marks the end of a token stream handed from the generation thread to the event loop
+_END_OF_STREAM = object()
+
+
+def _kv_cache_length(kv_cache) -> int:
+    """Number of tokens held by an mlx_lm per-layer KV cache list."""
+    return kv_cache[0].offset
+
+
+def _kv_cache_nbytes(kv_cache) -> int:
+    """Memory held by an mlx_lm per-layer KV cache list."""
+    return sum(array.nbytes for layer in kv_cache for array in layer.state if array is not None)
+
+
+# Prompt tokens run through the model per forward pass when a sequence joins the batch
+_PREFILL_STEP = 2048
+
+
+class BaseLLMClient:
+    """
+    Streaming and whole-response generation shared by the LLM backends.
+    Subclasses load a model and implement `iter_deltas`, a blocking
+    generator of text deltas (one per token), which is also what
+    LLMScheduler drives; one that can decode several sequences in a single
+    forward pass also implements `step_batch` (see LLMClient).
+    `max_concurrent_sequences` caps how many sequences the scheduler may
+    interleave on the backend (None: no limit).
+    """
+    model = None
+    prompt_cache = None
+    max_concurrent_sequences: Optional[int] = None
+
+    def is_loaded(self) -> bool:
+        return self.model is not None
+
+    def warm_up(self):
+        """Decodes one token, so the first real request finds the kernels compiled."""
+        for _ in self.iter_deltas("Hello", max_tokens=1):
+            pass
+
+    def prompt_cache_stats(self) -> Dict[str, float]:
+        """Hit-rate and saved-prefill counters of the prompt-prefix cache (empty when disabled)."""
+        return self.prompt_cache.stats() if self.prompt_cache is not None else {}
+
+    def iter_deltas(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: int = 512,
+        stats: Optional[GenerationStats] = None,
+    ) -> Iterator[str]:
+        raise NotImplementedError
+
+    async def stream_text(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: int = 512,
+        stats: Optional[GenerationStats] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Generates text like `generate_text`, yielding text deltas as soon as the
+        model produces them. Decoding runs on the LLM executor (see
+        model_executor); if the consumer stops iterating early, or is cancelled,
+        generation is stopped at the next token. A generation still unfinished
+        after `timeout` seconds (LLM_TIMEOUT_SECONDS by default) is stopped and
+        ModelTimeoutError raised. Pass a GenerationStats to receive
+        time-to-first-token and tokens/sec.
+        """
+        if not self.is_loaded():
+            raise RuntimeError("LLM model or tokenizer not loaded.")
+
+        stats = stats if stats is not None else GenerationStats()
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        executor = get_model_executor("llm")
+        timeout = executor.timeout if timeout is None else timeout
+
+        logger.info(f"Streaming text for prompt (first 50 chars): '{prompt[:50]}...'")
+        start_time = time.perf_counter()
+
+        def produce():
+            if stop.is_set():
+                # Given up on while waiting for a thread
+                loop.call_soon_threadsafe(queue.put_nowait, _END_OF_STREAM)
+                return
+            deltas = self.iter_deltas(prompt, system_prompt=system_prompt, max_tokens=max_tokens, stats=stats)
+            try:
+                for delta in deltas:
+                    if stop.is_set():
+                        break
+                    if delta:
+                        loop.call_soon_threadsafe(queue.put_nowait, delta)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                deltas.close()
+                loop.call_soon_threadsafe(queue.put_nowait, _END_OF_STREAM)
+
+        producer = executor.submit(produce)
+        deadline = start_time + timeout if timeout else None
+        try:
+            while True:
+                try:
+                    remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+                    item = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    raise ModelTimeoutError(f"Generation did not finish within {timeout:.1f}s.") from None
+                if item is _END_OF_STREAM:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                if stats.time_to_first_token is None:
+                    stats.time_to_first_token = time.perf_counter() - start_time
+                yield item
+        finally:
+            stop.set()
+            # A generation that never started is dropped; a running one ends at its next token
+            if not producer.cancel():
+                await asyncio.wrap_future(producer)
+            stats.finish(start_time)
+            logger.info(f"Streamed {stats.summary()}.")
+
+    async def generate_text(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: int = 512,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """
+        Generates text based on the given prompt using a chat template.
+
+        """
+        if not self.is_loaded():
+            logger.error("LLM model or tokenizer not loaded.")
+            return "Error: LLM model or tokenizer not loaded."
+
+        logger.info(f"Generating text for prompt (first 50 chars): '{prompt[:50]}...'")
+        start_time = time.time()
+        
+        try:
+            deltas = [
+                delta async for delta in self.stream_text(prompt, system_prompt=system_prompt, max_tokens=max_tokens, timeout=timeout)
+            ]
+            response = "".join(deltas)
+            
+            duration = time.time() - start_time
+            logger.info(f"LLM text generated in {duration:.2f} seconds.")
+            return response
+        except Exception as e:
+            logger.error(f"Error during LLM text generation: {e}", exc_info=True)
+            return f"Error: Could not generate text. Details logged. Error: {type(e).__name__}"
+
+
+class _MLXSequence:
+    """
+    One generation on LLMClient, returned by its `iter_deltas`. Iterating it
+    decodes on its own, through stream_generate; LLMClient.step_batch instead
+    decodes it together with other sequences. A sequence is driven one way
+    or the other, never both.
+    """
+    def __init__(self, client: "LLMClient", prompt_tokens: List[int], max_tokens: int, stats: GenerationStats):
+        self.client = client
+        self.prompt_tokens = prompt_tokens
+        self.max_tokens = max_tokens
+        self.stats = stats
+        self._single: Optional[Iterator[str]] = None
+        self.batched = False
+        self.finished = False
+        self.last_token: Optional[int] = None
+        self.detokenizer = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if self.batched:
+            raise RuntimeError("Sequence is being decoded by LLMClient.step_batch.")
+        if self._single is None:
+            self._single = self.client._iter_single(self.prompt_tokens, self.max_tokens, self.stats)
+        return next(self._single)
+
+    def accept(self, token: int) -> Any:
+        """Takes the token sampled for this sequence by a batch step; returns its text delta or FINISHED."""
+        from .llm_scheduler import FINISHED
+        if token in self.client.tokenizer.eos_token_ids:
+            self.finished = True
+            self.detokenizer.finalize()
+            return self.detokenizer.last_segment or FINISHED
+        self.last_token = token
+        self.stats.generation_tokens += 1
+        self.detokenizer.add_token(token)
+        if self.stats.generation_tokens >= self.max_tokens:
+            self.finished = True
+            self.detokenizer.finalize()
+        return self.detokenizer.last_segment
+
+    def close(self):
+        if self._single is not None:
+            self._single.close()
+        if self.batched:
+            self.client._leave_batch(self)
+        self.finished = True
+
+
+class LLMClient(BaseLLMClient):
     """
     Client for interacting with Language Models using MLX LM.
+
+    `step_batch` decodes the scheduler's active sequences in one forward pass
+    per token over a batched KV cache. A joining sequence is prefilled on its
+    own (reusing the prompt-prefix cache) and then merged into the batch;
+    a finished one is filtered out of it. Models whose layers do not all use
+    a plain KVCache (sliding-window or state-space layers), or mlx_lm
+    releases without BatchKVCache, step sequences one after another instead.
     """
-    def __init__(self, model_path: Optional[str] = None):
+    def __init__(self, model_path: Optional[str] = None, prompt_cache_bytes: Optional[int] = None):
         if not load:
             raise ImportError("mlx_lm library is required but not installed.")
         
         hf_token = getattr(settings, 'HUGGING_FACE_TOKEN', None)
         if hf_token:
             logger.info("Hugging Face token found. Logging in...")
+            from huggingface_hub import login
             login(token=hf_token)
         else:
             logger.warning("Hugging Face token not found in settings. Downloads may fail for gated models.")
@@ -39,48 +297,255 @@ class LLMClient:
             logger.error(f"Error loading LLM model '{self.model_path}': {e}", exc_info=True)
             raise
 
-    async def generate_text(
-        self,
-        prompt: str,
-        system_prompt: Optional[str] = None,
-        max_tokens: int = 512
-    ) -> str:
-        """
-        Generates text based on the given prompt using a chat template.
+        # Reuses the KV state of repeated prompt prefixes (system prompt, shared context)
+        prompt_cache_bytes = settings.LLM_PROMPT_CACHE_MAX_BYTES if prompt_cache_bytes is None else prompt_cache_bytes
+        self.prompt_cache = None
+        if prompt_cache_bytes > 0 and make_prompt_cache:
+            self.prompt_cache = PromptPrefixCache(
+                max_bytes=prompt_cache_bytes,
+                trim=trim_prompt_cache,
+                can_trim=can_trim_prompt_cache,
+                cache_length=_kv_cache_length,
+                cache_nbytes=_kv_cache_nbytes,
+            )
 
-        """
-        if not self.model or not self.tokenizer:
-            logger.error("LLM model or tokenizer not loaded.")
-            return "Error: LLM model or tokenizer not loaded."
+        # Sequences decoded together by step_batch, in the row order of the batched KV cache
+        self._batch: List[_MLXSequence] = []
+        self._batch_cache = None
+        self.supports_batching = BatchKVCache is not None and all(
+            isinstance(layer, KVCache) for layer in make_prompt_cache(self.model)
+        )
+        if not self.supports_batching:
+            logger.warning("This model or mlx_lm version cannot decode sequences in a batch; they will be interleaved.")
 
-        # Prepare messages for the chat template
+    def _encode_prompt(self, prompt: str, system_prompt: Optional[str] = None) -> List[int]:
+        """Applies the model's chat template to the system and user messages and tokenizes the result."""
         messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": prompt})
-
-        # Apply the chat template to format the prompt correctly for the model
-        formatted_prompt = self.tokenizer.apply_chat_template(
+        return list(self.tokenizer.apply_chat_template(
             messages,
-            tokenize=False,
+            tokenize=True,
             add_generation_prompt=True
-        )
+        ))
 
-        logger.info(f"Generating text for prompt (first 50 chars): '{prompt[:50]}...'")
-        start_time = time.time()
-        
+    def iter_deltas(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: int = 512,
+        stats: Optional[GenerationStats] = None,
+    ) -> Iterator[str]:
+        """
+        Blocking iterator of text deltas for one prompt. Each `next()` decodes
+        one token, which lets a scheduler interleave several sequences; the
+        iterator can also be handed to `step_batch`. The KV cache is reused
+        from, and returned to, the prompt-prefix cache; closing the iterator
+        early still returns it.
+        """
+        if not self.model or not self.tokenizer:
+            raise RuntimeError("LLM model or tokenizer not loaded.")
+        stats = stats if stats is not None else GenerationStats()
+        return _MLXSequence(self, self._encode_prompt(prompt, system_prompt), max_tokens, stats)
+
+    def _fetch_kv_cache(self, prompt_tokens: List[int], stats: GenerationStats):
+        """Returns (kv_cache, reused_tokens) for a prompt: a cached prefix, a fresh cache, or (None, 0) without a prompt cache."""
+        kv_cache, reused = None, 0
+        if self.prompt_cache is not None:
+            kv_cache, reused = self.prompt_cache.fetch(prompt_tokens)
+            if kv_cache is None:
+                kv_cache = make_prompt_cache(self.model)
+        stats.cached_prompt_tokens = reused
+        return kv_cache, reused
+
+    def _iter_single(self, prompt_tokens: List[int], max_tokens: int, stats: GenerationStats) -> Iterator[str]:
+        kv_cache, reused = self._fetch_kv_cache(prompt_tokens, stats)
+        cache_kwargs = {"prompt_cache": kv_cache} if kv_cache is not None else {}
+
+        failed = False
         try:
-            response = generate(
-                self.model, 
-                self.tokenizer, 
-                prompt=formatted_prompt, 
+            # Only the tokens after the reused prefix need to be prefilled
+            for response in stream_generate(
+                self.model,
+                self.tokenizer,
+                prompt=prompt_tokens[reused:],
                 max_tokens=max_tokens,
-                verbose=False
-            )
-            
-            duration = time.time() - start_time
-            logger.info(f"LLM text generated in {duration:.2f} seconds.")
-            return response
+                **cache_kwargs,
+            ):
+                stats.prompt_tokens = reused + response.prompt_tokens
+                stats.generation_tokens = response.generation_tokens
+                yield response.text
+        except Exception:
+            failed = True
+            raise
+        finally:
+            # A cache left mid-update by an error is not safe to reuse
+            if kv_cache is not None and not failed:
+                self.prompt_cache.store(prompt_tokens, kv_cache)
+
+    def step_batch(self, sequences: List[_MLXSequence]) -> List[Any]:
+        """
+        LLMScheduler batch step: one forward pass decodes a token for every
+        sequence already in the batch, then newly admitted sequences are
+        prefilled and join it. Same contract as llm_scheduler.step_each.
+        """
+        # Imported here: llm_scheduler imports this module
+        from .llm_scheduler import FINISHED, step_each
+        if not self.supports_batching:
+            return step_each(sequences)
+
+        results: Dict[int, Any] = {}
+        for sequence in sequences:
+            if sequence.finished:
+                results[id(sequence)] = FINISHED
+        try:
+            if self._batch:
+                for sequence, token in zip(list(self._batch), self._decode_batch()):
+                    results[id(sequence)] = sequence.accept(token)
+            joining = [s for s in sequences if id(s) not in results and s._single is None and not s.batched]
+            for sequence in joining:
+                results[id(sequence)] = sequence.accept(self._join_batch(sequence))
+        except Exception:
+            # The batched cache may be half-updated; every sequence in it fails with this step
+            for sequence in self._batch:
+                sequence.batched = False
+            self._batch, self._batch_cache = [], None
+            raise
+        for sequence in [s for s in self._batch if s.finished]:
+            self._leave_batch(sequence)
+
+        # A sequence that was already being iterated on its own keeps going that way
+        rest = [s for s in sequences if id(s) not in results]
+        for sequence, result in zip(rest, step_each(rest)):
+            results[id(sequence)] = result
+        return [results[id(s)] for s in sequences]
+
+    def _decode_batch(self) -> List[int]:
+        """Runs the last token of every batched sequence through the model in one forward pass; returns the next tokens (greedy)."""
+        inputs = mx.array([[sequence.last_token] for sequence in self._batch])
+        logits = self.model(inputs, cache=self._batch_cache)[:, -1, :]
+        return mx.argmax(logits, axis=-1).tolist()
+
+    def _join_batch(self, sequence: _MLXSequence) -> int:
+        """Prefills a sequence's prompt, stores it in the prompt-prefix cache and merges its KV state into the batch; returns its first token."""
+        stats = sequence.stats
+        kv_cache, reused = self._fetch_kv_cache(sequence.prompt_tokens, stats)
+        if kv_cache is None:
+            kv_cache = make_prompt_cache(self.model)
+        stats.prompt_tokens = len(sequence.prompt_tokens)
+
+        inputs = mx.array(sequence.prompt_tokens[reused:])[None]
+        while inputs.shape[1] > 1:
+            n = min(_PREFILL_STEP, inputs.shape[1] - 1)
+            self.model(inputs[:, :n], cache=kv_cache)
+            mx.eval([layer.state for layer in kv_cache])
+            inputs = inputs[:, n:]
+        logits = self.model(inputs, cache=kv_cache)[:, -1, :]
+        token = mx.argmax(logits, axis=-1).item()
+
+        # A one-row batched cache over copies of the keys and values, since the
+        # prompt-prefix cache entry can be handed out and updated again
+        batch_cache = []
+        for layer in kv_cache:
+            keys, values = layer.state
+            row = BatchKVCache([0])
+            row.state = (mx.array(keys), mx.array(values), mx.array([layer.offset]), mx.array([0]))
+            batch_cache.append(row)
+        if self.prompt_cache is not None:
+            self.prompt_cache.store(sequence.prompt_tokens, kv_cache)
+
+        if self._batch_cache is None:
+            self._batch_cache = batch_cache
+        else:
+            for layer, row in zip(self._batch_cache, batch_cache):
+                layer.extend(row)
+        self._batch.append(sequence)
+        sequence.batched = True
+        sequence.detokenizer = self.tokenizer.detokenizer
+        sequence.detokenizer.reset()
+        return token
+
+    def _leave_batch(self, sequence: _MLXSequence):
+        """Drops a sequence's row from the batched KV cache."""
+        keep = [i for i, s in enumerate(self._batch) if s is not sequence]
+        if len(keep) == len(self._batch):
+            return
+        sequence.batched = False
+        if not keep:
+            self._batch, self._batch_cache = [], None
+            return
+        indices = mx.array(keep)
+        for layer in self._batch_cache:
+            layer.filter(indices)
+        self._batch = [self._batch[i] for i in keep]
+
+    def is_loaded(self) -> bool:
+        return self.model is not None and self.tokenizer is not None
+
+
+class LlamaCppLLMClient(BaseLLMClient):
+    """
+    Client for Language Models on CPU using llama.cpp (llama-cpp-python) and
+    quantized GGUF weights. `model_path` is a local .gguf file or a Hugging
+    Face repository to download `model_file` from. llama.cpp reuses the KV
+    cache of the longest prefix shared with the previous prompt by itself.
+    One context decodes one sequence at a time, so requests are serialized.
+    """
+    max_concurrent_sequences = 1
+
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        model_file: Optional[str] = None,
+        context_length: Optional[int] = None,
+        threads: Optional[int] = None,
+    ):
+        try:
+            from llama_cpp import Llama
+        except ImportError as e:
+            raise ImportError("llama-cpp-python library is required for LlamaCppLLMClient (pip install llama-cpp-python).") from e
+
+        self.model_path = model_path or settings.LLM_GGUF_MODEL_PATH
+        model_file = model_file or settings.LLM_GGUF_FILE
+        options = {
+            "n_ctx": context_length or settings.LLM_CONTEXT_LENGTH,
+            "n_threads": threads or settings.LLM_CPU_THREADS or None, # None: llama.cpp's default
+            "verbose": False,
+        }
+        self._lock = threading.Lock()
+        logger.info(f"Initializing LlamaCppLLMClient with model: {self.model_path}")
+        try:
+            if os.path.isfile(self.model_path):
+                self.model = Llama(model_path=self.model_path, **options)
+            else:
+                self.model = Llama.from_pretrained(repo_id=self.model_path, filename=model_file, **options)
+            logger.info(f"GGUF model '{self.model_path}' loaded successfully.")
         except Exception as e:
-            logger.error(f"Error during LLM text generation: {e}", exc_info=True)
-            return f"Error: Could not generate text. Details logged. Error: {type(e).__name__}"
\ No newline at end of file
+            logger.error(f"Error loading GGUF model '{self.model_path}': {e}", exc_info=True)
+            raise
+
+    def iter_deltas(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: int = 512,
+        stats: Optional[GenerationStats] = None,
+    ) -> Iterator[str]:
+        """Blocking generator of text deltas for one prompt; holds the model until closed."""
+        if not self.model:
+            raise RuntimeError("LLM model not loaded.")
+        stats = stats if stats is not None else GenerationStats()
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        with self._lock:
+            # Without the chat template, so a close estimate
+            stats.prompt_tokens = sum(len(self.model.tokenize(m["content"].encode("utf-8"), add_bos=False)) for m in messages)
+            for chunk in self.model.create_chat_completion(messages=messages, max_tokens=max_tokens, stream=True):
+                delta = chunk["choices"][0]["delta"].get("content")
+                if delta:
+                    stats.generation_tokens += 1
+                    yield delta
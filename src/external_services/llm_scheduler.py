@@ -0,0 +1,284 @@
+# src/external_services/llm_scheduler.py
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional
+from ..config import settings
+from ..utils.logger_config import setup_logger
+from .llm_client import GenerationStats
+from .model_executor import ModelTimeoutError
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+# Marks the end of a request's token stream on its asyncio queue
+_END_OF_STREAM = object()
+
+# Returned by a batch step for a sequence that has no more tokens
+FINISHED = object()
+
+
+class SchedulerOverloadedError(RuntimeError):
+    """Raised when a request arrives while the scheduler's wait queue is full."""
+
+
+@dataclass
+class _Request:
+    prompt: str
+    system_prompt: Optional[str]
+    max_tokens: int
+    stats: GenerationStats
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue
+    submitted_at: float = field(default_factory=time.perf_counter)
+    iterator: Optional[Iterator[str]] = None
+    tokens: int = 0
+    cancelled: bool = False
+
+    def deliver(self, item: Any):
+        # The consumer's loop may already be gone if its session ended mid-stream
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+
+
+def step_each(iterators: List[Iterator[str]]) -> List[Any]:
+    """
+    Default batch step: advances every sequence by one token in turn. Each
+    result is the text delta, FINISHED, or the exception the sequence raised.
+    """
+    results = []
+    for iterator in iterators:
+        try:
+            results.append(next(iterator))
+        except StopIteration:
+            results.append(FINISHED)
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+class LLMScheduler:
+    """
+    Serves concurrent generation requests from a single decode thread using
+    continuous (iteration-level) batching.
+
+    Requests wait in a bounded FIFO queue and join the running batch as soon
+    as a slot frees up, rather than waiting for the whole batch to finish.
+    Every iteration advances each active sequence by one token, so a long
+    answer no longer blocks a short one queued behind it.
+
+    The backend must provide `iter_deltas(prompt, system_prompt, max_tokens,
+    stats)` returning a blocking iterator of text deltas (one per token), as
+    LLMClient does. A backend that can run one forward pass over several
+    sequences may also provide `step_batch(iterators)` with the same contract
+    as `step_each`, as the MLX client does; otherwise sequences are stepped
+    one after another (llama.cpp), which improves time-to-first-token under
+    load but not total tokens/s (see tests/llm_scheduler_benchmark.py). A
+    backend's `max_concurrent_sequences`, if set, caps the batch size.
+    """
+
+    def __init__(
+        self,
+        backend,
+        max_batch_size: Optional[int] = None,
+        max_queued_requests: Optional[int] = None,
+    ):
+        self.backend = backend
+        self.max_batch_size = max_batch_size or settings.LLM_MAX_BATCH_SIZE
+        backend_limit = getattr(backend, "max_concurrent_sequences", None)
+        if backend_limit:
+            # e.g. llama.cpp: one context cannot interleave sequences
+            self.max_batch_size = min(self.max_batch_size, backend_limit)
+        self.max_queued_requests = max_queued_requests or settings.LLM_MAX_QUEUED_REQUESTS
+        self._step = getattr(backend, "step_batch", None) or step_each
+        self._pending: Deque[_Request] = deque()
+        self._active: List[_Request] = []
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.steps = 0
+        self.completed_requests = 0
+        self.generated_tokens = 0
+        self._batch_size_total = 0
+
+    def start(self):
+        """Starts the decode thread (done automatically on the first request)."""
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="llm-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stops the decode thread; requests still waiting or running are cancelled."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _submit(self, prompt: str, system_prompt: Optional[str], max_tokens: int, stats: GenerationStats) -> _Request:
+        request = _Request(
+            prompt=prompt,
+            system_prompt=system_prompt,
+            max_tokens=max_tokens,
+            stats=stats,
+            loop=asyncio.get_running_loop(),
+            queue=asyncio.Queue(),
+        )
+        self.start()
+        with self._condition:
+            if len(self._pending) >= self.max_queued_requests:
+                raise SchedulerOverloadedError(
+                    f"LLM scheduler queue is full ({self.max_queued_requests} requests waiting)."
+                )
+            self._pending.append(request)
+            self._condition.notify()
+        return request
+
+    def _cancel(self, request: _Request):
+        with self._condition:
+            request.cancelled = True
+            self._condition.notify()
+
+    async def stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: int = 512,
+        stats: Optional[GenerationStats] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Queues a prompt and yields its text deltas as the batch decodes them.
+        Leaving the loop early (or cancelling the task) frees the request's
+        batch slot at the next iteration, as does a request still unfinished
+        after `timeout` seconds (None or 0 waits indefinitely), which raises
+        ModelTimeoutError. Time-to-first-token in `stats` and the timeout
+        both include the time spent waiting in the queue.
+        """
+        stats = stats if stats is not None else GenerationStats()
+        request = self._submit(prompt, system_prompt, max_tokens, stats)
+        deadline = request.submitted_at + timeout if timeout else None
+        try:
+            while True:
+                try:
+                    remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+                    item = await asyncio.wait_for(request.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    raise ModelTimeoutError(f"Generation did not finish within {timeout:.1f}s.") from None
+                if item is _END_OF_STREAM:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                if stats.time_to_first_token is None:
+                    stats.time_to_first_token = time.perf_counter() - request.submitted_at
+                yield item
+        finally:
+            self._cancel(request)
+            stats.finish(request.submitted_at)
+
+    async def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: int = 512,
+        stats: Optional[GenerationStats] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """Queues a prompt and returns the full response once it is decoded."""
+        return "".join([delta async for delta in self.stream(prompt, system_prompt, max_tokens, stats, timeout)])
+
+    def stats(self) -> Dict[str, float]:
+        """Queue depth and batching counters."""
+        with self._condition:
+            return {
+                "queued": len(self._pending),
+                "active": len(self._active),
+                "completed_requests": self.completed_requests,
+                "generated_tokens": self.generated_tokens,
+                "steps": self.steps,
+                "mean_batch_size": self._batch_size_total / self.steps if self.steps else 0.0,
+            }
+
+    # --- Decode thread ---
+
+    def _finish(self, request: _Request, error: Optional[Exception] = None):
+        if request.iterator is not None:
+            try:
+                # Closing lets the backend release or cache the sequence's KV state
+                request.iterator.close()
+            except Exception as e:
+                logger.warning(f"Error while closing a generation: {e}")
+        if error is not None:
+            request.deliver(error)
+        request.deliver(_END_OF_STREAM)
+        self.completed_requests += 1
+
+    def _admit(self) -> bool:
+        """Moves waiting requests into free batch slots; returns False when stopping."""
+        with self._condition:
+            while not self._stopping and not self._pending and not self._active:
+                self._condition.wait()
+            if self._stopping:
+                return False
+            for request in [r for r in self._active if r.cancelled]:
+                self._active.remove(request)
+                self._finish(request)
+            while self._pending and len(self._active) < self.max_batch_size:
+                request = self._pending.popleft()
+                if request.cancelled:
+                    self._finish(request)
+                    continue
+                self._active.append(request)
+        return True
+
+    def _run(self):
+        logger.info(f"LLM scheduler started (max batch size {self.max_batch_size}).")
+        while self._admit():
+            batch = list(self._active)
+            if not batch:
+                continue
+            iterators = []
+            for request in batch:
+                if request.iterator is None:
+                    # Newly admitted: its first step prefills the prompt
+                    request.iterator = self.backend.iter_deltas(
+                        request.prompt,
+                        system_prompt=request.system_prompt,
+                        max_tokens=request.max_tokens,
+                        stats=request.stats,
+                    )
+                iterators.append(request.iterator)
+
+            try:
+                results = self._step(iterators)
+            except Exception as e:
+                logger.error(f"Batch decode step failed: {e}", exc_info=True)
+                results = [e] * len(batch)
+            self.steps += 1
+            self._batch_size_total += len(batch)
+
+            with self._condition:
+                for request, result in zip(batch, results):
+                    if result is FINISHED or isinstance(result, Exception):
+                        self._active.remove(request)
+                        self._finish(request, result if isinstance(result, Exception) else None)
+                        continue
+                    request.tokens += 1
+                    self.generated_tokens += 1
+                    if result:
+                        request.deliver(result)
+                    if request.tokens >= request.max_tokens:
+                        self._active.remove(request)
+                        self._finish(request)
+
+        with self._condition:
+            for request in self._active + list(self._pending):
+                self._finish(request)
+            self._active.clear()
+            self._pending.clear()
+        logger.info("LLM scheduler stopped.")
@@ -0,0 +1,111 @@
+# src/external_services/model_executor.py
+import asyncio
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from ..config import settings
+from ..utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+
+class ModelTimeoutError(TimeoutError):
+    """Raised when a model call does not finish within its timeout."""
+
+
+class ModelExecutor(Executor):
+    """
+    A bounded thread pool dedicated to one model.
+
+    Every blocking model call goes through its model's executor, so the
+    event loop never runs model code, and a slow model (a long transcription)
+    can only tie up its own `max_workers` threads and never those of another
+    (chat). `run` awaits a call with a timeout. A call still waiting for a
+    thread when it times out or is cancelled is dropped without running. A
+    call already running cannot be interrupted from outside; it finishes in
+    the background and its result is discarded. Calls that can stop early
+    (token streams, segmented transcription) check a flag instead.
+    """
+
+    def __init__(self, name: str, max_workers: int = 1, timeout: Optional[float] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.timeout = timeout # Default for `run`; None or 0 waits indefinitely
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-model")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.timed_out = 0
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        """Schedules a call and returns its concurrent Future, like any Executor."""
+        def call():
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.running -= 1
+
+        with self._lock:
+            self.queued += 1
+        future = self._executor.submit(call)
+        # A call cancelled before it started never decrements `queued` itself
+        future.add_done_callback(lambda f: self._on_cancelled() if f.cancelled() else None)
+        return future
+
+    def _on_cancelled(self):
+        with self._lock:
+            self.queued -= 1
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Runs `fn(*args, **kwargs)` on this model's threads and awaits its result."""
+        timeout = self.timeout if timeout is None else timeout
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or None)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            logger.warning(f"{self.name} model call timed out after {timeout:.1f}s.")
+            raise ModelTimeoutError(f"The {self.name} model did not answer within {timeout:.1f}s.") from None
+        finally:
+            # Drops the call if it is still queued (after a timeout or cancellation)
+            future.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"workers": self.max_workers, "queued": self.queued, "running": self.running, "timed_out": self.timed_out}
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+_EXECUTORS: Dict[str, ModelExecutor] = {}
+_EXECUTORS_LOCK = threading.Lock()
+
+
+def _executor_settings(modality: str):
+    return {
+        "asr": (settings.ASR_EXECUTOR_WORKERS, settings.ASR_TIMEOUT_SECONDS),
+        "llm": (settings.LLM_EXECUTOR_WORKERS, settings.LLM_TIMEOUT_SECONDS),
+        "tts": (settings.TTS_EXECUTOR_WORKERS, settings.TTS_TIMEOUT_SECONDS),
+        "embedding": (settings.EMBEDDING_EXECUTOR_WORKERS, settings.EMBEDDING_TIMEOUT_SECONDS),
+    }[modality]
+
+
+def get_model_executor(modality: str) -> ModelExecutor:
+    """The process-wide executor for "asr", "llm", "tts" or "embedding", sized from Settings."""
+    with _EXECUTORS_LOCK:
+        executor = _EXECUTORS.get(modality)
+        if executor is None:
+            max_workers, timeout = _executor_settings(modality)
+            executor = _EXECUTORS[modality] = ModelExecutor(modality, max_workers=max_workers, timeout=timeout)
+        return executor
+
+
+def model_executor_stats() -> Dict[str, Dict[str, int]]:
+    """Queue depth and thread use of every model executor created so far."""
+    with _EXECUTORS_LOCK:
+        return {name: executor.stats() for name, executor in _EXECUTORS.items()}
@@ -0,0 +1,147 @@
+# src/external_services/model_pool.py
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, List, Optional
+from ..config import settings
+from ..utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+# Readiness states of a model in the pool
+NOT_LOADED = "not loaded"
+LOADING = "loading"
+WARMING_UP = "warming up"
+READY = "ready"
+FAILED = "failed"
+
+
+@dataclass
+class ModelStatus:
+    """Readiness of one model; times are seconds, `started_at` relative to the pool's creation."""
+    name: str
+    state: str = NOT_LOADED
+    eager: bool = False
+    started_at: Optional[float] = None
+    load_seconds: Optional[float] = None
+    warmup_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def ready_at(self) -> Optional[float]:
+        if self.state != READY:
+            return None
+        return self.started_at + self.load_seconds + (self.warmup_seconds or 0.0)
+
+
+class _Entry:
+    def __init__(self, name: str, loader: Callable[[], Any], eager: bool):
+        self.loader = loader
+        self.status = ModelStatus(name=name, eager=eager)
+        self.future: Optional[Future] = None
+
+
+class ModelWarmPool:
+    """
+    Loads models in background threads and tracks their readiness.
+
+    Models registered as `eager` start loading, all at once, when `start()`
+    is called; the others load on their first `get()`. After loading, a
+    model's `warm_up()` (if it has one) runs a tiny inference so kernel
+    compilation and lazy initialization are not paid by the first request.
+    `get(name)` blocks until the model is ready and re-raises a failed load;
+    the next `get` after a failure tries again. `profile_report()` breaks
+    startup time down per model.
+    """
+
+    def __init__(self, warm_up: Optional[bool] = None, max_workers: int = 4):
+        self.warm_up = settings.MODEL_WARMUP if warm_up is None else warm_up
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-load")
+        self._created = time.perf_counter()
+
+    def register(self, name: str, loader: Callable[[], Any], eager: bool = False):
+        """Adds a model; `loader()` returns the loaded client."""
+        with self._lock:
+            self._entries[name] = _Entry(name, loader, eager)
+
+    def start(self):
+        """Starts loading every eager model in the background; returns immediately."""
+        eager = [name for name, entry in self._entries.items() if entry.status.eager]
+        futures = [self.load(name) for name in eager]
+        if futures:
+            logger.info(f"Loading {', '.join(eager)} in the background...")
+            threading.Thread(target=self._report_when_done, args=(futures,), name="model-load-report", daemon=True).start()
+
+    def _report_when_done(self, futures: List[Future]):
+        wait(futures)
+        logger.info(f"Startup profile:\n{self.profile_report()}")
+
+    def load(self, name: str) -> Future:
+        """Starts loading a model unless it is loaded or loading already; returns its future."""
+        with self._lock:
+            entry = self._entries[name]
+            if entry.future is not None and not (entry.future.done() and entry.future.exception() is not None):
+                return entry.future
+            entry.status = ModelStatus(name=name, eager=entry.status.eager, state=LOADING,
+                                       started_at=time.perf_counter() - self._created)
+            entry.future = self._executor.submit(self._load, entry)
+            return entry.future
+
+    def _load(self, entry: _Entry) -> Any:
+        status = entry.status
+        start = time.perf_counter()
+        try:
+            client = entry.loader()
+        except Exception as e:
+            status.load_seconds = time.perf_counter() - start
+            status.state = FAILED
+            status.error = f"{type(e).__name__}: {e}"
+            logger.error(f"Loading model '{status.name}' failed: {status.error}", exc_info=True)
+            raise
+        status.load_seconds = time.perf_counter() - start
+
+        warm_up = getattr(client, "warm_up", None)
+        if self.warm_up and warm_up is not None:
+            status.state = WARMING_UP
+            start = time.perf_counter()
+            try:
+                warm_up()
+            except Exception as e:
+                # The model itself loaded; a failed warm-up only costs the first request some time
+                logger.warning(f"Warm-up of model '{status.name}' failed: {e}")
+            status.warmup_seconds = time.perf_counter() - start
+        status.state = READY
+        logger.info(f"Model '{status.name}' ready in {status.load_seconds + (status.warmup_seconds or 0.0):.2f}s.")
+        return client
+
+    def get(self, name: str, timeout: Optional[float] = None) -> Any:
+        """Returns the loaded model, loading it first (and waiting up to `timeout` seconds) if needed."""
+        return self.load(name).result(timeout)
+
+    def is_ready(self, name: str) -> bool:
+        return self._entries[name].status.state == READY
+
+    def status(self, name: str) -> ModelStatus:
+        return replace(self._entries[name].status)
+
+    def statuses(self) -> List[ModelStatus]:
+        return [replace(entry.status) for entry in self._entries.values()]
+
+    def profile_report(self) -> str:
+        """Per-model load and warm-up times, and when each model became ready."""
+        lines = [f"{'model':<11} {'state':<11} {'start (s)':>9} {'load (s)':>9} {'warm-up (s)':>11} {'ready at (s)':>12}"]
+        for status in self.statuses():
+            columns = [status.started_at, status.load_seconds, status.warmup_seconds, status.ready_at]
+            start, load, warmup, ready = (f"{c:.2f}" if c is not None else "-" for c in columns)
+            lines.append(f"{status.name:<11} {status.state:<11} {start:>9} {load:>9} {warmup:>11} {ready:>12}")
+        busy = sum((s.load_seconds or 0.0) + (s.warmup_seconds or 0.0) for s in self.statuses())
+        ready_times = [s.ready_at for s in self.statuses() if s.ready_at is not None]
+        if ready_times:
+            lines.append(f"Loading took {busy:.2f}s in total and finished {max(ready_times):.2f}s after startup.")
+        return "\n".join(lines)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
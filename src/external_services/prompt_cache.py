@@ -0,0 +1,154 @@
+# src/external_services/prompt_cache.py
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+import numpy as np
+from ..config import settings
+from ..utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+
+def prefix_key(tokens: Sequence[int]) -> str:
+    """Hashes a token sequence into a cache key."""
+    return hashlib.sha1(np.asarray(tokens, dtype=np.int64).tobytes()).hexdigest()
+
+
+def common_prefix_length(a: np.ndarray, b: np.ndarray) -> int:
+    """Returns the number of leading tokens two sequences share."""
+    n = min(a.shape[0], b.shape[0])
+    if n == 0:
+        return 0
+    mismatches = np.flatnonzero(a[:n] != b[:n])
+    return int(mismatches[0]) if mismatches.size else n
+
+
+@dataclass
+class _Entry:
+    tokens: np.ndarray
+    kv_cache: Any
+    nbytes: int
+
+
+class PromptPrefixCache:
+    """
+    LRU cache of model KV state keyed by the hash of the prompt tokens that
+    produced it, capped by total memory.
+
+    `fetch` finds the entry sharing the longest token prefix with a new prompt
+    and hands it out for exclusive use, trimmed back to the shared prefix, so
+    generation only needs to prefill the remaining tokens. After generation
+    the caller `store`s the cache again under the new prompt. Model-specific
+    operations are injected so the structure works with any KV cache type.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        trim: Callable[[Any, int], int],
+        can_trim: Callable[[Any], bool],
+        cache_length: Callable[[Any], int],
+        cache_nbytes: Callable[[Any], int],
+        min_prefix_tokens: int = 16,
+    ):
+        self.max_bytes = max_bytes
+        self.trim = trim
+        self.can_trim = can_trim
+        self.cache_length = cache_length
+        self.cache_nbytes = cache_nbytes
+        self.min_prefix_tokens = min_prefix_tokens
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_prefill_tokens = 0
+        self.total_prompt_tokens = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def fetch(self, tokens: Sequence[int]) -> Tuple[Optional[Any], int]:
+        """
+        Returns (kv_cache, reused_tokens) for a prompt. On a miss the cache is
+        None and no tokens are reused. At least one prompt token is always left
+        for the model to process, since generation starts from its logits.
+        """
+        tokens = np.asarray(tokens, dtype=np.int64)
+        with self._lock:
+            self.total_prompt_tokens += tokens.shape[0]
+            best_key, best_length = None, 0
+            for key, entry in self._entries.items():
+                length = common_prefix_length(entry.tokens, tokens)
+                if length > best_length:
+                    best_key, best_length = key, length
+
+            reused = min(best_length, tokens.shape[0] - 1)
+            if best_key is None or reused < self.min_prefix_tokens:
+                self.misses += 1
+                return None, 0
+
+            entry = self._entries[best_key]
+            excess = self.cache_length(entry.kv_cache) - reused
+            if excess > 0 and not self.can_trim(entry.kv_cache):
+                self.misses += 1
+                return None, 0
+
+            # Hand the entry out exclusively; it comes back through `store`
+            del self._entries[best_key]
+            self._bytes -= entry.nbytes
+            if excess > 0:
+                self.trim(entry.kv_cache, excess)
+            self.hits += 1
+            self.saved_prefill_tokens += reused
+            return entry.kv_cache, reused
+
+    def store(self, tokens: Sequence[int], kv_cache: Any):
+        """
+        Stores a KV cache for a prompt, trimming away any generated tokens so
+        it holds exactly the prompt, then evicts least-recently-used entries
+        until the memory cap is met.
+        """
+        tokens = np.asarray(tokens, dtype=np.int64)
+        excess = self.cache_length(kv_cache) - tokens.shape[0]
+        if excess > 0:
+            if not self.can_trim(kv_cache):
+                return
+            self.trim(kv_cache, excess)
+        elif excess < 0:
+            # The cache holds fewer tokens than the prompt; keep only what it covers
+            tokens = tokens[:self.cache_length(kv_cache)]
+        if tokens.shape[0] < self.min_prefix_tokens:
+            return
+
+        nbytes = self.cache_nbytes(kv_cache)
+        if nbytes > self.max_bytes:
+            return
+        key = prefix_key(tokens)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._entries[key] = _Entry(tokens=tokens, kv_cache=kv_cache, nbytes=nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                logger.debug(f"Evicted a {evicted.tokens.shape[0]}-token prompt prefix from the KV cache.")
+
+    def stats(self) -> Dict[str, float]:
+        """Returns hit-rate and prefill savings counters."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_prefill_tokens": self.saved_prefill_tokens,
+            "saved_prefill_fraction": (
+                self.saved_prefill_tokens / self.total_prompt_tokens if self.total_prompt_tokens else 0.0
+            ),
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
@@ -0,0 +1,117 @@
+# src/external_services/query_cache.py
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+import numpy as np
+from ..config import settings
+from ..memory.answer_cache import normalize_question
+from ..utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+
+class QueryEmbeddingCache:
+    """
+    LRU cache of query embeddings, keyed by the model and the query text
+    (ignoring case and spacing, see normalize_question), so repeated questions
+    skip the forward pass.
+
+    With a `directory`, every embedding is also written there as a .npy file;
+    a memory miss falls back to disk, which lets the cache survive restarts
+    and be shared by several processes. The disk tier is not size-bounded.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, directory: Optional[str] = None):
+        self.max_entries = settings.QUERY_EMBEDDING_CACHE_SIZE if max_entries is None else max_entries
+        self.directory = settings.QUERY_EMBEDDING_CACHE_DIR if directory is None else directory
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\x1f{normalize_question(text)}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.npy")
+
+    def _remember(self, key: str, embedding: np.ndarray):
+        self._entries.pop(key, None)
+        self._entries[key] = embedding
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        """Returns a copy of the cached embedding, or None on a miss."""
+        key = self.make_key(model_name, text)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return embedding.copy()
+        if self.directory:
+            try:
+                embedding = np.load(self._path(key))
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logger.warning(f"Discarding unreadable query embedding {self._path(key)}: {e}")
+            else:
+                with self._lock:
+                    if self.max_entries > 0:
+                        self._remember(key, embedding)
+                    self.disk_hits += 1
+                return embedding.copy()
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, model_name: str, text: str, embedding: np.ndarray):
+        """Caches an embedding in memory and, if configured, on disk."""
+        key = self.make_key(model_name, text)
+        embedding = np.array(embedding, dtype=np.float32)
+        if self.max_entries > 0:
+            with self._lock:
+                self._remember(key, embedding)
+        if self.directory:
+            path = self._path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Written atomically so readers in other processes never see partial files
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        np.save(f, embedding)
+                    os.replace(tmp_path, path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+            except OSError as e:
+                logger.warning(f"Could not write query embedding to {path}: {e}")
+
+    def clear(self):
+        """Drops the in-memory entries (the disk tier is kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Returns hit counters and the current size."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
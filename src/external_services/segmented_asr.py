@@ -0,0 +1,296 @@
+# src/external_services/segmented_asr.py
+import asyncio
+import hashlib
+import json
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+import numpy as np
+from ..config import settings
+from ..utils.logger_config import setup_logger
+from .model_executor import ModelTimeoutError
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+SAMPLE_RATE = 16000 # Whisper's input rate
+FRAME_SECONDS = 0.03 # Resolution of the silence detector
+
+
+def load_audio(file_path: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Decodes any audio file ffmpeg can read to mono 16-bit PCM at `sample_rate`.
+    Samples stay int16 (half the memory of float32) until a segment is transcribed.
+    """
+    command = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", file_path,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-",
+    ]
+    try:
+        output = subprocess.run(command, capture_output=True, check=True).stdout
+    except FileNotFoundError as e:
+        raise RuntimeError("ffmpeg is required to decode audio files.") from e
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio: {e.stderr.decode(errors='replace').strip()}") from e
+    return np.frombuffer(output, dtype=np.int16)
+
+
+@dataclass
+class AudioWindow:
+    """A span of audio to transcribe on its own, in samples."""
+    index: int
+    start_sample: int
+    end_sample: int
+    sample_rate: int = SAMPLE_RATE
+
+    @property
+    def start(self) -> float:
+        return self.start_sample / self.sample_rate
+
+    @property
+    def end(self) -> float:
+        return self.end_sample / self.sample_rate
+
+
+@dataclass
+class TranscriptSegment:
+    """Transcript of one audio window; `start` and `end` are seconds into the file."""
+    index: int
+    start: float
+    end: float
+    text: str
+
+
+def frame_levels(audio: np.ndarray, frame_length: int, block_frames: int = 8192) -> np.ndarray:
+    """RMS level in dBFS of each full frame of int16 (or [-1, 1] float) audio, computed blockwise."""
+    scale = 32768.0 if audio.dtype == np.int16 else 1.0
+    frame_count = len(audio) // frame_length
+    levels = np.empty(frame_count, dtype=np.float32)
+    for first in range(0, frame_count, block_frames):
+        last = min(first + block_frames, frame_count)
+        frames = audio[first * frame_length:last * frame_length].astype(np.float32).reshape(-1, frame_length) / scale
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        levels[first:last] = 20 * np.log10(np.maximum(rms, 1e-10))
+    return levels
+
+
+def split_on_silence(
+    audio: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    max_seconds: Optional[float] = None,
+    min_silence_seconds: Optional[float] = None,
+    silence_db: Optional[float] = None,
+) -> List[AudioWindow]:
+    """
+    Energy-based voice activity detection: splits audio into windows of at
+    most `max_seconds`, cutting in the middle of pauses of at least
+    `min_silence_seconds` where possible (and hard-cutting a window that has
+    none). Windows without any frame louder than `silence_db` are dropped.
+    """
+    max_seconds = max_seconds or settings.ASR_SEGMENT_SECONDS
+    min_silence_seconds = settings.ASR_MIN_SILENCE_SECONDS if min_silence_seconds is None else min_silence_seconds
+    silence_db = settings.ASR_SILENCE_DB if silence_db is None else silence_db
+
+    frame_length = max(1, int(sample_rate * FRAME_SECONDS))
+    speech = frame_levels(audio, frame_length) > silence_db
+    if len(audio) % frame_length:
+        # The partial last frame (under 30 ms) takes the state of the frame before it
+        speech = np.append(speech, bool(speech[-1]) if len(speech) else True)
+    frame_count = len(speech)
+    max_frames = max(1, int(max_seconds / FRAME_SECONDS))
+    min_silence_frames = max(1, int(round(min_silence_seconds / FRAME_SECONDS)))
+
+    # Cut points: the middle of every long enough run of silent frames
+    edges = np.diff(np.concatenate(([1], speech.astype(np.int8), [1])))
+    run_starts, run_ends = np.flatnonzero(edges == -1), np.flatnonzero(edges == 1)
+    long_runs = run_ends - run_starts >= min_silence_frames
+    cuts = ((run_starts[long_runs] + run_ends[long_runs]) // 2).tolist()
+
+    windows: List[AudioWindow] = []
+    start, cut_position = 0, 0
+    while start < frame_count:
+        limit = start + max_frames
+        if limit >= frame_count:
+            end = frame_count
+        else:
+            while cut_position < len(cuts) and cuts[cut_position] <= limit:
+                cut_position += 1
+            # Last pause within reach, else a hard cut at the length limit
+            end = cuts[cut_position - 1] if cut_position and cuts[cut_position - 1] > start else limit
+        if speech[start:end].any():
+            windows.append(AudioWindow(
+                index=len(windows),
+                start_sample=start * frame_length,
+                end_sample=min(end * frame_length, len(audio)),
+                sample_rate=sample_rate,
+            ))
+        start = end
+    return windows
+
+
+class TranscriptCheckpoint:
+    """
+    Append-only JSON-lines record of the segments of one transcription that
+    are done, so an interrupted transcription resumes without redoing them.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock() # Windows finish in worker threads
+
+    def load(self) -> Dict[int, TranscriptSegment]:
+        segments: Dict[int, TranscriptSegment] = {}
+        if not os.path.exists(self.path):
+            return segments
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    segment = TranscriptSegment(**json.loads(line))
+                except (ValueError, TypeError):
+                    # A line cut short by a crash mid-write; that segment is simply redone
+                    continue
+                segments[segment.index] = segment
+        return segments
+
+    def append(self, segment: TranscriptSegment):
+        line = json.dumps(asdict(segment)) + "\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class SegmentedTranscriber:
+    """
+    Transcribes long recordings window by window instead of in one call.
+
+    Audio is split on silence (`split_on_silence`), up to `workers` windows
+    are transcribed at once, and their transcripts are yielded in time order
+    as soon as every earlier window is done, so downstream chunking starts
+    with the first window rather than after the whole file. Each finished
+    window is appended to a checkpoint (when `checkpoint_dir` is set and a
+    key is given); a later run with the same key skips those windows.
+    A window that takes longer than `timeout` seconds (ASR_TIMEOUT_SECONDS
+    by default; 0 waits indefinitely) raises ModelTimeoutError.
+    `transcribe_fn(audio, language)` takes float32 samples in [-1, 1] and
+    returns a Whisper-style result dict with a "text" entry.
+    """
+
+    def __init__(
+        self,
+        transcribe_fn: Callable[[np.ndarray, str], Dict[str, Any]],
+        workers: Optional[int] = None,
+        checkpoint_dir: Optional[str] = None,
+        max_seconds: Optional[float] = None,
+        min_silence_seconds: Optional[float] = None,
+        silence_db: Optional[float] = None,
+        audio_loader: Callable[[str], np.ndarray] = load_audio,
+        sample_rate: int = SAMPLE_RATE,
+        timeout: Optional[float] = None,
+    ):
+        self.transcribe_fn = transcribe_fn
+        self.workers = max(1, workers or settings.ASR_SEGMENT_WORKERS)
+        self.checkpoint_dir = settings.ASR_CHECKPOINT_DIR if checkpoint_dir is None else checkpoint_dir
+        self.max_seconds = max_seconds or settings.ASR_SEGMENT_SECONDS
+        self.min_silence_seconds = settings.ASR_MIN_SILENCE_SECONDS if min_silence_seconds is None else min_silence_seconds
+        self.silence_db = settings.ASR_SILENCE_DB if silence_db is None else silence_db
+        self.audio_loader = audio_loader
+        self.sample_rate = sample_rate
+        self.timeout = settings.ASR_TIMEOUT_SECONDS if timeout is None else timeout
+
+    def checkpoint_for(self, key: str) -> TranscriptCheckpoint:
+        # Windows depend on the segmentation parameters, so they are part of the key
+        parts = [key, self.max_seconds, self.min_silence_seconds, self.silence_db, self.sample_rate]
+        digest = hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+        return TranscriptCheckpoint(os.path.join(self.checkpoint_dir, f"{digest}.jsonl"))
+
+    def _transcribe_window(
+        self, audio: np.ndarray, window: AudioWindow, language: str, checkpoint: Optional[TranscriptCheckpoint]
+    ) -> TranscriptSegment:
+        samples = audio[window.start_sample:window.end_sample]
+        if samples.dtype == np.int16:
+            samples = samples.astype(np.float32) / 32768.0
+        result = self.transcribe_fn(samples, language)
+        segment = TranscriptSegment(index=window.index, start=window.start, end=window.end,
+                                    text=(result.get("text") or "").strip())
+        # Recorded here rather than by the caller, so a window still finishing when the stream is abandoned is kept
+        if checkpoint:
+            checkpoint.append(segment)
+        return segment
+
+    async def stream(
+        self,
+        audio_file_path: str,
+        language: str,
+        executor: Optional[Executor] = None,
+        checkpoint_key: Optional[str] = None,
+    ) -> AsyncIterator[TranscriptSegment]:
+        """
+        Yields the transcript of each window in time order. Transcription runs
+        in `executor` (the loop's default thread pool if None). A failing
+        window raises after the windows finished so far are checkpointed.
+        """
+        loop = asyncio.get_running_loop()
+        start_time = time.time()
+        audio = await loop.run_in_executor(None, self.audio_loader, audio_file_path)
+        windows = await loop.run_in_executor(
+            None, split_on_silence, audio, self.sample_rate, self.max_seconds, self.min_silence_seconds, self.silence_db
+        )
+        checkpoint = self.checkpoint_for(checkpoint_key) if self.checkpoint_dir and checkpoint_key else None
+        done = checkpoint.load() if checkpoint else {}
+        logger.info(
+            f"Transcribing {audio_file_path} in {len(windows)} segment(s) of {len(audio) / self.sample_rate:.0f}s audio"
+            + (f"; {len(done)} restored from checkpoint." if done else ".")
+        )
+
+        async def run(window: AudioWindow) -> TranscriptSegment:
+            if window.index in done:
+                return done[window.index]
+            try:
+                return await asyncio.wait_for(
+                    loop.run_in_executor(executor, self._transcribe_window, audio, window, language, checkpoint),
+                    self.timeout or None,
+                )
+            except asyncio.TimeoutError:
+                raise ModelTimeoutError(
+                    f"Segment {window.index + 1} of {audio_file_path} was not transcribed within {self.timeout:.1f}s."
+                ) from None
+
+        remaining = iter(windows)
+        in_flight: deque = deque()
+
+        def submit_next():
+            # Checkpointed windows cost nothing, so they do not count against the worker limit
+            while len(in_flight) < self.workers or (in_flight and in_flight[-1][1]):
+                window = next(remaining, None)
+                if window is None:
+                    return
+                in_flight.append((asyncio.ensure_future(run(window)), window.index in done))
+
+        try:
+            submit_next()
+            while in_flight:
+                task, _ = in_flight.popleft()
+                segment = await task
+                submit_next()
+                logger.debug(f"Segment {segment.index + 1}/{len(windows)} ({segment.start:.1f}s-{segment.end:.1f}s) transcribed.")
+                yield segment
+        finally:
+            for task, _ in in_flight:
+                task.cancel()
+            if in_flight:
+                await asyncio.gather(*(task for task, _ in in_flight), return_exceptions=True)
+
+        if checkpoint:
+            checkpoint.remove()
+        logger.info(f"Segmented transcription of {audio_file_path} complete in {time.time() - start_time:.2f} seconds.")
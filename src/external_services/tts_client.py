@@ -1,10 +1,13 @@
 # cras_project/cras_core/external_services/tts_client.py
+import tempfile
 import traceback
 import os
+import wave
 from typing import Optional
 from ..config import settings
 from ..utils.logger_config import setup_logger
 from ..config import settings
+from .model_executor import get_model_executor
 try:
     from melo.api import TTS as MeloTTS_API
 except ImportError:
@@ -13,7 +16,39 @@ except ImportError:
 
 logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
 
-class TTSClient:
+class BaseTTSClient:
+    """
+    Speech synthesis shared by the TTS backends. Subclasses load a voice and
+    implement `_synthesize_to_file`, a blocking call writing a WAV file;
+    `synthesize_speech` runs it on the TTS executor (see model_executor).
+    """
+
+    def _synthesize_to_file(self, text: str, output_file_path: str):
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Synthesizes a short phrase, so the first real request finds the model initialized."""
+        with tempfile.TemporaryDirectory() as work_dir:
+            self._synthesize_to_file("Hello.", os.path.join(work_dir, "warm_up.wav"))
+
+    async def synthesize_speech(self, text: str, output_file_path: str, timeout: Optional[float] = None) -> str:
+        """
+        Synthesizes speech from the given text and saves it to a file. Synthesis
+        taking longer than `timeout` seconds (TTS_TIMEOUT_SECONDS by default) is
+        abandoned and reported as an error.
+        """
+        logger.info(f"Synthesizing speech with {type(self).__name__} for text: '{text[:50]}...'")
+        try:
+            os.makedirs(os.path.dirname(output_file_path) or ".", exist_ok=True)
+            await get_model_executor("tts").run(self._synthesize_to_file, text, output_file_path, timeout=timeout)
+            return output_file_path
+        except Exception as e:
+            # The error message from MeloTTS can sometimes be the speaker ID itself if it's invalid
+            logger.error(f"Error during speech synthesis: {e}", exc_info=True)
+            return f"Error: Could not synthesize speech. Details logged. Error: {e}"
+
+
+class TTSClient(BaseTTSClient):
     """
     Client for Text-to-Speech using MeloTTS.
     """
@@ -42,29 +77,43 @@ class TTSClient:
             logger.error(traceback.format_exc())
             raise
 
-    async def synthesize_speech(self, text: str, output_file_path: str) -> str:
-        """
-        Synthesizes speech from the given text and saves it to a file.
-        """
+    def _synthesize_to_file(self, text: str, output_file_path: str):
         if not self.melo_tts:
-            logger.error("MeloTTS API not initialized.")
-            return "Error: MeloTTS API not initialized."
-
-        
-        speaker_int_id = self.speaker_ids[self.speaker_id_name]
+            raise RuntimeError("MeloTTS API not initialized.")
+        speaker_int_id = self.speaker_ids.get(self.speaker_id_name)
         if speaker_int_id is None:
-            logger.error(f"Speaker '{self.speaker_id_name}' not found for language '{self.language}'. Available: {list(self.speaker_ids.keys())}")
-            return f"Error: Speaker '{self.speaker_id_name}' not found."
+            raise ValueError(
+                f"Speaker '{self.speaker_id_name}' not found for language '{self.language}'. Available: {list(self.speaker_ids.keys())}"
+            )
+        logger.info(f"Using speaker '{self.speaker_id_name}' (ID: {speaker_int_id}).")
+        # Use the looked-up integer ID instead of the string name
+        self.melo_tts.tts_to_file(text, speaker_int_id, output_file_path, speed=1.0)
 
-        logger.info(f"Synthesizing speech with speaker '{self.speaker_id_name}' (ID: {speaker_int_id}) for text: '{text[:50]}...'")
+
+class PiperTTSClient(BaseTTSClient):
+    """
+    Client for Text-to-Speech on CPU using Piper (ONNX Runtime voices).
+    `model_path` is a voice's .onnx file; its .onnx.json config must sit
+    next to it. Voices are listed at https://huggingface.co/rhasspy/piper-voices.
+    """
+    def __init__(self, model_path: Optional[str] = None):
         try:
-            os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
-            
-            # Use the looked-up integer ID instead of the string name
-            self.melo_tts.tts_to_file(text, speaker_int_id, output_file_path, speed=1.0)
-            return output_file_path
+            from piper import PiperVoice
+        except ImportError as e:
+            raise ImportError("piper-tts library is required for PiperTTSClient (pip install piper-tts).") from e
+
+        self.model_path = model_path or settings.TTS_PIPER_MODEL_PATH
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"Piper voice not found at {self.model_path}. Download a voice and set TTS_PIPER_MODEL_PATH.")
+        logger.info(f"Initializing PiperTTSClient with voice: {self.model_path}")
+        try:
+            self.voice = PiperVoice.load(self.model_path)
         except Exception as e:
-            # The error message from MeloTTS can sometimes be the speaker ID itself if it's invalid
-            logger.error(f"Error during speech synthesis: {e}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            return f"Error: Could not synthesize speech. Details logged. Error: {e}"
\ No newline at end of file
+            logger.error(f"Error loading Piper voice '{self.model_path}': {e}", exc_info=True)
+            raise
+
+    def _synthesize_to_file(self, text: str, output_file_path: str):
+        with wave.open(output_file_path, "wb") as wav_file:
+            # piper-tts 1.3 renamed synthesize (which now yields audio chunks) to synthesize_wav
+            synthesize_wav = getattr(self.voice, "synthesize_wav", None) or self.voice.synthesize
+            synthesize_wav(text, wav_file)
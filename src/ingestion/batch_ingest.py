@@ -0,0 +1,170 @@
+# src/ingestion/batch_ingest.py
+"""
+Headless bulk ingestion into the persistent knowledge base.
+
+Usage (from the project root):
+    python -m src.ingestion.batch_ingest ./my_documents --kb-dir ./data/knowledge_base
+
+Files whose content is already recorded in the knowledge base are skipped, so
+an interrupted run can simply be started again to resume where it stopped.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Iterator, List, Optional
+from tqdm import tqdm
+from ..config import settings
+from ..utils.logger_config import setup_logger
+from ..memory.persistent_store import PersistentVectorStore
+from .document_parser import TextProcessor
+from .ingestion_cache import IngestionCache, hash_file
+from .pipeline import AUDIO_EXTENSIONS, SUPPORTED_EXTENSIONS, IngestionPipeline, SourceFile
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+
+def iter_source_files(root: str) -> Iterator[str]:
+    """Yields supported files under `root` in a stable (sorted) order."""
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if os.path.splitext(file_name)[1].lower() in SUPPORTED_EXTENSIONS:
+                yield os.path.join(dir_path, file_name)
+
+
+def _batches(items: List[SourceFile], size: int) -> Iterator[List[SourceFile]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def ingest_directory(
+    root: str,
+    knowledge_base: PersistentVectorStore,
+    embedding_client,
+    asr_client=None,
+    cache: Optional[IngestionCache] = None,
+    batch_size: int = 256,
+    cpu_workers: Optional[int] = None,
+) -> dict:
+    """
+    Ingests every supported file under `root` into the knowledge base and
+    returns a summary with counts of ingested, skipped and failed files.
+    """
+    known_hashes = knowledge_base.source_hashes()
+    summary = {"ingested": 0, "skipped": 0, "failed": 0, "chunks": 0}
+    pending: List[SourceFile] = []
+
+    logger.info(f"Scanning {root} for new or changed files...")
+    for path in iter_source_files(root):
+        content_hash = hash_file(path)
+        if content_hash in known_hashes:
+            summary["skipped"] += 1
+            continue
+        if asr_client is None and os.path.splitext(path)[1].lower() in AUDIO_EXTENSIONS:
+            logger.warning(f"Skipping audio file {path}: no ASR client available.")
+            summary["skipped"] += 1
+            continue
+        # Relative paths keep source names unique across the tree
+        known_hashes[content_hash] = path
+        pending.append(SourceFile(path=path, name=os.path.relpath(path, root), content_hash=content_hash))
+    logger.info(f"{len(pending)} file(s) to ingest, {summary['skipped']} already up to date.")
+
+    pipeline = IngestionPipeline(
+        TextProcessor.from_settings(),
+        embedding_client,
+        knowledge_base,
+        asr_client=asr_client,
+        cache=cache,
+        cpu_workers=cpu_workers,
+    )
+
+    loop = asyncio.get_running_loop()
+    with tqdm(total=len(pending), unit="file", desc="Ingesting") as progress:
+        async def on_result(result):
+            error = result.error
+            if not error:
+                try:
+                    # Recording the source is what marks the file as done for resumption; the write
+                    # can wait on the service's, so it runs off the event loop
+                    await loop.run_in_executor(None, lambda: knowledge_base.add_source(
+                        result.name, result.chunk_count, content_hash=result.content_hash
+                    ))
+                except Exception as e:
+                    error = f"Failed to record {result.name}: {type(e).__name__}: {e}"
+            if error:
+                summary["failed"] += 1
+                logger.error(error)
+            else:
+                summary["ingested"] += 1
+                summary["chunks"] += result.chunk_count
+            progress.set_postfix(chunks=summary["chunks"], failed=summary["failed"])
+            progress.update(1)
+
+        # Bounded batches keep the number of pending tasks and results small on huge trees; they share one set of pools
+        try:
+            for batch in _batches(pending, batch_size):
+                await pipeline.run(batch, on_result=on_result)
+        finally:
+            await pipeline.close()
+
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-load a directory tree into the CRAS knowledge base.")
+    parser.add_argument("directory", help="Root directory to scan for PDF, TXT and audio files")
+    parser.add_argument("--kb-dir", default=settings.KNOWLEDGE_BASE_DIR, help="Knowledge base directory")
+    parser.add_argument("--cache-dir", default=settings.INGESTION_CACHE_DIR, help="Ingestion cache directory")
+    parser.add_argument("--batch-size", type=int, default=256, help="Files handed to the pipeline per batch")
+    parser.add_argument("--cpu-workers", type=int, default=None, help="Processes for PDF parsing and cleaning")
+    parser.add_argument("--skip-audio", action="store_true", help="Do not load the ASR model; skip audio files")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"{args.directory} is not a directory")
+
+    # Imported here so `--help` works without loading any models
+    from ..external_services.embedding_pool import create_embedding_client
+
+    asr_client = None
+    if not args.skip_audio and any(
+        os.path.splitext(p)[1].lower() in AUDIO_EXTENSIONS for p in iter_source_files(args.directory)
+    ):
+        from ..external_services.backends import create_asr_client
+        asr_client = create_asr_client()
+
+    embedding_client = create_embedding_client()
+    try:
+        # A knowledge base built with another embedding model is rejected here, before any work
+        knowledge_base = PersistentVectorStore(args.kb_dir, dim=embedding_client.dimension)
+    except ValueError as e:
+        if hasattr(embedding_client, "close"):
+            embedding_client.close()
+        parser.error(str(e))
+    start = time.time()
+    try:
+        summary = asyncio.run(ingest_directory(
+            args.directory,
+            knowledge_base,
+            embedding_client,
+            asr_client=asr_client,
+            cache=IngestionCache(args.cache_dir),
+            batch_size=args.batch_size,
+            cpu_workers=args.cpu_workers,
+        ))
+    finally:
+        knowledge_base.close()
+        if hasattr(embedding_client, "close"):
+            embedding_client.close()
+
+    logger.info(
+        f"Done in {time.time() - start:.1f}s: {summary['ingested']} ingested, {summary['skipped']} skipped, "
+        f"{summary['failed']} failed, {summary['chunks']} chunks added."
+    )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
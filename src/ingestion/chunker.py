@@ -0,0 +1,140 @@
+# src/ingestion/chunker.py
+from bisect import bisect_right
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from ..config import settings
+from ..utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+
+@dataclass
+class TextSegment:
+    """A piece of a document as it arrives from a parser: a page, a transcript segment, ..."""
+    text: str
+    page_number: Optional[int] = None
+
+
+@dataclass
+class Chunk:
+    """
+    A chunk of a document together with where it came from. `start` and `end`
+    are character offsets into the document formed by concatenating its
+    segments; pages are those of the first and last character.
+    """
+    text: str
+    index: int
+    start: int
+    end: int
+    page_start: Optional[int] = None
+    page_end: Optional[int] = None
+    source_id: Optional[str] = None
+
+    def metadata(self) -> Dict[str, Any]:
+        """Metadata stored alongside the chunk in the vector index."""
+        meta = {"source": self.source_id, "chunk_index": self.index, "start": self.start, "end": self.end}
+        if self.page_start is not None:
+            meta["page_start"] = self.page_start
+            meta["page_end"] = self.page_end
+        return meta
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable form without the source id, so cached chunks can be shared by identical files."""
+        data = asdict(self)
+        data.pop("source_id")
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], source_id: Optional[str] = None) -> "Chunk":
+        return cls(source_id=source_id, **data)
+
+
+def _segment_parts(segment: Union[str, TextSegment, Any]) -> Tuple[str, Optional[int]]:
+    """Accepts plain strings and anything with `text` (and optionally `page_number`), e.g. PdfPage."""
+    if isinstance(segment, str):
+        return segment, None
+    return segment.text or "", getattr(segment, "page_number", None)
+
+
+class StreamingChunker:
+    """
+    Chunks a document that arrives as a stream of segments, yielding each
+    chunk as soon as no later input can change it.
+
+    Segments are buffered until about `window` characters are available
+    (default 8 x max_chunk_chars). The buffer is then split with the given
+    splitter (the same RecursiveCharacterTextSplitter `chunk_text` uses), and
+    every chunk ending more than max_chunk_chars characters before the end
+    of the buffer is emitted. The buffer restarts at the first chunk held back, so
+    text that more input could still change is always re-split. Memory stays
+    bounded by the window plus one segment however long the document is.
+    Near a restart point chunk boundaries can differ slightly from splitting
+    the whole text at once, but the size and overlap limits are the same.
+    """
+
+    def __init__(self, text_splitter, max_chunk_chars: int, window: Optional[int] = None):
+        self.text_splitter = text_splitter
+        self.max_chunk_chars = max_chunk_chars # Longest chunk the splitter can produce, in characters
+        self.window = window or max_chunk_chars * 8
+
+    def _split(self, buffer: str, safe_end: Optional[int]) -> Tuple[List[Tuple[int, str]], int]:
+        """
+        Splits the buffer and returns (offset, text) of the chunks that end
+        before `safe_end` (all of them if None), plus where the buffer should
+        restart.
+        """
+        emitted, position = [], 0
+        for text in self.text_splitter.split_text(buffer):
+            start = buffer.find(text, position)
+            if start < 0:
+                # Should not happen with a whitespace-stripping splitter; keep going from where we are
+                if safe_end is None:
+                    continue
+                return emitted, position
+            if safe_end is not None and start + len(text) > safe_end:
+                return emitted, start
+            emitted.append((start, text))
+            position = start + 1
+        return emitted, len(buffer)
+
+    def chunks(self, segments: Iterable[Union[str, TextSegment, Any]], source_id: Optional[str] = None) -> Iterator[Chunk]:
+        """Yields the chunks of a document given as an iterable of segments."""
+        buffer, buffer_start, document_length, index = "", 0, 0, 0
+        segment_starts: List[int] = []
+        segment_pages: List[Optional[int]] = []
+
+        def page_at(offset: int) -> Optional[int]:
+            return segment_pages[bisect_right(segment_starts, offset) - 1] if segment_starts else None
+
+        def make_chunks(pieces: List[Tuple[int, str]]) -> Iterator[Chunk]:
+            nonlocal index
+            for offset, text in pieces:
+                start = buffer_start + offset
+                end = start + len(text)
+                yield Chunk(
+                    text=text,
+                    index=index,
+                    start=start,
+                    end=end,
+                    page_start=page_at(start),
+                    page_end=page_at(end - 1),
+                    source_id=source_id,
+                )
+                index += 1
+
+        for segment in segments:
+            text, page_number = _segment_parts(segment)
+            segment_starts.append(document_length)
+            segment_pages.append(page_number)
+            document_length += len(text)
+            buffer += text
+            if len(buffer) < self.window:
+                continue
+            pieces, restart = self._split(buffer, safe_end=len(buffer) - self.max_chunk_chars)
+            yield from make_chunks(pieces)
+            buffer = buffer[restart:]
+            buffer_start += restart
+
+        if buffer:
+            pieces, _ = self._split(buffer, safe_end=None)
+            yield from make_chunks(pieces)
@@ -0,0 +1,100 @@
+# src/ingestion/dedup.py
+import hashlib
+from typing import Dict, List, Optional, Set
+import numpy as np
+from ..config import settings
+from ..utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+# Universal hashing modulo a Mersenne prime; a * x + b stays below 2**63 for 32-bit inputs
+_PRIME = (1 << 31) - 1
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _shingles(words: List[str], size: int) -> Set[str]:
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class ChunkDeduplicator:
+    """
+    Detects chunks that repeat, exactly or nearly, a chunk seen before.
+
+    Exact repeats (ignoring case and spacing) are caught by a hash set. Near
+    duplicates are found with MinHash over word shingles: each chunk gets a
+    `num_perm`-value signature whose agreement with another signature
+    estimates the Jaccard similarity of their shingle sets, and LSH banding
+    (`bands` buckets per chunk) limits the comparison to likely candidates.
+    A chunk whose estimated similarity to an earlier one reaches `threshold`
+    is a duplicate.
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 3,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands.")
+        self.threshold = settings.DEDUP_SIMILARITY_THRESHOLD if threshold is None else threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+        self._exact: Set[bytes] = set()
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self._signatures: List[np.ndarray] = []
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of the text's word shingles."""
+        shingles = _shingles(_normalize(text).split(), self.shingle_size)
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        permuted = (hashes[:, None] * self._a + self._b) % _PRIME
+        return permuted.min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def is_duplicate(self, text: str) -> bool:
+        """Returns True for a repeat of an earlier chunk; otherwise remembers this chunk and returns False."""
+        normalized = _normalize(text)
+        digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+        if digest in self._exact:
+            self.exact_duplicates += 1
+            return True
+
+        signature = self.signature(normalized)
+        band_keys = self._band_keys(signature)
+        candidates = {i for band, key in zip(self._buckets, band_keys) for i in band.get(key, ())}
+        for candidate in candidates:
+            if np.mean(self._signatures[candidate] == signature) >= self.threshold:
+                self.near_duplicates += 1
+                return True
+
+        self._exact.add(digest)
+        position = len(self._signatures)
+        self._signatures.append(signature)
+        for band, key in zip(self._buckets, band_keys):
+            band.setdefault(key, []).append(position)
+        return False
+
+    @property
+    def duplicates(self) -> int:
+        return self.exact_duplicates + self.near_duplicates
@@ -1,38 +1,119 @@
-import fitz  # PyMuPDF
-import pdfplumber
-import re
 import string
-import nltk
-import spacy
-from nltk.corpus import stopwords
-from nltk.stem import PorterStemmer, WordNetLemmatizer
-from nltk.tokenize import sent_tokenize
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from collections import OrderedDict
+import threading
+from dataclasses import dataclass
+from functools import lru_cache, wraps
+from typing import Callable, Iterable, Iterator, List, Optional, TypeVar, Union
 from ..config import settings
 from ..utils.logger_config import setup_logger
+from .chunker import Chunk, StreamingChunker, TextSegment
 
 # Setup a logger specific to this module
 logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
 
-# Download necessary NLTK data
-try:
-    stopwords.words("english")
-except LookupError:
-    nltk.download("stopwords")
-try:
-    nltk.data.find("corpora/wordnet")
-except LookupError:
-    nltk.download("wordnet")
-
-# Load spaCy model
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    logger.info("Downloading spaCy model...")
-    from spacy.cli import download
-    download("en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
+# spaCy, NLTK, the PDF libraries and the text splitter are imported on first
+# use rather than here, so importing this module (e.g. for TextProcessor) is cheap.
+
+T = TypeVar("T")
+_load_lock = threading.RLock()
+
+
+def _load_once(loader: Callable[[], T]) -> Callable[[], T]:
+    """Runs `loader` on the first call only, even when several threads call it at once."""
+    loaded = []
+
+    @wraps(loader)
+    def wrapper() -> T:
+        if not loaded:
+            with _load_lock:
+                if not loaded:
+                    loaded.append(loader())
+        return loaded[0]
+    return wrapper
+
+
+def _ensure_nltk_data(resource_path: str, package: str):
+    """Downloads an NLTK data package if it is not installed yet."""
+    import nltk
+    with _load_lock:
+        try:
+            nltk.data.find(resource_path)
+        except LookupError:
+            logger.info(f"Downloading NLTK data '{package}'...")
+            nltk.download(package)
+
+
+# Lemmatization only needs the tagger and attribute ruler, so the dependency
+# parser and NER (most of the pipeline's cost) are excluded.
+SPACY_EXCLUDED_COMPONENTS = ["parser", "ner"]
+
+
+@_load_once
+def get_nlp():
+    """Returns the shared spaCy pipeline, loading (and if needed downloading) it on first use."""
+    import spacy
+    logger.info("Loading spaCy model 'en_core_web_sm'...")
+    try:
+        return spacy.load("en_core_web_sm", exclude=SPACY_EXCLUDED_COMPONENTS)
+    except OSError:
+        logger.info("Downloading spaCy model...")
+        from spacy.cli import download
+        download("en_core_web_sm")
+        return spacy.load("en_core_web_sm", exclude=SPACY_EXCLUDED_COMPONENTS)
+
+
+@_load_once
+def _sent_tokenize() -> Callable[[str], List[str]]:
+    _ensure_nltk_data("tokenizers/punkt", "punkt")
+    from nltk.tokenize import sent_tokenize
+    return sent_tokenize
+
+
+# Built once: strips punctuation and turns newlines into spaces in a single pass
+_CLEAN_TABLE = str.maketrans("\n", " ", string.punctuation)
+
+
+@_load_once
+def _english_stopwords() -> frozenset:
+    _ensure_nltk_data("corpora/stopwords", "stopwords")
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words("english"))
+
+
+@_load_once
+def _wordnet_lemmatizer():
+    _ensure_nltk_data("corpora/wordnet", "wordnet")
+    from nltk.stem import WordNetLemmatizer
+    return WordNetLemmatizer()
+
+
+@_load_once
+def _porter_stemmer():
+    from nltk.stem import PorterStemmer
+    return PorterStemmer()
+
+
+# Vocabularies are small compared to documents, so each word form is reduced once
+@lru_cache(maxsize=200_000)
+def _lemmatize_word(word: str) -> str:
+    return _wordnet_lemmatizer().lemmatize(word)
+
+
+@lru_cache(maxsize=200_000)
+def _stem_word(word: str) -> str:
+    return _porter_stemmer().stem(word)
+
+
+def _word_batches(words: List[str], batch_words: int) -> Iterable[str]:
+    """Joins words into texts of at most `batch_words` words for `nlp.pipe`."""
+    for start in range(0, len(words), batch_words):
+        yield " ".join(words[start:start + batch_words])
+
+
+@dataclass
+class PdfPage:
+    """Text of one PDF page. Page numbers are 1-based, as shown by PDF viewers."""
+    page_number: int
+    text: str
 
 
 class TextProcessor:
@@ -41,38 +122,96 @@ class TextProcessor:
     text cleaning, and chunking.
     """
 
-    def __init__(self):
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, token_counter=None):
         """
         Initializes the TextProcessor with a RecursiveCharacterTextSplitter.
+        With a `token_counter` (see token_length.TokenCounter), chunk_size and
+        chunk_overlap are measured in embedding-model tokens instead of characters.
         """
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        if token_counter is not None:
+            from .token_length import MAX_CHARS_PER_TOKEN
+            # Part of the chunk cache key, so chunks from different tokenizers never mix
+            self.length_unit = f"tokens:{getattr(token_counter.tokenizer, 'name_or_path', '')}"
+            self.max_chunk_chars = chunk_size * MAX_CHARS_PER_TOKEN
+        else:
+            self.length_unit = "chars"
+            self.max_chunk_chars = chunk_size
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=token_counter or len,
         )
 
+    @classmethod
+    def from_settings(cls) -> "TextProcessor":
+        """
+        Creates the TextProcessor configured in Settings: character-based
+        chunks, or (CHUNK_LENGTH_UNIT="tokens") chunks sized to fit the
+        embedding model's input limit.
+        """
+        if settings.CHUNK_LENGTH_UNIT == "tokens":
+            from .token_length import TokenCounter, chunk_token_budget, load_tokenizer
+            return cls(
+                chunk_size=chunk_token_budget(),
+                chunk_overlap=settings.CHUNK_TOKEN_OVERLAP,
+                token_counter=TokenCounter(load_tokenizer()),
+            )
+        if settings.CHUNK_LENGTH_UNIT != "chars":
+            raise ValueError(f"Unknown CHUNK_LENGTH_UNIT '{settings.CHUNK_LENGTH_UNIT}'. Use 'chars' or 'tokens'.")
+        return cls()
+
+    def count_pdf_pages(self, pdf_path: str) -> int:
+        """
+        Returns the number of pages in a PDF without extracting any text.
+        """
+        import fitz  # PyMuPDF
+        with fitz.open(pdf_path) as doc:
+            return doc.page_count
+
+    def iter_pdf_pages(
+        self,
+        pdf_path: str,
+        start_page: int = 0,
+        end_page: Optional[int] = None,
+        engine: str = "pymupdf",
+    ) -> Iterator[PdfPage]:
+        """
+        Yields the text of pages [start_page, end_page) (0-based indices) one at
+        a time, so only the current page is held in memory. `engine` is
+        "pymupdf" (default, fastest) or "pdfplumber". Pages without a text
+        layer yield an empty string.
+        """
+        if engine == "pymupdf":
+            import fitz  # PyMuPDF
+            with fitz.open(pdf_path) as doc:
+                for index in range(start_page, doc.page_count if end_page is None else min(end_page, doc.page_count)):
+                    yield PdfPage(page_number=index + 1, text=doc[index].get_text())
+        elif engine == "pdfplumber":
+            import pdfplumber
+            with pdfplumber.open(pdf_path) as pdf:
+                for index, page in enumerate(pdf.pages[start_page:end_page], start=start_page):
+                    # extract_text() returns None for pages without a text layer (e.g. scans)
+                    yield PdfPage(page_number=index + 1, text=page.extract_text() or "")
+                    page.flush_cache()
+        else:
+            raise ValueError(f"Unknown PDF engine '{engine}'. Use 'pymupdf' or 'pdfplumber'.")
+
     def extract_text_from_pdf(self, pdf_path: str) -> str:
         """
         Extracts text from a PDF file using PyMuPDF.
         """
         logger.info(f"Extracting text from {pdf_path} using PyMuPDF...")
-        doc = fitz.open(pdf_path)
-        text = ""
-        for page in doc:
-            text += page.get_text()
-        doc.close()
-        return text
+        return "".join(page.text for page in self.iter_pdf_pages(pdf_path))
 
     def extract_text_from_pdf_alternative(self, pdf_path: str) -> str:
         """
         Extracts text from a PDF file using pdfplumber (alternative).
         """
         logger.info(f"Extracting text from {pdf_path} using pdfplumber...")
-        text = ""
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                text += page.extract_text()
-        return text
+        return "".join(page.text for page in self.iter_pdf_pages(pdf_path, engine="pdfplumber"))
 
     def read_text_file(self, file_path: str, encoding: str = "utf-8") -> str:
         """
@@ -89,58 +228,60 @@ class TextProcessor:
         custom_stopwords: list = None,
         remove_consecutive_words: bool = True,
         remove_duplicate_sentences: bool = True,
+        n_process: int = None,
     ) -> str:
         """
         Cleans the input text with various options.
+        For stem_method="spacy", `n_process` overrides settings.TEXT_CLEAN_SPACY_PROCESSES.
         """
-        logger.info(f"Cleaning text with the following options:")
+        logger.info(f"Cleaning {len(text)} characters (stem_method={stem_method}).")
 
         # --- Sentence-level cleaning (if requested) ---
         if remove_duplicate_sentences:
-            sentences = sent_tokenize(text)
-            # Use OrderedDict to preserve order while getting unique sentences
-            unique_sentences = list(OrderedDict.fromkeys(sentences))
-            text = " ".join(unique_sentences)
+            sentences = _sent_tokenize()(text)
+            # dict.fromkeys preserves order while dropping repeated sentences
+            text = " ".join(dict.fromkeys(sentences))
 
         # --- Basic text cleaning ---
-        text = text.lower()
-        text = text.translate(str.maketrans("", "", string.punctuation))
-        text = re.sub(r"\n", " ", text)
-        words = text.split()
+        words = text.lower().translate(_CLEAN_TABLE).split()
+        if not words:
+            return ""
 
         # --- Consecutive word removal (if requested) ---
         if remove_consecutive_words:
-            if not words:
-                return ""
-            non_consecutive_words = [words[0]]
-            for i in range(1, len(words)):
-                if words[i] != words[i-1]:
-                    non_consecutive_words.append(words[i])
-            words = non_consecutive_words
+            words = [words[0]] + [word for previous, word in zip(words, words[1:]) if word != previous]
 
         # --- Stopword removal ---
-        stop_words = set(stopwords.words("english"))
+        stop_words = _english_stopwords()
         if custom_stopwords:
-            stop_words.update(custom_stopwords)
+            stop_words = stop_words.union(custom_stopwords)
         words = [word for word in words if word not in stop_words]
 
         # --- Lemmatization or Stemming ---
         if stem_method == "spacy":
-            doc = nlp(" ".join(words))
-            lemmatized_words = [token.lemma_ for token in doc]
-            final_text = " ".join(lemmatized_words)
-        elif stem_method == "nltk_lem":
-            lemmatizer = WordNetLemmatizer()
-            lemmatized_words = [lemmatizer.lemmatize(word) for word in words]
-            final_text = " ".join(lemmatized_words)
-        elif stem_method == "nltk_stem":
-            stemmer = PorterStemmer()
-            stemmed_words = [stemmer.stem(word) for word in words]
-            final_text = " ".join(stemmed_words)
-        else:
-            final_text = " ".join(words)
+            # Batches keep each doc under nlp.max_length and let spaCy fan out across processes
+            docs = get_nlp().pipe(
+                _word_batches(words, settings.TEXT_CLEAN_SPACY_BATCH_WORDS),
+                batch_size=8,
+                n_process=n_process or settings.TEXT_CLEAN_SPACY_PROCESSES,
+            )
+            return " ".join(token.lemma_ for doc in docs for token in doc)
+        if stem_method == "nltk_lem":
+            return " ".join(map(_lemmatize_word, words))
+        if stem_method == "nltk_stem":
+            return " ".join(map(_stem_word, words))
+        return " ".join(words)
 
-        return final_text
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """
+        Search terms of a text for lexical (BM25) retrieval: the same
+        lowercasing, punctuation stripping and stopword removal as clean_text,
+        followed by Porter stemming. Identifiers such as "XR-200" become one
+        term ("xr200") in both documents and queries.
+        """
+        stop_words = _english_stopwords()
+        return [_stem_word(word) for word in text.lower().translate(_CLEAN_TABLE).split() if word not in stop_words]
 
     def chunk_text(self, text: str) -> list[str]:
         """
@@ -148,4 +289,23 @@ class TextProcessor:
         """
         logger.info("Chunking text...")
         chunks = self.text_splitter.split_text(text)
-        return chunks
\ No newline at end of file
+        return chunks
+
+    def iter_chunks(
+        self,
+        segments: Iterable[Union[str, PdfPage, TextSegment]],
+        source_id: Optional[str] = None,
+        window: Optional[int] = None,
+    ) -> Iterator[Chunk]:
+        """
+        Chunks text that arrives in segments (e.g. PDF pages or transcript
+        segments) with the same splitter as `chunk_text`, yielding Chunks with
+        character offsets, page numbers and `source_id` as soon as they are final.
+        """
+        return StreamingChunker(self.text_splitter, self.max_chunk_chars, window=window).chunks(segments, source_id=source_id)
+
+    def chunk_stream(self, segments: Iterable[Union[str, PdfPage, TextSegment]], window: Optional[int] = None) -> Iterator[str]:
+        """
+        Like `iter_chunks`, but yields only the chunk texts.
+        """
+        return (chunk.text for chunk in self.iter_chunks(segments, window=window))
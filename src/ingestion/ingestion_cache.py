@@ -0,0 +1,104 @@
+# src/ingestion/ingestion_cache.py
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Optional
+import numpy as np
+from ..config import settings
+from ..utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+
+def hash_bytes(data: bytes) -> str:
+    """Returns the SHA-256 hex digest of raw file content."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(file_path: str, block_size: int = 1 << 20) -> str:
+    """Returns the SHA-256 hex digest of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestionCache:
+    """
+    Content-addressed cache for the ingestion pipeline.
+
+    Each stage stores its output under a key derived from the content hash of
+    its input plus every parameter that affects the result (extractor, ASR
+    model, chunker settings, embedding model), so re-uploading the same bytes
+    under any name costs a hash and a lookup, while changing a parameter
+    naturally misses.
+    """
+
+    # Stage name -> file extension used to serialize its values
+    STAGES = {
+        "text": "txt",          # Extracted (and cleaned) document text
+        "transcript": "txt",    # Raw ASR transcript
+        "chunks": "json",       # List of chunk strings
+        "embeddings": "npy",    # Embedding matrix for a chunk list
+    }
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or settings.INGESTION_CACHE_DIR
+        self.hits = 0
+        self.misses = 0
+        for stage in self.STAGES:
+            os.makedirs(os.path.join(self.directory, stage), exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Builds a cache key from a content hash and the parameters of a stage."""
+        return hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+    def _path(self, stage: str, key: str) -> str:
+        if stage not in self.STAGES:
+            raise ValueError(f"Unknown ingestion cache stage '{stage}'.")
+        return os.path.join(self.directory, stage, key[:2], f"{key}.{self.STAGES[stage]}")
+
+    def load(self, stage: str, key: str) -> Optional[Any]:
+        """Returns the cached value for a stage, or None on a miss."""
+        path = self._path(stage, key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        try:
+            if self.STAGES[stage] == "npy":
+                value = np.load(path)
+            elif self.STAGES[stage] == "json":
+                with open(path, "r", encoding="utf-8") as f:
+                    value = json.load(f)
+            else:
+                with open(path, "r", encoding="utf-8") as f:
+                    value = f.read()
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable cache entry {path}: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.debug(f"Ingestion cache hit for stage '{stage}' ({key[:12]}).")
+        return value
+
+    def store(self, stage: str, key: str, value: Any):
+        """Writes a stage output atomically so readers never see partial files."""
+        path = self._path(stage, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if self.STAGES[stage] == "npy":
+                    np.save(f, np.asarray(value))
+                elif self.STAGES[stage] == "json":
+                    f.write(json.dumps(value).encode("utf-8"))
+                else:
+                    f.write(value.encode("utf-8"))
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -0,0 +1,583 @@
+# src/ingestion/pipeline.py
+import asyncio
+import inspect
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Union
+import numpy as np
+from ..config import settings
+from ..external_services.model_executor import ModelExecutor, get_model_executor
+from ..memory.vector_index import dequantize
+from ..utils.logger_config import setup_logger
+from .chunker import Chunk, TextSegment
+from .dedup import ChunkDeduplicator
+from .document_parser import PdfPage, TextProcessor
+from .ingestion_cache import IngestionCache, hash_bytes, hash_file
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+AUDIO_EXTENSIONS = [".mp3", ".wav", ".m4a"]
+SUPPORTED_EXTENSIONS = [".pdf", ".txt"] + AUDIO_EXTENSIONS
+
+# Stages in the order a file passes through them
+STAGES = ["parse", "transcribe", "clean", "chunk", "embed", "index"]
+
+# Marks the end of the chunk batches a chunking thread hands to the event loop
+_END_OF_CHUNKS = object()
+
+
+# --- Process-pool workers ---
+# These run in worker processes, so they must be module-level functions.
+_worker_processor: Optional[TextProcessor] = None
+
+def _get_worker_processor() -> TextProcessor:
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = TextProcessor()
+    return _worker_processor
+
+def _count_pdf_pages_worker(file_path: str) -> int:
+    return _get_worker_processor().count_pdf_pages(file_path)
+
+def _extract_pdf_pages_worker(file_path: str, start_page: int, end_page: int) -> List[PdfPage]:
+    return list(_get_worker_processor().iter_pdf_pages(file_path, start_page, end_page))
+
+def _clean_text_worker(text: str) -> str:
+    return _get_worker_processor().clean_text(text)
+
+# Names how _clean_text_worker cleans text in cache keys of cleaned transcripts; change it whenever that does
+CLEAN_TEXT_OPTIONS = "clean_text:spacy"
+
+
+@dataclass
+class SourceFile:
+    """A file to ingest. `name` is what the knowledge base records as the source."""
+    path: str
+    name: Optional[str] = None
+    content_hash: Optional[str] = None
+
+    def __post_init__(self):
+        self.name = self.name or os.path.basename(self.path)
+
+
+@dataclass
+class IngestionResult:
+    """Outcome of ingesting a single file."""
+    name: str
+    path: str
+    content_hash: str
+    chunk_count: int = 0
+    chunk_ids: List[int] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class StageStats:
+    """Throughput counters for one pipeline stage."""
+    items: int = 0
+    busy_seconds: float = 0.0
+    first_start: Optional[float] = None
+    last_end: Optional[float] = None
+
+    @property
+    def wall_seconds(self) -> float:
+        if self.first_start is None or self.last_end is None:
+            return 0.0
+        return self.last_end - self.first_start
+
+    @property
+    def throughput(self) -> float:
+        """Items completed per second of wall-clock time the stage was active."""
+        return self.items / self.wall_seconds if self.wall_seconds > 0 else 0.0
+
+
+class _EmbeddingBatcher:
+    """
+    Coalesces embedding requests from concurrently processed files into
+    batches of roughly `batch_size` texts, so many small files share one
+    forward pass instead of each paying for its own. One batch at a time
+    runs on `executor`, under its timeout.
+    """
+
+    def __init__(self, embed_texts: Callable[[List[str]], np.ndarray], executor: ModelExecutor,
+                 batch_size: int, max_wait: float = 0.05):
+        self.embed_texts = embed_texts
+        self.executor = executor
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((texts, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            total = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+            while total < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(request)
+                total += len(request[0])
+
+            texts = [text for request_texts, _ in pending for text in request_texts]
+            try:
+                embeddings = await self.executor.run(self.embed_texts, texts)
+                embeddings = dequantize(np.asarray(embeddings))
+                if embeddings.shape[0] != len(texts):
+                    raise RuntimeError(f"Embedding client returned {embeddings.shape[0]} vectors for {len(texts)} texts.")
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for request_texts, future in pending:
+                if not future.done():
+                    future.set_result(embeddings[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+
+class IngestionPools:
+    """
+    The process pool (PDF extraction, text cleaning) and ASR thread pool that
+    pipelines run on, sized from Settings unless given. They are started on
+    first use, so worker processes load their NLP models once however many
+    runs, or pipelines, share them.
+    """
+
+    def __init__(self, cpu_workers: Optional[int] = None, asr_workers: Optional[int] = None,
+                 segmented_asr: Optional[bool] = None):
+        self.cpu_workers = cpu_workers or settings.INGEST_CPU_WORKERS or os.cpu_count() or 1
+        segmented_asr = settings.ASR_SEGMENTED if segmented_asr is None else segmented_asr
+        # A segmented transcription keeps up to ASR_SEGMENT_WORKERS windows of its recording in flight
+        asr_workers = asr_workers or settings.INGEST_ASR_WORKERS
+        self.asr_threads = asr_workers * (settings.ASR_SEGMENT_WORKERS if segmented_asr else 1)
+        self.cpu_pool: Optional[Executor] = None
+        self.asr_pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self.cpu_pool is None:
+                self.cpu_pool = ProcessPoolExecutor(max_workers=self.cpu_workers)
+            if self.asr_pool is None:
+                self.asr_pool = ThreadPoolExecutor(max_workers=self.asr_threads, thread_name_prefix="asr")
+
+    def shutdown(self, wait: bool = True):
+        """Shuts both pools down; a later `start` creates new ones."""
+        with self._lock:
+            pools = [pool for pool in (self.cpu_pool, self.asr_pool) if pool is not None]
+            self.cpu_pool = self.asr_pool = None
+        for pool in pools:
+            pool.shutdown(wait=wait)
+
+    async def close(self):
+        """`shutdown`, waiting for work in progress off the event loop so other coroutines keep running."""
+        await asyncio.get_running_loop().run_in_executor(None, self.shutdown)
+
+
+@dataclass
+class _PipelineRun:
+    """The embedding batcher and index lock of one `IngestionPipeline.run` call; overlapping runs each get their own."""
+    loop: asyncio.AbstractEventLoop
+    batcher: _EmbeddingBatcher
+    index_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class IngestionPipeline:
+    """
+    Staged, concurrent ingestion: parse/transcribe -> clean -> chunk -> embed -> index.
+
+    Several files are in flight at once. PDF extraction (by page range, fed
+    straight into a streaming chunker) and text cleaning run in a process
+    pool, ASR runs in its own bounded thread pool (so audio cannot starve
+    documents), embedding requests are coalesced across files into shared
+    batches run on the embedding model's executor, and indexing is
+    serialized. Audio is transcribed in segments split on silence by
+    default, and each segment's transcript is chunked as soon as it is done.
+    Chunks repeating an earlier chunk of the same document, exactly or
+    nearly, are dropped before embedding. Stage outputs are reused from an
+    IngestionCache when one is given. The pipeline has no UI dependencies;
+    callers observe progress through `on_result`.
+
+    The process and ASR pools (see IngestionPools) are started by the first
+    `run` and shared by every later one; call `close` to shut them down.
+    Pools passed in as `pools` belong to the caller, which may share them
+    between pipelines and shuts them down itself. Overlapping runs each have
+    their own embedding batcher. `stats` and `duplicate_chunks` add up over
+    all runs.
+    """
+
+    def __init__(
+        self,
+        text_processor: TextProcessor,
+        embedding_client,
+        vector_store,
+        asr_client=None,
+        cache: Optional[IngestionCache] = None,
+        cpu_workers: Optional[int] = None,
+        asr_workers: Optional[int] = None,
+        embed_batch_size: Optional[int] = None,
+        max_files_in_flight: Optional[int] = None,
+        pdf_pages_per_task: Optional[int] = None,
+        deduplicate: Optional[bool] = None,
+        segmented_asr: Optional[bool] = None,
+        language: str = "en",
+        pools: Optional[IngestionPools] = None,
+    ):
+        self.text_processor = text_processor
+        self.embedding_client = embedding_client
+        self.vector_store = vector_store
+        self.asr_client = asr_client
+        self.cache = cache
+        self.language = language
+        self.embed_batch_size = embed_batch_size or settings.INGEST_EMBED_BATCH_SIZE
+        self.max_files_in_flight = max_files_in_flight or settings.INGEST_MAX_FILES_IN_FLIGHT
+        self.pdf_pages_per_task = pdf_pages_per_task or settings.INGEST_PDF_PAGES_PER_TASK
+        self.deduplicate = settings.DEDUP_CHUNKS if deduplicate is None else deduplicate
+        self.segmented_asr = settings.ASR_SEGMENTED if segmented_asr is None else segmented_asr
+        self.pools = pools or IngestionPools(cpu_workers, asr_workers, self.segmented_asr)
+        self._owns_pools = pools is None
+        self.duplicate_chunks = 0 # Chunks dropped as duplicates, over all runs
+        self.stats: Dict[str, StageStats] = {stage: StageStats() for stage in STAGES}
+
+    def _record_stage(self, stage: str, start: float):
+        stats = self.stats[stage]
+        end = time.perf_counter()
+        stats.items += 1
+        stats.busy_seconds += end - start
+        stats.first_start = start if stats.first_start is None else min(stats.first_start, start)
+        stats.last_end = end if stats.last_end is None else max(stats.last_end, end)
+
+    async def _timed(self, stage: str, awaitable: Awaitable):
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self._record_stage(stage, start)
+
+    def _cached(self, stage: str, key: str):
+        return self.cache.load(stage, key) if self.cache else None
+
+    def _store(self, stage: str, key: str, value):
+        if self.cache:
+            self.cache.store(stage, key, value)
+
+    async def _extract_text(self, source: SourceFile, run: _PipelineRun) -> str:
+        extension = os.path.splitext(source.name)[1].lower()
+        is_audio = extension in AUDIO_EXTENSIONS
+        if is_audio:
+            if self.asr_client is None:
+                raise RuntimeError("An ASR client is required to ingest audio files.")
+            transcript_parts = (source.content_hash, self.asr_client.model_name, self.asr_client.quant, self.language)
+            transcript_key = IngestionCache.make_key(*transcript_parts)
+            # The cleaned transcript depends on everything the transcript does, plus how it was cleaned
+            text_key = IngestionCache.make_key(*transcript_parts, CLEAN_TEXT_OPTIONS)
+        else:
+            text_key = IngestionCache.make_key(source.content_hash, "txt")
+
+        text = self._cached("text", text_key)
+        if text is not None:
+            return text
+
+        if is_audio:
+            transcript = self._cached("transcript", transcript_key)
+            if transcript is None:
+                transcript = await self._timed(
+                    "transcribe", self.asr_client.transcribe(source.path, language=self.language, executor=self.pools.asr_pool)
+                )
+                if not transcript or transcript.startswith("Error:"):
+                    raise RuntimeError(transcript or "Transcription returned no text.")
+                self._store("transcript", transcript_key, transcript)
+            text = await self._timed("clean", run.loop.run_in_executor(self.pools.cpu_pool, _clean_text_worker, transcript))
+        else:
+            text = await self._timed("parse", run.loop.run_in_executor(None, self.text_processor.read_text_file, source.path))
+
+        if text:
+            self._store("text", text_key, text)
+        return text
+
+    def _iter_pdf_pages(self, path: str) -> Iterator[PdfPage]:
+        """
+        Yields a PDF's pages in order. Page ranges are extracted in the
+        process pool, with a bounded number of ranges in flight, so a long
+        document is parsed in parallel without being held in memory at once.
+        """
+        page_count = self.pools.cpu_pool.submit(_count_pdf_pages_worker, path).result()
+        ranges = iter(range(0, page_count, self.pdf_pages_per_task))
+        in_flight = deque()
+
+        def submit_next():
+            start = next(ranges, None)
+            if start is not None:
+                end = min(start + self.pdf_pages_per_task, page_count)
+                in_flight.append(self.pools.cpu_pool.submit(_extract_pdf_pages_worker, path, start, end))
+
+        for _ in range(self.pools.cpu_workers * 2):
+            submit_next()
+        while in_flight:
+            pages = in_flight.popleft().result()
+            submit_next()
+            yield from pages
+
+    def _iter_transcript(self, source: SourceFile, run: _PipelineRun) -> Iterator[TextSegment]:
+        """
+        Yields an audio file's cleaned transcript segment by segment. Runs in
+        the chunking thread and pulls each segment from the ASR client's async
+        stream on the event loop, where further segments keep transcribing.
+        """
+        stream = self.asr_client.transcribe_stream(
+            source.path, language=self.language, executor=self.pools.asr_pool, content_hash=source.content_hash
+        )
+
+        async def next_text() -> Optional[str]:
+            segment = await anext(stream, None)
+            if segment is None:
+                return None
+            if not segment.text:
+                return ""
+            return await self._timed("clean", run.loop.run_in_executor(self.pools.cpu_pool, _clean_text_worker, segment.text))
+
+        try:
+            while True:
+                text = asyncio.run_coroutine_threadsafe(next_text(), run.loop).result()
+                if text is None:
+                    return
+                if text:
+                    yield TextSegment(text=text + "\n")
+        finally:
+            asyncio.run_coroutine_threadsafe(stream.aclose(), run.loop).result()
+
+    def _chunks_key(self, *parts) -> str:
+        # "offsets" marks the cached format: Chunk dicts rather than bare strings
+        dedup = f"dedup{settings.DEDUP_SIMILARITY_THRESHOLD}" if self.deduplicate else "nodedup"
+        return IngestionCache.make_key(
+            *parts, self.text_processor.chunk_size, self.text_processor.chunk_overlap, self.text_processor.length_unit,
+            dedup, "offsets",
+        )
+
+    async def _stream_chunks_and_embed(self, source: SourceFile, segments: Callable[[], Iterable], stage: str,
+                                      run: _PipelineRun):
+        """
+        Chunks a document in a worker thread and hands each batch of chunks to
+        the embedder as soon as it is ready, so embedding overlaps parsing.
+        Returns all chunks with their embeddings, in document order, without
+        duplicate chunks. The chunking thread is timed as `stage`.
+        """
+        loop = run.loop
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        deduplicator = ChunkDeduplicator() if self.deduplicate else None
+
+        def produce():
+            batch = []
+            try:
+                for chunk in self.text_processor.iter_chunks(segments(), source_id=source.name):
+                    if stop.is_set():
+                        return
+                    if deduplicator is not None and deduplicator.is_duplicate(chunk.text):
+                        continue
+                    batch.append(chunk)
+                    if len(batch) >= self.embed_batch_size:
+                        loop.call_soon_threadsafe(queue.put_nowait, batch)
+                        batch = []
+                if batch:
+                    loop.call_soon_threadsafe(queue.put_nowait, batch)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, _END_OF_CHUNKS)
+
+        chunks: List[Chunk] = []
+        pending: List[asyncio.Future] = []
+        start = time.perf_counter()
+        producer = loop.run_in_executor(None, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _END_OF_CHUNKS:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                chunks.extend(item)
+                pending.append(asyncio.ensure_future(run.batcher.embed([chunk.text for chunk in item])))
+            self._record_stage(stage, start)
+            embeddings = await self._timed("embed", asyncio.gather(*pending))
+        finally:
+            stop.set()
+            for future in pending:
+                future.cancel()
+            await producer
+        if deduplicator is not None and deduplicator.duplicates:
+            self.duplicate_chunks += deduplicator.duplicates
+            logger.info(
+                f"Skipped {deduplicator.duplicates} duplicate chunk(s) of {source.name} "
+                f"({deduplicator.exact_duplicates} exact, {deduplicator.near_duplicates} near)."
+            )
+        return chunks, (np.concatenate(embeddings) if embeddings else None)
+
+    async def _chunk_and_embed(self, source: SourceFile, run: _PipelineRun):
+        """Returns (chunks, embeddings) for a source, from the cache where possible."""
+        extension = os.path.splitext(source.name)[1].lower()
+        if extension == ".pdf":
+            chunks_key = self._chunks_key(source.content_hash, "pdf", "pymupdf")
+            text = None
+        elif extension in AUDIO_EXTENSIONS and self.segmented_asr:
+            if self.asr_client is None:
+                raise RuntimeError("An ASR client is required to ingest audio files.")
+            chunks_key = self._chunks_key(
+                source.content_hash, "audio", self.asr_client.model_name, self.asr_client.quant, self.language,
+                CLEAN_TEXT_OPTIONS, "segmented",
+            )
+            text = None
+        else:
+            text = await self._extract_text(source, run)
+            if not text:
+                return [], None
+            chunks_key = self._chunks_key(hash_bytes(text.encode("utf-8")))
+        embeddings_key = IngestionCache.make_key(chunks_key, self.embedding_client.model_name)
+
+        cached = self._cached("chunks", chunks_key)
+        if cached is not None:
+            chunks = [Chunk.from_dict(data, source_id=source.name) for data in cached]
+            embeddings = self._cached("embeddings", embeddings_key)
+            if embeddings is None and chunks:
+                embeddings = await self._timed("embed", run.batcher.embed([chunk.text for chunk in chunks]))
+                self._store("embeddings", embeddings_key, embeddings)
+            return chunks, embeddings
+
+        if text is None and extension == ".pdf":
+            # PDF pages go straight from the process pool into the chunker; the full text is never built
+            chunks, embeddings = await self._stream_chunks_and_embed(
+                source, lambda: self._iter_pdf_pages(source.path), "parse", run
+            )
+        elif text is None:
+            # Transcript segments are chunked (and their chunks embedded) while later segments are transcribed
+            chunks, embeddings = await self._stream_chunks_and_embed(
+                source, lambda: self._iter_transcript(source, run), "transcribe", run
+            )
+        else:
+            chunks, embeddings = await self._stream_chunks_and_embed(source, lambda: [text], "chunk", run)
+        if chunks:
+            self._store("chunks", chunks_key, [chunk.to_dict() for chunk in chunks])
+            self._store("embeddings", embeddings_key, embeddings)
+        return chunks, embeddings
+
+    async def _process(self, source: SourceFile, run: _PipelineRun) -> IngestionResult:
+        result = IngestionResult(name=source.name, path=source.path, content_hash=source.content_hash or "")
+        try:
+            if source.content_hash is None:
+                source.content_hash = await run.loop.run_in_executor(None, hash_file, source.path)
+                result.content_hash = source.content_hash
+            chunks, embeddings = await self._chunk_and_embed(source, run)
+            if not chunks:
+                result.error = f"Failed to extract text from {source.name}"
+                return result
+
+            def index() -> List[int]:
+                # Searches running meanwhile see the source's old chunks or its new ones, never a mix
+                with self.vector_store.lock.write():
+                    # Re-ingesting a source replaces whatever was indexed under its name
+                    self.vector_store.delete(self.vector_store.ids_for_source(source.name))
+                    return self.vector_store.add(
+                        embeddings, [chunk.text for chunk in chunks], metadatas=[chunk.metadata() for chunk in chunks]
+                    )
+
+            async with run.index_lock:
+                start = time.perf_counter()
+                # Off the event loop, since the write lock waits for searches in progress
+                result.chunk_ids = await run.loop.run_in_executor(None, index)
+                self._record_stage("index", start)
+            result.chunk_count = len(chunks)
+        except Exception as e:
+            logger.error(f"Failed to ingest {source.name}: {e}", exc_info=True)
+            result.error = f"Failed to ingest {source.name}: {type(e).__name__}: {e}"
+        return result
+
+    async def run(
+        self,
+        sources: Iterable[Union[str, SourceFile]],
+        on_result: Optional[Callable[[IngestionResult], Optional[Awaitable]]] = None,
+    ) -> List[IngestionResult]:
+        """
+        Ingests every source concurrently and returns one result per source,
+        in input order. `on_result` is called as each file finishes; when it
+        returns an awaitable (an async callback), the run waits for it.
+        """
+        sources = [s if isinstance(s, SourceFile) else SourceFile(path=s) for s in sources]
+        if not sources:
+            return []
+        in_flight = asyncio.Semaphore(self.max_files_in_flight)
+        self.pools.start()
+        # Shared with query embedding; the batcher keeps one batch in flight, so queries still get a thread
+        # (and the multi-process client runs them ahead of the batch's queued shards)
+        batcher = _EmbeddingBatcher(
+            self.embedding_client.embed_texts, get_model_executor("embedding"), self.embed_batch_size
+        )
+        run = _PipelineRun(asyncio.get_running_loop(), batcher)
+
+        async def bounded(source: SourceFile) -> IngestionResult:
+            async with in_flight:
+                result = await self._process(source, run)
+            if on_result:
+                outcome = on_result(result)
+                if inspect.isawaitable(outcome):
+                    await outcome
+            return result
+
+        start = time.perf_counter()
+        try:
+            results = await asyncio.gather(*(bounded(source) for source in sources))
+        finally:
+            await batcher.close()
+
+        logger.info(f"Ingested {len(sources)} file(s) in {time.perf_counter() - start:.2f}s.\n{self.report()}")
+        return list(results)
+
+    async def close(self):
+        """
+        Shuts down the pools this pipeline started (not ones passed in) once
+        their work in progress is done, without blocking the event loop. A
+        later `run` starts new pools.
+        """
+        if self._owns_pools:
+            await self.pools.close()
+
+    def report(self) -> str:
+        """Returns a per-stage throughput summary."""
+        lines = [f"{'stage':<11} {'items':>6} {'busy (s)':>9} {'wall (s)':>9} {'items/s':>8}"]
+        for stage in STAGES:
+            stats = self.stats[stage]
+            lines.append(
+                f"{stage:<11} {stats.items:>6} {stats.busy_seconds:>9.2f} {stats.wall_seconds:>9.2f} {stats.throughput:>8.2f}"
+            )
+        if self.duplicate_chunks:
+            lines.append(f"duplicate chunks skipped: {self.duplicate_chunks}")
+        return "\n".join(lines)
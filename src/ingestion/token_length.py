@@ -0,0 +1,137 @@
+# src/ingestion/token_length.py
+"""
+Token-based length measurement for chunking, using the embedding model's own
+tokenizer, and a report of how much chunk text the embedding model never sees.
+
+Report on the current knowledge base (from the project root):
+    python -m src.ingestion.token_length --kb-dir ./data/knowledge_base
+"""
+import argparse
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, List, Optional
+from ..config import settings
+from ..utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+# Upper bound on characters per token, used to size streaming-chunker buffers in token mode
+MAX_CHARS_PER_TOKEN = 8
+
+
+def load_tokenizer(model_name: Optional[str] = None):
+    """
+    Loads the (fast, Rust-backed) tokenizer of a SentenceTransformers model.
+    Bare names such as "all-MiniLM-L6-v2" resolve to the sentence-transformers
+    organization, as SentenceTransformer itself does.
+    """
+    from transformers import AutoTokenizer
+    model_name = model_name or settings.EMBEDDING_MODEL_NAME
+    repo_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    return AutoTokenizer.from_pretrained(repo_id, use_fast=True)
+
+
+class TokenCounter:
+    """
+    Counts tokens as the embedding model sees them, without special tokens.
+
+    Single texts go through an LRU cache, since text splitters measure the
+    same words and separators over and over; `count_batch` tokenizes many
+    texts in one call to the fast tokenizer.
+    """
+
+    def __init__(self, tokenizer, cache_size: int = 200_000):
+        self.tokenizer = tokenizer
+        self.count = lru_cache(maxsize=cache_size)(self._count)
+
+    def _count(self, text: str) -> int:
+        return len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def __call__(self, text: str) -> int:
+        return self.count(text)
+
+    def count_batch(self, texts: List[str], batch_size: int = 1024) -> List[int]:
+        counts = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(texts[start:start + batch_size], add_special_tokens=False)
+            counts.extend(len(ids) for ids in encoded["input_ids"])
+        return counts
+
+
+def chunk_token_budget(max_seq_length: Optional[int] = None, special_tokens: int = 2) -> int:
+    """Tokens of text a chunk may hold so that, with [CLS] and [SEP], it fits the model limit."""
+    return (max_seq_length or settings.EMBEDDING_MAX_SEQ_LENGTH) - special_tokens
+
+
+@dataclass
+class TruncationReport:
+    """How many chunk tokens fall beyond the embedding model's input limit."""
+    chunks: int = 0
+    truncated_chunks: int = 0
+    total_tokens: int = 0
+    lost_tokens: int = 0
+    longest_chunk_tokens: int = 0
+
+    @property
+    def lost_fraction(self) -> float:
+        return self.lost_tokens / self.total_tokens if self.total_tokens else 0.0
+
+    def add(self, token_counts: Iterable[int], budget: int):
+        for count in token_counts:
+            self.chunks += 1
+            self.total_tokens += count
+            self.longest_chunk_tokens = max(self.longest_chunk_tokens, count)
+            if count > budget:
+                self.truncated_chunks += 1
+                self.lost_tokens += count - budget
+
+    def summary(self) -> str:
+        return (
+            f"{self.truncated_chunks}/{self.chunks} chunks exceed the model limit; "
+            f"{self.lost_tokens}/{self.total_tokens} tokens ({self.lost_fraction:.1%}) are never embedded "
+            f"(longest chunk: {self.longest_chunk_tokens} tokens)."
+        )
+
+
+def truncation_report(
+    texts: Iterable[str],
+    counter: TokenCounter,
+    budget: Optional[int] = None,
+    batch_size: int = 1024,
+) -> TruncationReport:
+    """Measures truncation loss over chunk texts, tokenizing them in batches."""
+    budget = budget or chunk_token_budget()
+    report = TruncationReport()
+    batch: List[str] = []
+    for text in texts:
+        batch.append(text)
+        if len(batch) >= batch_size:
+            report.add(counter.count_batch(batch, batch_size), budget)
+            batch = []
+    if batch:
+        report.add(counter.count_batch(batch, batch_size), budget)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Report chunk tokens lost to embedding-model truncation.")
+    parser.add_argument("--kb-dir", default=settings.KNOWLEDGE_BASE_DIR, help="Knowledge base directory")
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL_NAME, help="Embedding model whose tokenizer to use")
+    parser.add_argument("--max-seq-length", type=int, default=settings.EMBEDDING_MAX_SEQ_LENGTH)
+    args = parser.parse_args(argv)
+
+    from ..memory.persistent_store import PersistentVectorStore
+    store = PersistentVectorStore(args.kb_dir, read_only=True)
+    try:
+        report = truncation_report(
+            store.iter_texts(), TokenCounter(load_tokenizer(args.model)), chunk_token_budget(args.max_seq_length)
+        )
+    finally:
+        store.close()
+    logger.info(report.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
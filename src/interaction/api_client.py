@@ -0,0 +1,99 @@
+# src/interaction/api_client.py
+import base64
+import http.client
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+from ..config import settings
+
+
+class ServiceError(RuntimeError):
+    """An error answered by the RAG service; `busy` is set when it was overloaded (503)."""
+
+    def __init__(self, status: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def busy(self) -> bool:
+        return self.status == 503
+
+
+class RAGServiceClient:
+    """
+    Blocking client for the RAG service's HTTP API (see api_server.py).
+
+    It only needs the standard library, so a UI can use it without importing
+    any model code. `ingest` and `chat` return iterators over the service's
+    events, which arrive as they are produced.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, timeout: Optional[float] = None):
+        url = urlsplit(base_url or settings.SERVICE_URL)
+        self.host = url.hostname or "127.0.0.1"
+        self.port = url.port or 80
+        self.timeout = settings.SERVICE_CLIENT_TIMEOUT_SECONDS if timeout is None else timeout
+
+    def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> http.client.HTTPResponse:
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        if response.status >= 400:
+            raw = response.read()
+            connection.close()
+            try:
+                message = json.loads(raw).get("error", "")
+            except ValueError:
+                message = raw.decode("utf-8", errors="replace")
+            retry_after = response.getheader("Retry-After")
+            raise ServiceError(response.status, message, float(retry_after) if retry_after else None)
+        return response
+
+    def _json(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Any:
+        with self._request(method, path, payload) as response:
+            return json.loads(response.read())
+
+    def _events(self, path: str, payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        with self._request("POST", path, payload) as response:
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+
+    def is_available(self) -> bool:
+        """Whether a service answers at the configured address."""
+        try:
+            return self._json("GET", "/health").get("status") == "ok"
+        except (OSError, ServiceError, ValueError):
+            return False
+
+    def status(self) -> Dict[str, Any]:
+        return self._json("GET", "/status")
+
+    def sources(self, session_id: Optional[str] = None) -> List[str]:
+        path = "/sources" + (f"?session_id={quote(session_id)}" if session_id else "")
+        return self._json("GET", path)["sources"]
+
+    def search(self, query: str, session_id: Optional[str] = None, top_k: int = 3) -> List[Dict[str, Any]]:
+        return self._json("POST", "/search", {"query": query, "session_id": session_id, "top_k": top_k})["results"]
+
+    def ingest(self, files: List[Tuple[str, bytes]], session_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Uploads (name, content) pairs; yields an event per file as the service finishes it."""
+        payload = {
+            "session_id": session_id,
+            "files": [{"name": name, "data": base64.b64encode(data).decode("ascii")} for name, data in files],
+        }
+        return self._events("/ingest", payload)
+
+    def chat(self, question: str, session_id: Optional[str] = None, top_k: int = 3,
+             max_tokens: int = 512) -> Iterator[Dict[str, Any]]:
+        """Yields the answer's sources, its text deltas, and a final "done" (or "error") event."""
+        payload = {"question": question, "session_id": session_id, "top_k": top_k, "max_tokens": max_tokens}
+        return self._events("/chat", payload)
+
+    def speak(self, text: str) -> bytes:
+        """Returns the WAV bytes of `text` read aloud."""
+        with self._request("POST", "/speech", {"text": text}) as response:
+            return response.read()
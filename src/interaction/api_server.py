@@ -0,0 +1,275 @@
+# src/interaction/api_server.py
+"""
+HTTP API for the RAG service, built on asyncio streams (no web framework).
+
+Usage (from the project root):
+    python -m src.interaction.api_server --host 127.0.0.1 --port 8765
+
+Endpoints (request and response bodies are JSON):
+    GET  /health                                  -> {"status": "ok"}
+    GET  /status                                  -> model readiness, startup profile, queue depths
+    GET  /sources?session_id=...                  -> {"sources": [file names]}
+    POST /search {"query", "session_id", "top_k"} -> {"results": [...]}
+    POST /ingest {"session_id", "files": [{"name", "data" (base64)}]} -> NDJSON events, one per file
+    POST /chat {"question", "session_id", "top_k", "max_tokens"}      -> NDJSON events as the answer streams
+    POST /speech {"text"}                         -> audio/wav
+
+Streamed responses are newline-delimited JSON, flushed event by event, and
+end when the connection closes. A request that cannot be queued gets 503
+with a Retry-After header, before any of its work starts.
+"""
+import argparse
+import asyncio
+import base64
+import binascii
+import json
+import threading
+from http import HTTPStatus
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from ..config import settings
+from ..utils.logger_config import setup_logger
+from .rag_service import RAGService, ServiceBusyError, Upload
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+
+_ROUTES = {
+    ("GET", "/health"), ("GET", "/status"), ("GET", "/sources"),
+    ("POST", "/search"), ("POST", "/ingest"), ("POST", "/chat"), ("POST", "/speech"),
+}
+
+
+class BadRequestError(ValueError):
+    """A malformed request; answered with 400."""
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _field(body: Dict[str, Any], name: str, kind: type, default: Any = ...) -> Any:
+    value = body.get(name, default)
+    if value is ...:
+        raise BadRequestError(f"Missing field '{name}'.")
+    if value is not None and value is not default and not isinstance(value, kind):
+        raise BadRequestError(f"Field '{name}' must be of type {kind.__name__}.")
+    return value
+
+
+class RAGServer:
+    """Serves a RAGService over HTTP/1.1, one request per connection."""
+
+    def __init__(self, service: RAGService, host: Optional[str] = None, port: Optional[int] = None,
+                 max_body_bytes: Optional[int] = None):
+        self.service = service
+        self.host = host or settings.SERVICE_HOST
+        self.port = settings.SERVICE_PORT if port is None else port
+        self.max_body_bytes = max_body_bytes or settings.SERVICE_MAX_UPLOAD_MB * 1024 * 1024
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Port 0 binds any free port; report the one actually used
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"RAG service listening on http://{self.host}:{self.port}")
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    # --- HTTP ---
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str], bytes]:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) != 3:
+            raise BadRequestError("Malformed request line.")
+        method, target, _ = request_line
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            raise BadRequestError("Invalid Content-Length header.")
+        if length > self.max_body_bytes:
+            raise _HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Request body exceeds {self.max_body_bytes} bytes.")
+        body = await reader.readexactly(length) if length else b""
+        return method, target, headers, body
+
+    @staticmethod
+    def _head(status: HTTPStatus, content_type: str, length: Optional[int] = None, extra: Optional[Dict[str, str]] = None) -> bytes:
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}", f"Content-Type: {content_type}", "Connection: close"]
+        if length is not None:
+            lines.append(f"Content-Length: {length}")
+        lines.extend(f"{name}: {value}" for name, value in (extra or {}).items())
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def _send(self, writer: asyncio.StreamWriter, status: HTTPStatus, body: bytes,
+                    content_type: str = "application/json", extra: Optional[Dict[str, str]] = None):
+        writer.write(self._head(status, content_type, len(body), extra) + body)
+        await writer.drain()
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: HTTPStatus, payload: Any, extra: Optional[Dict[str, str]] = None):
+        await self._send(writer, status, json.dumps(payload).encode("utf-8"), extra=extra)
+
+    async def _send_events(self, writer: asyncio.StreamWriter, events: AsyncIterator[Dict[str, Any]]):
+        try:
+            # Admission happens before the first event, so a busy service can still answer 503
+            first = await events.__anext__()
+        except StopAsyncIteration:
+            first = None
+        try:
+            writer.write(self._head(HTTPStatus.OK, "application/x-ndjson"))
+            if first is not None:
+                writer.write(json.dumps(first).encode("utf-8") + b"\n")
+            await writer.drain()
+            try:
+                async for event in events:
+                    writer.write(json.dumps(event).encode("utf-8") + b"\n")
+                    # Waiting for the socket to drain paces the producer to the client
+                    await writer.drain()
+            except ConnectionError:
+                raise
+            except Exception as e:
+                # The status line is already sent, so the failure is reported in the stream
+                logger.error(f"Error while streaming a response: {e}", exc_info=True)
+                writer.write(json.dumps({"type": "error", "busy": False, "message": f"{type(e).__name__}: {e}"}).encode("utf-8") + b"\n")
+                await writer.drain()
+        finally:
+            # Closing early (e.g. the client went away) frees the request's LLM batch slot
+            await events.aclose()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                method, target, _, body = await self._read_request(reader)
+                await self._route(writer, method, target, body)
+            except _HTTPError as e:
+                await self._send_json(writer, e.status, {"error": str(e)})
+            except BadRequestError as e:
+                await self._send_json(writer, HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            except ServiceBusyError as e:
+                await self._send_json(writer, HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(e), "busy": True},
+                                      extra={"Retry-After": "1"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            logger.info("Client disconnected before the response was complete.")
+        except Exception as e:
+            logger.error(f"Error while handling a request: {e}", exc_info=True)
+            try:
+                await self._send_json(writer, HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"})
+            except Exception:
+                pass # The response was already under way or the client is gone
+        finally:
+            writer.close()
+
+    async def _route(self, writer: asyncio.StreamWriter, method: str, target: str, raw_body: bytes):
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        if (method, url.path) not in _ROUTES:
+            if any(path == url.path for _, path in _ROUTES):
+                raise _HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not supported on {url.path}.")
+            raise _HTTPError(HTTPStatus.NOT_FOUND, f"No endpoint at {url.path}.")
+
+        if method == "GET":
+            if url.path == "/health":
+                await self._send_json(writer, HTTPStatus.OK, {"status": "ok"})
+            elif url.path == "/status":
+                await self._send_json(writer, HTTPStatus.OK, self.service.status())
+            else:
+                await self._send_json(writer, HTTPStatus.OK, {"sources": self.service.sources(query.get("session_id"))})
+            return
+
+        try:
+            body = json.loads(raw_body or b"{}")
+        except json.JSONDecodeError as e:
+            raise BadRequestError(f"Request body is not valid JSON: {e}")
+        if not isinstance(body, dict):
+            raise BadRequestError("Request body must be a JSON object.")
+        session_id = _field(body, "session_id", str, None)
+
+        if url.path == "/search":
+            results = await self.service.search(_field(body, "query", str), session_id, top_k=_field(body, "top_k", int, 3))
+            await self._send_json(writer, HTTPStatus.OK, {"results": results})
+        elif url.path == "/chat":
+            await self._send_events(writer, self.service.chat(
+                _field(body, "question", str), session_id,
+                top_k=_field(body, "top_k", int, 3), max_tokens=_field(body, "max_tokens", int, 512),
+            ))
+        elif url.path == "/ingest":
+            uploads = []
+            for item in _field(body, "files", list):
+                if not isinstance(item, dict):
+                    raise BadRequestError("Each file must be an object with 'name' and 'data'.")
+                try:
+                    data = base64.b64decode(_field(item, "data", str), validate=True)
+                except binascii.Error:
+                    raise BadRequestError(f"File '{item.get('name')}' is not valid base64.")
+                uploads.append(Upload(name=_field(item, "name", str), data=data))
+            await self._send_events(writer, self.service.ingest(uploads, session_id))
+        else:
+            audio = await self.service.speak(_field(body, "text", str))
+            await self._send(writer, HTTPStatus.OK, audio, content_type="audio/wav")
+
+
+def serve_in_background(service: Optional[RAGService] = None, host: Optional[str] = None,
+                        port: Optional[int] = None) -> RAGServer:
+    """
+    Runs the server on its own event loop in a daemon thread and returns it
+    once it is listening. This is how the app hosts the service in-process.
+    """
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    holder: Dict[str, Any] = {}
+
+    def run():
+        asyncio.set_event_loop(loop)
+        try:
+            server = RAGServer(service or RAGService(), host, port)
+            loop.run_until_complete(server.start())
+            holder["server"] = server
+        except Exception as e:
+            holder["error"] = e
+            return
+        finally:
+            started.set()
+        loop.run_until_complete(server.serve_forever())
+
+    threading.Thread(target=run, name="rag-service", daemon=True).start()
+    started.wait()
+    if "error" in holder:
+        raise holder["error"]
+    return holder["server"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve ingest, search and chat over HTTP.")
+    parser.add_argument("--host", default=settings.SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVICE_PORT)
+    args = parser.parse_args()
+
+    async def serve():
+        service = RAGService()
+        try:
+            await RAGServer(service, args.host, args.port).serve_forever()
+        finally:
+            service.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        logger.info("RAG service stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+# src/interaction/rag_service.py
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+from ..config import settings
+from ..utils.logger_config import setup_logger
+from ..external_services.backends import create_asr_client, create_llm_client, create_tts_client
+from ..external_services.embedding_pool import create_embedding_client
+from ..external_services.llm_client import GenerationStats
+from ..external_services.llm_scheduler import LLMScheduler, SchedulerOverloadedError
+from ..external_services.model_executor import ModelTimeoutError, model_executor_stats
+from ..external_services.model_pool import ModelWarmPool
+from ..ingestion.document_parser import TextProcessor
+from ..ingestion.ingestion_cache import IngestionCache, hash_bytes
+from ..ingestion.pipeline import AUDIO_EXTENSIONS, IngestionPipeline, IngestionPools, SourceFile
+from ..memory.answer_cache import SemanticAnswerCache
+from ..memory.diversity import diversify
+from ..memory.hybrid_index import HybridIndex
+from ..memory.index_factory import create_vector_index
+from ..memory.persistent_store import PersistentVectorStore
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+SYSTEM_PROMPT = (
+    "You are a helpful research assistant. Answer the user's question based *only* on the following context provided. "
+    "Each context passage starts with its source in brackets; cite the sources you use. If the answer is not in the context, say so."
+)
+NO_CONTEXT_ANSWER = (
+    "I couldn't find any relevant information in the uploaded documents to answer your question. "
+    "Please try processing a file first."
+)
+
+
+class ServiceBusyError(RuntimeError):
+    """Raised when a request arrives while its endpoint's wait queue is full."""
+
+
+class AdmissionQueue:
+    """
+    Bounds the requests an endpoint works on at once. Up to `max_active`
+    requests run; up to `max_waiting` more wait in FIFO order, and any
+    request beyond that is rejected with ServiceBusyError right away, so an
+    overloaded service answers "busy" instead of building an unbounded backlog.
+    """
+
+    def __init__(self, name: str, max_active: int, max_waiting: int):
+        self.name = name
+        self.max_active = max_active
+        self.max_waiting = max_waiting
+        self._semaphore = asyncio.Semaphore(max_active)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    async def acquire(self):
+        if self._semaphore.locked() and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise ServiceBusyError(f"The {self.name} queue is full ({self.waiting} requests waiting).")
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {"active": self.active, "waiting": self.waiting, "rejected": self.rejected}
+
+
+@dataclass
+class Upload:
+    """A file sent to the service for ingestion."""
+    name: str
+    data: bytes
+
+
+@dataclass
+class _Session:
+    vector_store: Any
+    answer_cache: SemanticAnswerCache
+    source_hashes: Dict[str, str] = field(default_factory=dict) # Content hash -> name it was first ingested as
+    last_used: float = field(default_factory=time.monotonic)
+
+
+def create_model_pool() -> ModelWarmPool:
+    """Warm pool of every model the service uses; PRELOAD_MODELS start loading right away."""
+    pool = ModelWarmPool()
+    loaders = {"embedding": create_embedding_client, "llm": create_llm_client, "asr": create_asr_client, "tts": create_tts_client}
+    for name, loader in loaders.items():
+        pool.register(name, loader, eager=name in settings.PRELOAD_MODELS)
+    pool.start()
+    return pool
+
+
+def cite(result) -> str:
+    """Human-readable source of a retrieved chunk, e.g. "manual.pdf, p. 3-4"."""
+    meta = result.metadata
+    citation = meta.get("source") or "unknown source"
+    if meta.get("page_start") is not None:
+        pages = meta["page_start"] if meta["page_start"] == meta["page_end"] else f"{meta['page_start']}-{meta['page_end']}"
+        citation += f", p. {pages}"
+    return citation
+
+
+class RAGService:
+    """
+    Ingest, search and chat over one shared set of models, independent of any UI.
+
+    A single instance serves every client: the models live in one warm pool
+    and generation goes through one continuous-batching LLM scheduler. With
+    PERSIST_KNOWLEDGE_BASE every session reads and writes the shared knowledge
+    base; otherwise each session id gets its own in-memory index, dropped
+    after SERVICE_SESSION_IDLE_MINUTES without use. Chat, ingest and speech
+    requests pass through bounded admission queues (see AdmissionQueue).
+
+    `ingest` and `chat` are async generators of JSON-ready event dicts, so a
+    transport can forward them as they happen. Both are admitted before the
+    first event is produced: a ServiceBusyError is raised by the first
+    `__anext__`, before anything has been sent.
+    """
+
+    def __init__(
+        self,
+        model_pool: Optional[ModelWarmPool] = None,
+        text_processor: Optional[TextProcessor] = None,
+        knowledge_base=None,
+        ingestion_cache: Optional[IngestionCache] = None,
+        persist: Optional[bool] = None,
+        max_concurrent_chats: Optional[int] = None,
+        max_concurrent_ingests: Optional[int] = None,
+        max_queued_requests: Optional[int] = None,
+        session_idle_seconds: Optional[float] = None,
+        upload_dir: str = "./data/temp_files",
+    ):
+        self.model_pool = model_pool or create_model_pool()
+        self.text_processor = text_processor or TextProcessor.from_settings()
+        persist = settings.PERSIST_KNOWLEDGE_BASE if persist is None else persist
+        if knowledge_base is None and persist:
+            store = PersistentVectorStore(settings.KNOWLEDGE_BASE_DIR)
+            knowledge_base = HybridIndex(store) if settings.HYBRID_SEARCH else store
+        self.knowledge_base = knowledge_base
+        self.ingestion_cache = ingestion_cache if ingestion_cache is not None else IngestionCache(settings.INGESTION_CACHE_DIR)
+        self.upload_dir = upload_dir
+        self.session_idle_seconds = (
+            settings.SERVICE_SESSION_IDLE_MINUTES * 60 if session_idle_seconds is None else session_idle_seconds
+        )
+        max_queued = settings.SERVICE_MAX_QUEUED_REQUESTS if max_queued_requests is None else max_queued_requests
+        self.queues = {
+            "chat": AdmissionQueue("chat", max_concurrent_chats or settings.SERVICE_MAX_CONCURRENT_CHATS, max_queued),
+            "ingest": AdmissionQueue("ingest", max_concurrent_ingests or settings.SERVICE_MAX_CONCURRENT_INGESTS, max_queued),
+            "speech": AdmissionQueue("speech", 1, max_queued),
+        }
+        self._shared_session: Optional[_Session] = None
+        if self.knowledge_base is not None:
+            self._shared_session = _Session(
+                vector_store=self.knowledge_base,
+                answer_cache=SemanticAnswerCache(), # Shared, like the knowledge base it answers from
+                source_hashes=self.knowledge_base.source_hashes(),
+            )
+        self._sessions: Dict[str, _Session] = {}
+        self._llm_scheduler: Optional[LLMScheduler] = None
+        # Shared by every upload, so worker processes are started (and load their NLP models) once
+        self._ingestion_pools = IngestionPools()
+
+    # --- Shared state ---
+
+    def _session(self, session_id: Optional[str]) -> _Session:
+        if self._shared_session is not None:
+            return self._shared_session
+        now = time.monotonic()
+        if self.session_idle_seconds > 0:
+            for expired in [sid for sid, s in self._sessions.items() if now - s.last_used > self.session_idle_seconds]:
+                logger.info(f"Dropping idle session {expired}.")
+                del self._sessions[expired]
+        session_id = session_id or "default"
+        session = self._sessions.get(session_id)
+        if session is None:
+            # Sized by the first embeddings added, so any embedding model fits
+            index = create_vector_index()
+            session = _Session(
+                vector_store=HybridIndex(index) if settings.HYBRID_SEARCH else index,
+                # Answers are only valid for the index they were generated from
+                answer_cache=SemanticAnswerCache(),
+            )
+            self._sessions[session_id] = session
+        session.last_used = now
+        return session
+
+    async def _model(self, name: str):
+        # Waits for the warm pool without blocking the event loop
+        return await asyncio.wrap_future(self.model_pool.load(name))
+
+    async def _scheduler(self) -> LLMScheduler:
+        if self._llm_scheduler is None:
+            llm = await self._model("llm")
+            if self._llm_scheduler is None:
+                # Shared by every client so concurrent chats are decoded in one batch
+                self._llm_scheduler = LLMScheduler(llm)
+        return self._llm_scheduler
+
+    def sources(self, session_id: Optional[str] = None) -> List[str]:
+        """Names of the files ingested into the session's index."""
+        if self.knowledge_base is not None:
+            return sorted(self.knowledge_base.list_sources())
+        return sorted(set(self._session(session_id).source_hashes.values()))
+
+    def status(self) -> Dict[str, Any]:
+        """Model readiness, the startup profile, and queue depths."""
+        return {
+            "models": [asdict(status) for status in self.model_pool.statuses()],
+            "profile": self.model_pool.profile_report(),
+            "queues": {name: queue.stats() for name, queue in self.queues.items()},
+            "llm_scheduler": self._llm_scheduler.stats() if self._llm_scheduler is not None else None,
+            "model_executors": model_executor_stats(),
+            "sessions": len(self._sessions),
+        }
+
+    # --- Search ---
+
+    async def _retrieve(self, session: _Session, query_embedding, query_text: str, top_k: int):
+        """
+        Finds the most relevant chunks, fusing in keyword (BM25) matches on the
+        query text when hybrid search is on. A wider candidate set is re-ranked
+        with MMR so the chunks kept are not near-copies.
+        """
+        vector_store = session.vector_store
+        candidates = max(top_k, settings.RETRIEVAL_MMR_CANDIDATES)
+
+        def search():
+            # Ingestion may be replacing chunks; MMR must see the same index the search did
+            with vector_store.lock.read():
+                if isinstance(vector_store, HybridIndex):
+                    results = vector_store.search(query_embedding, top_k=candidates, query_text=query_text)
+                else:
+                    results = vector_store.search(query_embedding, top_k=candidates)
+                if settings.RETRIEVAL_MMR_CANDIDATES > 0:
+                    return diversify(vector_store, results, top_k)
+                return results[:top_k]
+
+        return await asyncio.get_running_loop().run_in_executor(None, search)
+
+    async def _embed_query(self, text: str):
+        embedding_client = await self._model("embedding")
+        return await embedding_client.aembed_query(text)
+
+    async def search(self, query: str, session_id: Optional[str] = None, top_k: int = 3) -> List[Dict[str, Any]]:
+        """Returns the top_k chunks for a query, each with its text, score, metadata and citation."""
+        session = self._session(session_id)
+        results = await self._retrieve(session, await self._embed_query(query), query, top_k)
+        return [
+            {"id": r.id, "score": float(r.score), "text": r.text, "metadata": r.metadata, "citation": cite(r)}
+            for r in results
+        ]
+
+    # --- Chat ---
+
+    async def chat(
+        self, question: str, session_id: Optional[str] = None, top_k: int = 3, max_tokens: int = 512
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Answers a question from the session's documents. Yields, in order:
+        `{"type": "sources", "sources": [...]}` once retrieval is done, then
+        `{"type": "delta", "text": ...}` as the answer streams, and finally
+        `{"type": "done", ...}` with the generation stats, or details of
+        the cached answer that was reused. If generation fails midway, an
+        `{"type": "error", "message": ..., "busy": bool}` event replaces "done".
+        """
+        session = self._session(session_id)
+        async with self.queues["chat"].slot():
+            answer_cache = session.answer_cache
+            # Read before retrieval so an answer is never cached against a newer index than it saw
+            index_version = session.vector_store.version
+            cached = answer_cache.lookup_exact(question, index_version)
+            results = []
+            if cached is None:
+                query_embedding = await self._embed_query(question)
+                results = await self._retrieve(session, query_embedding, question, top_k)
+                chunk_ids = [result.id for result in results]
+                if results:
+                    cached = answer_cache.lookup_similar(query_embedding, chunk_ids, index_version)
+
+            if cached is not None:
+                yield {"type": "sources", "sources": cached.sources}
+                yield {"type": "delta", "text": cached.answer}
+                yield {"type": "done", "cached": {"question": cached.question, "similarity": cached.similarity}}
+                return
+            if not results:
+                yield {"type": "sources", "sources": []}
+                yield {"type": "delta", "text": NO_CONTEXT_ANSWER}
+                yield {"type": "done"}
+                return
+
+            sources = list(dict.fromkeys(cite(result) for result in results))
+            yield {"type": "sources", "sources": sources}
+            context_str = "\n\n---\n\n".join(f"[{cite(result)}]\n{result.text}" for result in results)
+            full_prompt = f"CONTEXT:\n{context_str}\n\nQUESTION:\n{question}"
+
+            stats = GenerationStats()
+            answer = ""
+            try:
+                scheduler = await self._scheduler()
+                async for delta in scheduler.stream(full_prompt, system_prompt=SYSTEM_PROMPT, max_tokens=max_tokens,
+                                                    stats=stats, timeout=settings.LLM_TIMEOUT_SECONDS):
+                    answer += delta
+                    yield {"type": "delta", "text": delta}
+            except SchedulerOverloadedError:
+                logger.warning("LLM scheduler queue is full; rejecting request.")
+                yield {"type": "error", "busy": True,
+                       "message": "The assistant is busy with other requests. Please try again in a moment."}
+                return
+            except ModelTimeoutError as e:
+                logger.warning(f"Chat generation stopped: {e}")
+                yield {"type": "error", "busy": True,
+                       "message": "The assistant took too long to answer. Please try again in a moment."}
+                return
+            except Exception as e:
+                logger.error(f"Error while streaming the LLM response: {e}", exc_info=True)
+                yield {"type": "error", "busy": False, "message": f"Error: Could not generate text. Error: {type(e).__name__}"}
+                return
+            answer_cache.store(question, query_embedding, chunk_ids, answer, index_version, sources=sources)
+            yield {"type": "done", "stats": asdict(stats)}
+
+    # --- Ingest ---
+
+    async def ingest(self, uploads: List[Upload], session_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Parses, chunks, embeds and indexes uploaded files. Yields one event per
+        file as it finishes: `{"type": "skipped", "name", "duplicate_of"}` for
+        content already ingested, `{"type": "processed", "name", "chunk_count"}`
+        or `{"type": "failed", "name", "error"}`, then `{"type": "done"}`.
+        Files already accepted are still ingested if the caller stops listening.
+        """
+        session = self._session(session_id)
+        queue = self.queues["ingest"]
+        await queue.acquire()
+        released = False
+        try:
+            upload_dir = None
+            sources = []
+            accepted: Dict[str, str] = {}
+            for i, upload in enumerate(uploads):
+                # Avoid re-processing the same content, whatever the file is called
+                content_hash = hash_bytes(upload.data)
+                duplicate_of = session.source_hashes.get(content_hash) or accepted.get(content_hash)
+                if duplicate_of is not None:
+                    yield {"type": "skipped", "name": upload.name, "duplicate_of": duplicate_of}
+                    continue
+                accepted[content_hash] = upload.name
+                if upload_dir is None:
+                    os.makedirs(self.upload_dir, exist_ok=True)
+                    upload_dir = tempfile.mkdtemp(dir=self.upload_dir)
+                path = os.path.join(upload_dir, f"{i}_{os.path.basename(upload.name)}")
+                with open(path, "wb") as f:
+                    f.write(upload.data)
+                sources.append(SourceFile(path=path, name=upload.name, content_hash=content_hash))
+            if not sources:
+                yield {"type": "done"}
+                return
+
+            # The ASR model is only loaded once audio is uploaded
+            has_audio = any(os.path.splitext(source.name)[1].lower() in AUDIO_EXTENSIONS for source in sources)
+            pipeline = IngestionPipeline(
+                self.text_processor,
+                await self._model("embedding"),
+                session.vector_store,
+                asr_client=await self._model("asr") if has_audio else None,
+                cache=self.ingestion_cache,
+                pools=self._ingestion_pools,
+            )
+            events: asyncio.Queue = asyncio.Queue()
+            loop = asyncio.get_running_loop()
+
+            async def on_result(result):
+                event = {"type": "failed", "name": result.name, "error": result.error}
+                if not result.error:
+                    try:
+                        if self.knowledge_base is not None:
+                            # Off the event loop: the write can wait on a batch ingest in another process
+                            await loop.run_in_executor(None, lambda: self.knowledge_base.add_source(
+                                result.name, result.chunk_count, content_hash=result.content_hash
+                            ))
+                        session.source_hashes[result.content_hash] = result.name
+                        event = {"type": "processed", "name": result.name, "chunk_count": result.chunk_count}
+                    except Exception as e:
+                        logger.error(f"Failed to record source {result.name}: {e}", exc_info=True)
+                        event["error"] = f"Failed to record {result.name}: {type(e).__name__}: {e}"
+                events.put_nowait(event)
+                os.remove(result.path)
+
+            async def run():
+                try:
+                    await pipeline.run(sources, on_result=on_result)
+                finally:
+                    shutil.rmtree(upload_dir, ignore_errors=True)
+                    queue.release()
+                    events.put_nowait(None)
+
+            # The run owns the admission slot from here on, so it is released when ingestion ends
+            task = asyncio.ensure_future(run())
+            released = True
+            while (event := await events.get()) is not None:
+                yield event
+            await task
+            yield {"type": "done"}
+        finally:
+            if not released:
+                queue.release()
+
+    # --- Speech ---
+
+    async def speak(self, text: str) -> bytes:
+        """Synthesizes `text` and returns the WAV file's bytes."""
+        async with self.queues["speech"].slot():
+            tts_client = await self._model("tts")
+            with tempfile.TemporaryDirectory() as work_dir:
+                path = await tts_client.synthesize_speech(text, os.path.join(work_dir, "speech.wav"))
+                if path.startswith("Error:"):
+                    raise RuntimeError(path)
+                with open(path, "rb") as f:
+                    return f.read()
+
+    def close(self):
+        if self._llm_scheduler is not None:
+            self._llm_scheduler.stop()
+        # Called on the way out, so worker processes are not waited for
+        self._ingestion_pools.shutdown(wait=False)
+        self.model_pool.close()
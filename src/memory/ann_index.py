@@ -0,0 +1,174 @@
+# src/memory/ann_index.py
+from typing import List, Optional
+import numpy as np
+from ..config import settings
+from ..utils.logger_config import setup_logger
+from .vector_index import VectorIndex
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+
+def spherical_kmeans(
+    vectors: np.ndarray,
+    n_clusters: int,
+    n_iter: int = 10,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Clusters L2-normalized vectors by cosine similarity and returns the
+    normalized centroids, shape (n_clusters, dim).
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, vectors.shape[0])
+    centroids = vectors[rng.choice(vectors.shape[0], n_clusters, replace=False)].copy()
+
+    for _ in range(n_iter):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=n_clusters)
+
+        # Re-seed empty clusters with random points so every list stays in use
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            sums[empty] = vectors[rng.choice(vectors.shape[0], empty.size, replace=False)]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+
+    return centroids
+
+
+class IVFIndex(VectorIndex):
+    """
+    Approximate cosine-similarity index using an inverted file (IVF).
+
+    A spherical k-means coarse quantizer partitions the vectors into `nlist`
+    lists; a query only scores the rows of its `nprobe` closest lists. Each
+    list keeps an array of its rows, so probing costs time proportional to
+    the rows probed rather than to the index size. Until enough vectors have
+    been added to train the quantizer, searches are exact. The quantizer is
+    retrained whenever the index has grown `retrain_factor` times since the
+    last training.
+    """
+
+    def __init__(
+        self,
+        dim: Optional[int] = None,
+        nlist: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        initial_capacity: int = 1024,
+        min_train_size: Optional[int] = None,
+        retrain_factor: float = 4.0,
+        train_sample_size: Optional[int] = None,
+        seed: int = 0,
+        precision: Optional[str] = None,
+    ):
+        super().__init__(dim=dim, initial_capacity=initial_capacity, precision=precision)
+        self.nlist = nlist or settings.IVF_NLIST
+        self.nprobe = nprobe or settings.IVF_NPROBE
+        self.min_train_size = min_train_size or self.nlist * 39
+        self.retrain_factor = retrain_factor
+        self.train_sample_size = train_sample_size or self.nlist * 256
+        self.seed = seed
+        self._centroids: Optional[np.ndarray] = None
+        self._trained_size = 0
+        self._lists = np.full(self.capacity, -1, dtype=np.int32) # Row -> inverted list (-1: none)
+        self._positions = np.zeros(self.capacity, dtype=np.int64) # Row -> its slot in the list's row array
+        self._list_rows: List[np.ndarray] = [] # List -> rows, in the first _list_sizes[list] slots
+        self._list_sizes = np.zeros(0, dtype=np.int64)
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    def _resize(self, new_capacity: int):
+        super()._resize(new_capacity)
+        lists = np.full(new_capacity, -1, dtype=np.int32)
+        lists[:self._size] = self._lists[:self._size]
+        self._lists = lists
+        positions = np.zeros(new_capacity, dtype=np.int64)
+        positions[:self._size] = self._positions[:self._size]
+        self._positions = positions
+
+    def _on_row_removed(self, row: int):
+        list_id = self._lists[row]
+        if list_id < 0:
+            return
+        # The list's last member takes the removed row's slot
+        members = self._list_rows[list_id]
+        last = self._list_sizes[list_id] - 1
+        moved = members[last]
+        members[self._positions[row]] = moved
+        self._positions[moved] = self._positions[row]
+        self._list_sizes[list_id] = last
+        self._lists[row] = -1
+
+    def _move_row(self, src: int, dst: int):
+        super()._move_row(src, dst)
+        list_id = self._lists[src]
+        self._lists[dst] = list_id
+        if list_id >= 0:
+            self._list_rows[list_id][self._positions[src]] = dst
+            self._positions[dst] = self._positions[src]
+        self._lists[src] = -1
+
+    def _add_to_lists(self, rows: np.ndarray):
+        """Appends rows, already labeled in `_lists`, to their lists' row arrays."""
+        labels = self._lists[rows]
+        order = np.argsort(labels, kind="stable")
+        rows, labels = rows[order], labels[order]
+        for group in np.split(rows, np.flatnonzero(np.diff(labels)) + 1):
+            list_id = self._lists[group[0]]
+            size = self._list_sizes[list_id]
+            members = self._list_rows[list_id]
+            if size + len(group) > members.shape[0]:
+                grown = np.empty(max(2 * members.shape[0], size + len(group), 16), dtype=np.int64)
+                grown[:size] = members[:size]
+                members = self._list_rows[list_id] = grown
+            members[size:size + len(group)] = group
+            self._positions[group] = np.arange(size, size + len(group))
+            self._list_sizes[list_id] = size + len(group)
+
+    def _assign(self, start: int, end: int, batch_size: int = 65536):
+        """Assigns rows [start, end) to their nearest coarse centroid."""
+        for batch_start in range(start, end, batch_size):
+            batch_end = min(batch_start + batch_size, end)
+            scores = self._rows(slice(batch_start, batch_end)) @ self._centroids.T
+            self._lists[batch_start:batch_end] = np.argmax(scores, axis=1)
+        if end > start:
+            self._add_to_lists(np.arange(start, end))
+
+    def train(self):
+        """(Re)trains the coarse quantizer on a sample of the indexed vectors."""
+        if self._size == 0:
+            return
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(self._size, self.train_sample_size)
+        sample_rows = rng.choice(self._size, sample_size, replace=False)
+        logger.info(f"Training IVF quantizer with nlist={self.nlist} on {sample_size} of {self._size} vectors...")
+        self._centroids = spherical_kmeans(self._rows(sample_rows), self.nlist, seed=self.seed)
+        self._list_rows = [np.empty(0, dtype=np.int64) for _ in range(self._centroids.shape[0])]
+        self._list_sizes = np.zeros(self._centroids.shape[0], dtype=np.int64)
+        self._assign(0, self._size)
+        self._trained_size = self._size
+
+    def _on_rows_added(self, start: int, end: int):
+        if not self.is_trained:
+            if self._size >= self.min_train_size:
+                self.train()
+        elif self._size >= self._trained_size * self.retrain_factor:
+            self.train()
+        else:
+            self._assign(start, end)
+
+    def _candidate_rows(self, query: np.ndarray) -> Optional[np.ndarray]:
+        if not self.is_trained:
+            return None
+        nprobe = min(self.nprobe, self._centroids.shape[0])
+        if nprobe >= self._centroids.shape[0]:
+            return None
+        centroid_scores = self._centroids @ query
+        probes = np.argpartition(centroid_scores, -nprobe)[-nprobe:]
+        return np.concatenate([self._list_rows[list_id][:self._list_sizes[list_id]] for list_id in probes])
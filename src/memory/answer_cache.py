@@ -0,0 +1,175 @@
+# src/memory/answer_cache.py
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Dict, FrozenSet, Iterable, List, Optional
+import numpy as np
+from ..config import settings
+from ..utils.logger_config import setup_logger
+from .vector_index import VectorIndex
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+
+def normalize_question(text: str) -> str:
+    """Case- and whitespace-insensitive form of a question, used for exact matches."""
+    return " ".join(text.lower().split())
+
+
+@dataclass
+class CachedAnswer:
+    """An answer generated for a question over a specific set of retrieved chunks."""
+    question: str
+    embedding: np.ndarray
+    chunk_ids: FrozenSet[int]
+    answer: str
+    created_at: float
+    sources: List[str] = field(default_factory=list) # Citations shown with the answer
+    similarity: float = 1.0 # Similarity to the question that retrieved it from the cache
+
+
+class SemanticAnswerCache:
+    """
+    LRU cache of generated answers with a time-to-live.
+
+    A question is answered from the cache in one of two ways:
+    - `lookup_exact`: the same question (ignoring case and spacing) was asked
+      before, so embedding and retrieval can be skipped entirely;
+    - `lookup_similar`: after retrieval, a previous question whose embedding
+      is at least `similarity_threshold` similar *and* which retrieved exactly
+      the same chunks was asked before.
+
+    Every entry is tied to the index version it was generated against; when
+    the index changes (documents added or removed) the whole cache is dropped.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.similarity_threshold = (
+            settings.ANSWER_CACHE_SIMILARITY_THRESHOLD if similarity_threshold is None else similarity_threshold
+        )
+        self.max_entries = settings.ANSWER_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.ttl_seconds = settings.ANSWER_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._index_version: Optional[int] = None
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def invalidate(self):
+        """Drops every cached answer."""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def _sync_version(self, index_version: int):
+        """Clears the cache if the index has changed since the entries were made."""
+        if self._index_version != index_version:
+            if self._entries:
+                logger.info(f"Index changed; dropping {len(self._entries)} cached answer(s).")
+                self._entries.clear()
+                self.invalidations += 1
+            self._index_version = index_version
+
+    def _expired(self, entry: CachedAnswer, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - entry.created_at > self.ttl_seconds
+
+    def lookup_exact(self, question: str, index_version: int) -> Optional[CachedAnswer]:
+        """Returns the answer to a previously asked identical question, if still valid."""
+        key = normalize_question(question)
+        with self._lock:
+            self._sync_version(index_version)
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry, time.time()):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return replace(entry, similarity=1.0)
+
+    def lookup_similar(
+        self,
+        query_embedding: np.ndarray,
+        chunk_ids: Iterable[int],
+        index_version: int,
+    ) -> Optional[CachedAnswer]:
+        """
+        Returns the cached answer whose question is most similar to the query
+        among those that retrieved exactly `chunk_ids`, if it clears the
+        similarity threshold. Counts a miss otherwise.
+        """
+        chunk_ids = frozenset(chunk_ids)
+        query = VectorIndex._normalize(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+        now = time.time()
+        with self._lock:
+            self._sync_version(index_version)
+            for key in [k for k, e in self._entries.items() if self._expired(e, now)]:
+                del self._entries[key]
+            candidates = [(k, e) for k, e in self._entries.items() if e.chunk_ids == chunk_ids]
+            if not candidates:
+                self.misses += 1
+                return None
+            scores = np.stack([e.embedding for _, e in candidates]) @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity_threshold:
+                self.misses += 1
+                return None
+            key, entry = candidates[best]
+            self._entries.move_to_end(key)
+            self.semantic_hits += 1
+            return replace(entry, similarity=float(scores[best]))
+
+    def store(
+        self,
+        question: str,
+        query_embedding: np.ndarray,
+        chunk_ids: Iterable[int],
+        answer: str,
+        index_version: int,
+        sources: Optional[List[str]] = None,
+    ):
+        """Caches an answer generated against the given index version."""
+        if self.max_entries <= 0:
+            return
+        key = normalize_question(question)
+        embedding = VectorIndex._normalize(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+        with self._lock:
+            if self._index_version is not None and index_version < self._index_version:
+                # The index changed while the answer was being generated
+                return
+            self._sync_version(index_version)
+            self._entries.pop(key, None)
+            self._entries[key] = CachedAnswer(
+                question=question,
+                embedding=embedding,
+                chunk_ids=frozenset(chunk_ids),
+                answer=answer,
+                created_at=time.time(),
+                sources=list(sources or []),
+            )
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """Returns hit counters and the current size."""
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "invalidations": self.invalidations,
+        }
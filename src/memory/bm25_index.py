@@ -0,0 +1,83 @@
+# src/memory/bm25_index.py
+import heapq
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, Sequence, Tuple
+from ..config import settings
+from ..utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+
+class BM25Index:
+    """
+    Incremental inverted index scored with Okapi BM25.
+
+    Documents are added and removed as lists of terms (see
+    TextProcessor.tokenize). Postings map each term to the documents that
+    contain it and their term frequency, so a query only touches the
+    documents sharing at least one term with it.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_lengths: Dict[int, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._doc_lengths
+
+    def add(self, doc_ids: Sequence[int], documents: Sequence[List[str]]):
+        """Indexes each document's terms under its id, replacing any previous entry."""
+        for doc_id, terms in zip(doc_ids, documents):
+            if doc_id in self._doc_lengths:
+                self.delete([doc_id])
+            for term, count in Counter(terms).items():
+                self._postings.setdefault(term, {})[doc_id] = count
+            self._doc_lengths[doc_id] = len(terms)
+            self._total_length += len(terms)
+
+    def delete(self, doc_ids: Iterable[int]) -> int:
+        """
+        Removes documents by id. Each document's postings are found by
+        scanning the terms, so deletes cost O(vocabulary); they are rare
+        compared to searches. Returns the number of documents removed.
+        """
+        doomed = {doc_id for doc_id in doc_ids if doc_id in self._doc_lengths}
+        if not doomed:
+            return 0
+        for term in list(self._postings):
+            postings = self._postings[term]
+            for doc_id in doomed.intersection(postings):
+                del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+        for doc_id in doomed:
+            self._total_length -= self._doc_lengths.pop(doc_id)
+        return len(doomed)
+
+    def idf(self, term: str) -> float:
+        """BM25 inverse document frequency (the non-negative variant used by Lucene)."""
+        df = len(self._postings.get(term, ()))
+        return math.log(1 + (len(self) - df + 0.5) / (df + 0.5))
+
+    def search(self, query_terms: List[str], top_k: int = 10) -> List[Tuple[int, float]]:
+        """Returns up to top_k (doc_id, score) pairs, best first."""
+        if not self._doc_lengths or top_k <= 0:
+            return []
+        average_length = self._total_length / len(self._doc_lengths) or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(query_terms):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
@@ -0,0 +1,55 @@
+# src/memory/diversity.py
+from typing import List, Optional
+import numpy as np
+from ..config import settings
+from ..utils.logger_config import setup_logger
+from .vector_index import SearchResult, VectorIndex
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+
+def maximal_marginal_relevance(
+    relevance: np.ndarray,
+    candidates: np.ndarray,
+    top_k: int,
+    lambda_mult: float = 0.7,
+) -> List[int]:
+    """
+    Greedily picks top_k candidate rows, each time taking the one maximizing
+    lambda_mult * relevance(c) - (1 - lambda_mult) * max sim(c, already picked).
+    Candidate vectors must be L2-normalized. Returns positions in pick order.
+    """
+    if candidates.shape[0] == 0 or top_k <= 0:
+        return []
+    pairwise = candidates @ candidates.T
+    selected = [int(np.argmax(relevance))]
+    # Highest similarity of each candidate to anything selected so far
+    redundancy = pairwise[selected[0]].copy()
+    while len(selected) < min(top_k, candidates.shape[0]):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        redundancy = np.maximum(redundancy, pairwise[best])
+    return selected
+
+
+def diversify(
+    vector_store,
+    results: List[SearchResult],
+    top_k: int,
+    lambda_mult: Optional[float] = None,
+) -> List[SearchResult]:
+    """
+    Re-ranks search results with MMR so near-copies of an already chosen
+    chunk make way for chunks that add information. Relevance is the
+    results' own score relative to the best one, so it works for cosine and
+    fused (hybrid) scores alike. `vector_store` must provide `vectors_for(ids)`.
+    """
+    if len(results) <= 1:
+        return results[:top_k]
+    lambda_mult = settings.RETRIEVAL_MMR_LAMBDA if lambda_mult is None else lambda_mult
+    scores = np.clip(np.asarray([result.score for result in results], dtype=np.float32), 0.0, None)
+    relevance = scores / scores.max() if scores.max() > 0 else np.ones_like(scores)
+    vectors = VectorIndex._normalize(vector_store.vectors_for([result.id for result in results]))
+    return [results[i] for i in maximal_marginal_relevance(relevance, vectors, top_k, lambda_mult)]
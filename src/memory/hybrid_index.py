@@ -0,0 +1,147 @@
+# src/memory/hybrid_index.py
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from ..config import settings
+from ..ingestion.document_parser import TextProcessor
+from ..utils.logger_config import setup_logger
+from .bm25_index import BM25Index
+from .vector_index import SearchResult
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Fuses ranked id lists: each id scores sum(1 / (k + rank)) over the lists
+    it appears in (rank starting at 1). Returns (id, score) pairs, best first.
+    """
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridIndex:
+    """
+    Wraps a vector store (VectorIndex, IVFIndex or PersistentVectorStore) with
+    a BM25 index over the same chunks, kept up to date on every add and delete.
+
+    `search` with a `query_text` retrieves candidates from both and fuses the
+    two rankings with reciprocal rank fusion, so exact identifiers, part
+    numbers and names are found even when their embedding is not close to the
+    query's. Without a query text it is a plain vector search. Every other
+    attribute (version, lock, ids_for_source, list_sources, ...) is the
+    wrapped store's, so readers and writers of either share one lock.
+    """
+
+    def __init__(
+        self,
+        vector_store,
+        tokenizer: Optional[Callable[[str], List[str]]] = None,
+        rrf_k: Optional[int] = None,
+        candidates: Optional[int] = None,
+    ):
+        self.vector_store = vector_store
+        self.tokenizer = tokenizer or TextProcessor.tokenize
+        self.rrf_k = rrf_k or settings.HYBRID_RRF_K
+        self.candidates = candidates or settings.HYBRID_CANDIDATES
+        self.bm25 = BM25Index()
+        self._lock = threading.Lock()
+        self._last_indexed_id = -1
+        self._synced_version: Optional[int] = None
+        self._sync()
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes HybridIndex does not define itself
+        if name == "vector_store":
+            raise AttributeError(name)
+        return getattr(self.vector_store, name)
+
+    def __len__(self) -> int:
+        return len(self.vector_store)
+
+    def _index_terms(self, chunk_ids: Sequence[int], texts: Sequence[str]):
+        self.bm25.add(chunk_ids, [self.tokenizer(text) for text in texts])
+        if chunk_ids:
+            self._last_indexed_id = max(self._last_indexed_id, max(chunk_ids))
+
+    def _sync(self):
+        """
+        Indexes chunks the wrapped store has but the BM25 index has not seen:
+        everything at startup, and rows another process appended to a shared
+        knowledge base since. Chunk ids only grow, so this reads new rows only.
+        """
+        version = self.vector_store.version
+        if version == self._synced_version:
+            return
+        batch_ids, batch_texts = [], []
+        for chunk_id, text in self.vector_store.iter_entries(after_id=self._last_indexed_id):
+            batch_ids.append(chunk_id)
+            batch_texts.append(text)
+            if len(batch_ids) >= 1000:
+                self._index_terms(batch_ids, batch_texts)
+                batch_ids, batch_texts = [], []
+        self._index_terms(batch_ids, batch_texts)
+        if self._synced_version is None:
+            logger.info(f"Built BM25 index over {len(self.bm25)} chunk(s).")
+        self._synced_version = version
+
+    def add(
+        self,
+        vectors: Sequence[np.ndarray],
+        texts: Sequence[str],
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> List[int]:
+        """Adds chunks to the vector store and their terms to the BM25 index."""
+        terms = [self.tokenizer(text) for text in texts]
+        with self._lock:
+            ids = self.vector_store.add(vectors, texts, metadatas=metadatas)
+            self.bm25.add(ids, terms)
+            if ids:
+                self._last_indexed_id = max(self._last_indexed_id, max(ids))
+            self._synced_version = self.vector_store.version
+        return ids
+
+    def delete(self, ids: Iterable[int]) -> int:
+        ids = list(ids)
+        with self._lock:
+            removed = self.vector_store.delete(ids)
+            self.bm25.delete(ids)
+            self._synced_version = self.vector_store.version
+        return removed
+
+    def search(self, query: np.ndarray, top_k: int = 3, query_text: Optional[str] = None) -> List[SearchResult]:
+        """
+        Returns the top_k chunks. With `query_text`, the best `candidates`
+        chunks by vector similarity and by BM25 are fused with RRF, and each
+        result's score is its fused score.
+        """
+        if not query_text:
+            return self.vector_store.search(query, top_k=top_k)
+        pool_size = max(self.candidates, top_k)
+        vector_hits = self.vector_store.search(query, top_k=pool_size)
+        query_terms = self.tokenizer(query_text)
+        with self._lock:
+            self._sync()
+            lexical_hits = self.bm25.search(query_terms, top_k=pool_size)
+        fused = reciprocal_rank_fusion(
+            [[hit.id for hit in vector_hits], [chunk_id for chunk_id, _ in lexical_hits]], k=self.rrf_k
+        )
+
+        # Vector hits already carry their text and metadata; only lexical-only hits are looked up
+        known = {hit.id: hit for hit in vector_hits}
+        looked_up = {
+            result.id: result
+            for result in self.vector_store.results_for([(chunk_id, score) for chunk_id, score in fused if chunk_id not in known])
+        }
+        results = []
+        for chunk_id, score in fused:
+            # Chunks deleted by another process since the last sync are skipped
+            hit = known.get(chunk_id) or looked_up.get(chunk_id)
+            if hit is not None:
+                results.append(SearchResult(id=hit.id, score=score, text=hit.text, metadata=hit.metadata))
+                if len(results) == top_k:
+                    break
+        return results
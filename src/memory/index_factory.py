@@ -0,0 +1,29 @@
+# src/memory/index_factory.py
+from typing import Optional
+from ..config import settings
+from ..utils.logger_config import setup_logger
+from .vector_index import VectorIndex
+from .ann_index import IVFIndex
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+
+def create_vector_index(
+    dim: Optional[int] = None,
+    backend: Optional[str] = None,
+    precision: Optional[str] = None,
+) -> VectorIndex:
+    """
+    Creates the vector index selected by `settings.VECTOR_INDEX_BACKEND`
+    ("exact" or "ivf") unless a backend is given explicitly, storing vectors
+    at `settings.VECTOR_INDEX_PRECISION` unless a precision is given.
+    Without a `dim`, the index takes the dimension of the first vectors added.
+    """
+    backend = (backend or settings.VECTOR_INDEX_BACKEND).lower()
+    precision = precision or settings.VECTOR_INDEX_PRECISION
+    logger.info(f"Creating '{backend}' vector index with dimension {dim or 'of the first vectors added'} ({precision}).")
+    if backend == "exact":
+        return VectorIndex(dim=dim, precision=precision)
+    if backend == "ivf":
+        return IVFIndex(dim=dim, precision=precision)
+    raise ValueError(f"Unknown vector index backend '{backend}'. Expected 'exact' or 'ivf'.")
@@ -0,0 +1,446 @@
+# src/memory/persistent_store.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from ..config import settings
+from ..utils.logger_config import setup_logger
+from .rw_lock import ReadWriteLock
+from .vector_index import SearchResult, VectorIndex
+
+try:
+    import fcntl
+except ImportError: # Windows: writers are only serialized within one process
+    fcntl = None
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL,
+    metadata TEXT NOT NULL DEFAULT '{}',
+    deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS chunks_deleted ON chunks (id) WHERE deleted = 1;
+CREATE TABLE IF NOT EXISTS sources (
+    name TEXT PRIMARY KEY,
+    chunk_count INTEGER NOT NULL,
+    added_at REAL NOT NULL,
+    content_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS sources_content_hash ON sources (content_hash);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class PersistentVectorStore:
+    """
+    Disk-backed knowledge base that survives restarts.
+
+    Normalized embeddings are appended to a raw float32 file and searched
+    through a read-only memory map, so opening the store does not load the
+    vectors into RAM. Chunk text, metadata and processed sources live in
+    SQLite (WAL mode), which lets several processes share the store. Writers
+    take an exclusive lock on a lock file for the whole of a write, so
+    several of them (the service and a batch ingest, say) take turns rather
+    than appending over each other. Row numbers in the embedding file double
+    as chunk ids; deleted chunks are tombstoned rather than rewritten.
+
+    The connection that writes (and maps rows) is only used under an internal
+    lock. Queries go through a read-only connection per thread, so they never
+    share the writer's open transaction or see its uncommitted rows.
+
+    The embedding dimension is recorded with the store. A new store takes it
+    from `dim` or, without one, from the first vectors added; reopening with
+    a different `dim` (a different embedding model) raises ValueError.
+
+    Within a process, `lock` is used as VectorIndex's is: readers hold
+    `lock.read()` across a search and the lookups of its results while
+    writers hold `lock.write()`.
+    """
+
+    EMBEDDINGS_FILE = "embeddings.f32"
+    DATABASE_FILE = "knowledge_base.sqlite"
+    LOCK_FILE = "writer.lock"
+    LEGACY_DIMENSION = 384 # Stores created before the dimension was recorded were all written at this size
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        dim: Optional[int] = None,
+        read_only: bool = False,
+        search_block_size: int = 65536,
+    ):
+        self.directory = directory or settings.KNOWLEDGE_BASE_DIR
+        self.dim = dim
+        self.read_only = read_only
+        self.search_block_size = search_block_size
+        self._embeddings_path = os.path.join(self.directory, self.EMBEDDINGS_FILE)
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self.lock = ReadWriteLock()
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+
+        self._db_path = os.path.join(self.directory, self.DATABASE_FILE)
+        if read_only:
+            if not os.path.exists(self._db_path):
+                raise FileNotFoundError(f"No knowledge base found at '{self.directory}'.")
+            self._db = self._connect_read_only()
+        else:
+            os.makedirs(self.directory, exist_ok=True)
+            self._db = sqlite3.connect(self._db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._migrate()
+            self._db.executescript(_SCHEMA)
+            self._db.commit()
+            self._lock_file = open(os.path.join(self.directory, self.LOCK_FILE), "a+")
+
+        stored_dim = self._stored_dim()
+        if dim is not None and stored_dim is not None and dim != stored_dim:
+            self.close()
+            raise ValueError(
+                f"The knowledge base at '{self.directory}' holds {stored_dim}-dimensional embeddings, not {dim}. "
+                f"It was built with a different embedding model; re-ingest into a new directory."
+            )
+        self.dim = stored_dim or dim
+
+        self._rows = 0
+        self._version = 0
+        self._data_version = None
+        self._matrix: Optional[np.ndarray] = None
+        self._deleted = np.zeros(0, dtype=bool)
+        with self._lock:
+            if not read_only:
+                with self._write_transaction():
+                    self._truncate_uncommitted()
+                    if self.dim is not None and self._recorded_dim() is None:
+                        self._save_dim(self.dim)
+            self._open_rows()
+        logger.info(f"Opened knowledge base at '{self.directory}' with {len(self)} chunks ({'read-only' if read_only else 'read-write'}).")
+
+    def _connect_read_only(self) -> sqlite3.Connection:
+        # Not bound to a thread only so that `close` can close it
+        return sqlite3.connect(f"file:{self._db_path}?mode=ro", uri=True, check_same_thread=False)
+
+    def _reader(self) -> sqlite3.Connection:
+        """The calling thread's query connection, opened on first use."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = self._connect_read_only()
+            with self._readers_lock:
+                self._readers.append(db)
+        return db
+
+    def _migrate(self):
+        """Adds columns introduced after a knowledge base was first created."""
+        columns = [r[1] for r in self._db.execute("PRAGMA table_info(sources)")]
+        if columns and "content_hash" not in columns:
+            self._db.execute("ALTER TABLE sources ADD COLUMN content_hash TEXT")
+
+    def _recorded_dim(self) -> Optional[int]:
+        try:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        except sqlite3.OperationalError: # A read-only store created before the meta table
+            return None
+        return int(row[0]) if row else None
+
+    def _stored_dim(self) -> Optional[int]:
+        """The embedding dimension of the stored chunks, or None for a store nothing has been added to yet."""
+        recorded = self._recorded_dim()
+        if recorded is None and self._committed_rows():
+            return self.LEGACY_DIMENSION
+        return recorded
+
+    def _save_dim(self, dim: int):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dim', ?)", (str(dim),))
+
+    def _committed_rows(self) -> int:
+        row = self._db.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM chunks").fetchone()
+        return int(row[0])
+
+    @contextmanager
+    def _write_transaction(self):
+        """
+        Runs the body as one SQLite write transaction while holding the writer
+        lock that every store opened read-write on this directory shares,
+        whichever process it lives in. The transaction is committed when the
+        body returns and rolled back if it raises. Callers hold `self._lock`.
+        """
+        if fcntl is not None:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _truncate_uncommitted(self) -> int:
+        """
+        Drops embeddings appended without committed chunk rows (by a writer
+        that crashed or rolled back) and returns the committed row count.
+        Only safe inside `_write_transaction`, where no other writer can be
+        appending.
+        """
+        if self.dim is None:
+            # Another process may have added the first chunks
+            self.dim = self._stored_dim()
+        rows = self._committed_rows()
+        row_bytes = (self.dim or 0) * np.dtype(np.float32).itemsize
+        file_bytes = os.path.getsize(self._embeddings_path) if os.path.exists(self._embeddings_path) else 0
+        if file_bytes > rows * row_bytes:
+            logger.warning(f"Truncating {file_bytes - rows * row_bytes} bytes of uncommitted embeddings.")
+            with open(self._embeddings_path, "r+b") as f:
+                f.truncate(rows * row_bytes)
+        return rows
+
+    def _open_rows(self):
+        """
+        Maps the committed rows of the embedding file. Rows past the committed
+        chunk table belong to a write in progress (or a failed one) and are
+        ignored.
+        """
+        # Read first: anything committed after this point changes it again, so `refresh` cannot miss it
+        self._data_version = self._db.execute("PRAGMA data_version").fetchone()[0]
+        if self.dim is None:
+            self.dim = self._stored_dim()
+        rows = self._committed_rows()
+        row_bytes = (self.dim or 0) * np.dtype(np.float32).itemsize
+        file_bytes = os.path.getsize(self._embeddings_path) if os.path.exists(self._embeddings_path) else 0
+        if file_bytes < rows * row_bytes:
+            raise RuntimeError(f"Embedding file '{self._embeddings_path}' is shorter than the committed chunk table.")
+
+        deleted = np.zeros(rows, dtype=bool)
+        deleted_ids = [r[0] for r in self._db.execute("SELECT id FROM chunks WHERE deleted = 1")]
+        deleted[deleted_ids] = True
+        # Tombstones are never cleared, so row and tombstone counts identify the contents
+        if rows != self._rows or deleted.sum() != self._deleted.sum():
+            self._version += 1
+
+        self._rows = rows
+        self._matrix = (
+            np.memmap(self._embeddings_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+            if rows else None
+        )
+        self._deleted = deleted
+
+    def refresh(self):
+        """
+        Picks up chunks added or deleted by other connections since the rows
+        were last mapped. SQLite's data_version only changes when another
+        connection commits, so checking it costs one pragma and an unchanged
+        store is never re-read.
+        """
+        with self._lock:
+            self._reload_if_changed()
+
+    def _reload_if_changed(self):
+        if self._db.execute("PRAGMA data_version").fetchone()[0] != self._data_version:
+            self._open_rows()
+
+    def __len__(self) -> int:
+        return self._rows - int(self._deleted.sum())
+
+    @property
+    def version(self) -> int:
+        """Changes whenever chunks are added, deleted or picked up from another process."""
+        return self._version
+
+    def add(
+        self,
+        vectors: Sequence[np.ndarray],
+        texts: Sequence[str],
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> List[int]:
+        """
+        Appends vectors with their chunk texts (and optional metadata).
+        Returns the ids assigned to the new entries.
+        """
+        if self.read_only:
+            raise PermissionError("Cannot add to a knowledge base opened read-only.")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        if vectors.shape[0] == 0:
+            return []
+        if len(texts) != vectors.shape[0]:
+            raise ValueError("The number of texts must match the number of vectors.")
+        if metadatas is not None and len(metadatas) != vectors.shape[0]:
+            raise ValueError("The number of metadata entries must match the number of vectors.")
+
+        with self._lock:
+            with self._write_transaction():
+                # Other processes may have committed rows since this store last looked
+                start = self._truncate_uncommitted()
+                if self.dim is None:
+                    self._save_dim(vectors.shape[1])
+                elif vectors.shape[1] != self.dim:
+                    raise ValueError(
+                        f"Expected vectors of dimension {self.dim}, got {vectors.shape[1]}; "
+                        f"the knowledge base was built with a different embedding model."
+                    )
+                new_ids = list(range(start, start + vectors.shape[0]))
+                # Vectors are made durable before the chunk rows that reference them are committed
+                with open(self._embeddings_path, "ab") as f:
+                    f.write(np.ascontiguousarray(VectorIndex._normalize(vectors)).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._db.executemany(
+                    "INSERT INTO chunks (id, text, metadata) VALUES (?, ?, ?)",
+                    [
+                        (chunk_id, texts[i], json.dumps(metadatas[i] if metadatas is not None else {}))
+                        for i, chunk_id in enumerate(new_ids)
+                    ],
+                )
+            self._open_rows()
+        return new_ids
+
+    def delete(self, ids: Iterable[int]) -> int:
+        """Tombstones entries by id. Returns the number of entries removed."""
+        if self.read_only:
+            raise PermissionError("Cannot delete from a knowledge base opened read-only.")
+        with self._lock:
+            with self._write_transaction():
+                self._reload_if_changed()
+                ids = [i for i in set(ids) if 0 <= i < self._rows and not self._deleted[i]]
+                self._db.executemany("UPDATE chunks SET deleted = 1 WHERE id = ?", [(i,) for i in ids])
+            if ids:
+                self._deleted[ids] = True
+                self._version += 1
+        return len(ids)
+
+    def get(self, chunk_id: int) -> Optional[str]:
+        """Returns the chunk text stored for an id, or None if it is unknown or deleted."""
+        row = self._reader().execute("SELECT text FROM chunks WHERE id = ? AND deleted = 0", (chunk_id,)).fetchone()
+        return row[0] if row else None
+
+    def search(self, query: np.ndarray, top_k: int = 3) -> List[SearchResult]:
+        """
+        Returns the top_k entries most similar to the query by cosine similarity.
+        The memory map is scanned in blocks so resident memory stays bounded.
+        """
+        self.refresh()
+        with self._lock:
+            # A concurrent refresh swaps these, so the scan works on one consistent snapshot
+            matrix, rows, deleted = self._matrix, self._rows, self._deleted
+        if matrix is None or top_k <= 0 or rows == int(deleted.sum()):
+            return []
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        if query.shape[0] != self.dim:
+            raise ValueError(f"Expected a query of dimension {self.dim}, got {query.shape[0]}.")
+        query = VectorIndex._normalize(query)
+
+        best_ids = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, rows, self.search_block_size):
+            end = min(start + self.search_block_size, rows)
+            scores = matrix[start:end] @ query
+            scores[deleted[start:end]] = -np.inf
+            k = min(top_k, end - start)
+            block_top = np.argpartition(scores, -k)[-k:]
+            best_ids = np.concatenate([best_ids, block_top + start])
+            best_scores = np.concatenate([best_scores, scores[block_top]])
+            if best_ids.shape[0] > top_k:
+                keep = np.argpartition(best_scores, -top_k)[-top_k:]
+                best_ids, best_scores = best_ids[keep], best_scores[keep]
+
+        order = np.argsort(best_scores)[::-1]
+        hits = [(int(best_ids[i]), float(best_scores[i])) for i in order if np.isfinite(best_scores[i])]
+        return self.results_for(hits)
+
+    def results_for(self, hits: List[Tuple[int, float]]) -> List[SearchResult]:
+        """SearchResults for (id, score) pairs, in the given order; deleted or unknown ids are skipped."""
+        if not hits:
+            return []
+        placeholders = ",".join("?" * len(hits))
+        rows = {
+            r[0]: r for r in self._reader().execute(
+                f"SELECT id, text, metadata FROM chunks WHERE id IN ({placeholders}) AND deleted = 0",
+                [chunk_id for chunk_id, _ in hits],
+            )
+        }
+        return [
+            SearchResult(id=chunk_id, score=score, text=rows[chunk_id][1], metadata=json.loads(rows[chunk_id][2]))
+            for chunk_id, score in hits if chunk_id in rows
+        ]
+
+    def vectors_for(self, ids: Sequence[int]) -> np.ndarray:
+        """Normalized embeddings of the given ids (a chunk's id is its row in the embedding file)."""
+        matrix = self._matrix
+        if matrix is None or not len(ids):
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.asarray(matrix[np.asarray(ids, dtype=np.int64)], dtype=np.float32)
+
+    def iter_entries(self, after_id: int = -1, batch_size: int = 1000) -> Iterator[Tuple[int, str]]:
+        """Yields (id, text) of every live chunk with an id above `after_id`, in id order, reading in batches."""
+        last_id = after_id
+        while True:
+            rows = self._reader().execute(
+                "SELECT id, text FROM chunks WHERE deleted = 0 AND id > ? ORDER BY id LIMIT ?",
+                (last_id, batch_size),
+            ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield from rows
+
+    def iter_texts(self, batch_size: int = 1000) -> Iterator[str]:
+        """Yields the text of every live chunk in id order, reading in batches."""
+        for _, text in self.iter_entries(batch_size=batch_size):
+            yield text
+
+    def ids_for_source(self, source: str) -> List[int]:
+        """Returns the ids of live chunks whose metadata names the given source."""
+        return [
+            r[0] for r in self._reader().execute(
+                "SELECT id FROM chunks WHERE deleted = 0 AND json_extract(metadata, '$.source') = ?",
+                (source,),
+            )
+        ]
+
+    def add_source(self, name: str, chunk_count: int, content_hash: Optional[str] = None):
+        """Records that a source file has been ingested into the knowledge base."""
+        if self.read_only:
+            raise PermissionError("Cannot record sources in a knowledge base opened read-only.")
+        with self._lock, self._write_transaction():
+            self._db.execute(
+                "INSERT OR REPLACE INTO sources (name, chunk_count, added_at, content_hash) VALUES (?, ?, ?, ?)",
+                (name, chunk_count, time.time(), content_hash),
+            )
+
+    def list_sources(self) -> List[str]:
+        """Returns the names of every ingested source, oldest first."""
+        return [r[0] for r in self._reader().execute("SELECT name FROM sources ORDER BY added_at")]
+
+    def source_hashes(self) -> Dict[str, str]:
+        """Returns a mapping of content hash -> source name for every hashed source."""
+        return {
+            r[0]: r[1] for r in self._reader().execute(
+                "SELECT content_hash, name FROM sources WHERE content_hash IS NOT NULL ORDER BY added_at"
+            )
+        }
+
+    def close(self):
+        self._matrix = None
+        self._db.close()
+        with self._readers_lock:
+            for db in self._readers:
+                db.close()
+            self._readers.clear()
+        if self._lock_file is not None:
+            self._lock_file.close()
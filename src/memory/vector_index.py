@@ -0,0 +1,281 @@
+# src/memory/vector_index.py
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from ..config import settings
+from ..utils.logger_config import setup_logger
+from .rw_lock import ReadWriteLock
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+# Storage precisions for normalized embeddings. int8 maps [-1, 1] onto [-127, 127].
+PRECISIONS = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+INT8_SCALE = 127.0
+
+
+def quantize(vectors: np.ndarray, precision: str) -> np.ndarray:
+    """Converts L2-normalized float vectors to the given storage precision."""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}'. Expected one of {sorted(PRECISIONS)}.")
+    if precision == "int8":
+        return np.clip(np.rint(vectors * INT8_SCALE), -127, 127).astype(np.int8)
+    return np.asarray(vectors, dtype=PRECISIONS[precision])
+
+
+def dequantize(vectors: np.ndarray) -> np.ndarray:
+    """Inverse of `quantize`; the precision is taken from the dtype."""
+    if vectors.dtype == np.int8:
+        return vectors.astype(np.float32) / INT8_SCALE
+    return np.asarray(vectors, dtype=np.float32)
+
+
+@dataclass
+class SearchResult:
+    """A single hit returned by a vector index search."""
+    id: int
+    score: float
+    text: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+class VectorIndex:
+    """
+    In-memory exact cosine-similarity index.
+
+    Vectors are L2-normalized once at insert time and kept in a contiguous
+    matrix that grows by amortized doubling, so a query is a single
+    matrix-vector product followed by an O(N) top-k selection.
+
+    The matrix is float32 by default; `precision="float16"` or `"int8"` halves
+    or quarters its memory at a small cost in score accuracy. Reduced-precision
+    rows are scored in blocks converted back to float32.
+
+    Without a `dim`, the index takes the dimension of the first vectors added.
+
+    The index does no locking of its own. When searches run while chunks are
+    being added or deleted, readers hold `lock.read()` across a search and
+    any follow-up lookups of its results (`vectors_for`, `results_for`), and
+    writers hold `lock.write()` across their changes.
+    """
+
+    def __init__(
+        self,
+        dim: Optional[int] = None,
+        initial_capacity: int = 1024,
+        precision: Optional[str] = None,
+        score_block_size: int = 65536,
+    ):
+        if dim is not None and dim <= 0:
+            raise ValueError("dim must be a positive integer.")
+        self.dim = dim
+        self.precision = precision or settings.VECTOR_INDEX_PRECISION
+        if self.precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision '{self.precision}'. Expected one of {sorted(PRECISIONS)}.")
+        self.score_block_size = score_block_size
+        self._vectors = np.empty((max(initial_capacity, 1), dim or 0), dtype=PRECISIONS[self.precision])
+        self._ids = np.empty(max(initial_capacity, 1), dtype=np.int64)
+        self._size = 0
+        self._next_id = 0
+        self.version = 0 # Bumped on every add/delete so caches built on search results can be invalidated
+        self.lock = ReadWriteLock()
+        self._row_of: Dict[int, int] = {}
+        self._texts: Dict[int, str] = {}
+        self._metadata: Dict[int, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return self._vectors.shape[0]
+
+    @property
+    def memory_bytes(self) -> int:
+        """Bytes used by the vectors currently stored."""
+        return self._size * self._vectors.itemsize * self._vectors.shape[1]
+
+    def _ensure_capacity(self, needed: int):
+        """Grows the backing arrays by doubling until `needed` rows fit."""
+        if needed <= self.capacity:
+            return
+        new_capacity = self.capacity
+        while new_capacity < needed:
+            new_capacity *= 2
+        logger.debug(f"Growing vector index capacity from {self.capacity} to {new_capacity} rows.")
+        self._resize(new_capacity)
+
+    def _resize(self, new_capacity: int):
+        """Reallocates the backing arrays, keeping the first `_size` rows."""
+        vectors = np.empty((new_capacity, self._vectors.shape[1]), dtype=self._vectors.dtype)
+        vectors[:self._size] = self._vectors[:self._size]
+        ids = np.empty(new_capacity, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        self._vectors = vectors
+        self._ids = ids
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add(
+        self,
+        vectors: Sequence[np.ndarray],
+        texts: Sequence[str],
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> List[int]:
+        """
+        Adds vectors with their chunk texts (and optional metadata) to the index.
+        Returns the ids assigned to the new entries.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        if vectors.shape[0] == 0:
+            return []
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self._vectors = np.empty((self.capacity, self.dim), dtype=self._vectors.dtype)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dimension {self.dim}, got {vectors.shape[1]}.")
+        if len(texts) != vectors.shape[0]:
+            raise ValueError("The number of texts must match the number of vectors.")
+        if metadatas is not None and len(metadatas) != vectors.shape[0]:
+            raise ValueError("The number of metadata entries must match the number of vectors.")
+
+        n = vectors.shape[0]
+        self._ensure_capacity(self._size + n)
+        start = self._size
+        new_ids = list(range(self._next_id, self._next_id + n))
+        self._vectors[start:start + n] = quantize(self._normalize(vectors), self.precision)
+        self._ids[start:start + n] = new_ids
+        for offset, chunk_id in enumerate(new_ids):
+            self._row_of[chunk_id] = start + offset
+            self._texts[chunk_id] = texts[offset]
+            self._metadata[chunk_id] = dict(metadatas[offset]) if metadatas is not None else {}
+        self._size += n
+        self._next_id += n
+        self.version += 1
+        self._on_rows_added(start, self._size)
+        return new_ids
+
+    def _on_rows_added(self, start: int, end: int):
+        """Hook for subclasses that keep per-row state alongside the vectors."""
+        pass
+
+    def _on_row_removed(self, row: int):
+        """Hook called before a deleted entry's row is dropped or overwritten by `_move_row`."""
+        pass
+
+    def _move_row(self, src: int, dst: int):
+        """Moves row `src` into slot `dst`, overwriting whatever was there."""
+        moved_id = int(self._ids[src])
+        self._vectors[dst] = self._vectors[src]
+        self._ids[dst] = moved_id
+        self._row_of[moved_id] = dst
+
+    def delete(self, ids: Iterable[int]) -> int:
+        """
+        Removes entries by id. The last row is moved into the freed slot so the
+        matrix stays contiguous. Returns the number of entries removed.
+        """
+        removed = 0
+        for chunk_id in ids:
+            row = self._row_of.pop(chunk_id, None)
+            if row is None:
+                continue
+            last = self._size - 1
+            self._on_row_removed(row)
+            if row != last:
+                self._move_row(last, row)
+            self._texts.pop(chunk_id, None)
+            self._metadata.pop(chunk_id, None)
+            self._size -= 1
+            removed += 1
+        if removed:
+            self.version += 1
+        return removed
+
+    def get(self, chunk_id: int) -> Optional[str]:
+        """Returns the chunk text stored for an id, or None if it is unknown."""
+        return self._texts.get(chunk_id)
+
+    def iter_entries(self, after_id: int = -1) -> Iterator[Tuple[int, str]]:
+        """Yields (id, text) of every entry with an id above `after_id`, in id order."""
+        for chunk_id in range(max(after_id + 1, 0), self._next_id):
+            text = self._texts.get(chunk_id)
+            if text is not None:
+                yield chunk_id, text
+
+    def vectors_for(self, ids: Sequence[int]) -> np.ndarray:
+        """Normalized float32 vectors of the given ids."""
+        rows = np.asarray([self._row_of[chunk_id] for chunk_id in ids], dtype=np.int64)
+        return self._rows(rows) if len(rows) else np.empty((0, self.dim or 0), dtype=np.float32)
+
+    def results_for(self, hits: List[Tuple[int, float]]) -> List[SearchResult]:
+        """SearchResults for (id, score) pairs, in the given order; unknown ids are skipped."""
+        return [self._result(self._row_of[chunk_id], score) for chunk_id, score in hits if chunk_id in self._row_of]
+
+    def ids_for_source(self, source: str) -> List[int]:
+        """Returns the ids of entries whose metadata names the given source."""
+        return [chunk_id for chunk_id, meta in self._metadata.items() if meta.get("source") == source]
+
+    def _rows(self, rows) -> np.ndarray:
+        """Stored rows (a slice or an index array) as float32."""
+        return dequantize(self._vectors[rows])
+
+    def _scores(self, query: np.ndarray, rows=None) -> np.ndarray:
+        """Similarity of the normalized query to the given rows (default: all rows)."""
+        if self.precision == "float32":
+            return (self._vectors[:self._size] if rows is None else self._vectors[rows]) @ query
+        count = self._size if rows is None else len(rows)
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, self.score_block_size):
+            end = min(start + self.score_block_size, count)
+            scores[start:end] = self._rows(slice(start, end) if rows is None else rows[start:end]) @ query
+        return scores
+
+    def _top_k(self, scores: np.ndarray, top_k: int) -> np.ndarray:
+        """Returns the positions of the top_k scores, highest first."""
+        if top_k >= scores.shape[0]:
+            return np.argsort(scores)[::-1]
+        candidates = np.argpartition(scores, -top_k)[-top_k:]
+        return candidates[np.argsort(scores[candidates])[::-1]]
+
+    def search(self, query: np.ndarray, top_k: int = 3) -> List[SearchResult]:
+        """
+        Returns the top_k entries most similar to the query by cosine similarity.
+        """
+        if self._size == 0 or top_k <= 0:
+            return []
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        if query.shape[0] != self.dim:
+            raise ValueError(f"Expected a query of dimension {self.dim}, got {query.shape[0]}.")
+        query = self._normalize(query)
+
+        candidates = self._candidate_rows(query)
+        if candidates is None:
+            scores = self._scores(query)
+            rows = self._top_k(scores, top_k)
+            return [self._result(int(row), float(scores[row])) for row in rows]
+
+        scores = self._scores(query, candidates)
+        positions = self._top_k(scores, min(top_k, scores.shape[0]))
+        return [self._result(int(candidates[p]), float(scores[p])) for p in positions]
+
+    def _candidate_rows(self, query: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Rows to score for a normalized query. None means every row (exact search);
+        approximate subclasses return a subset.
+        """
+        return None
+
+    def _result(self, row: int, score: float) -> SearchResult:
+        chunk_id = int(self._ids[row])
+        return SearchResult(
+            id=chunk_id,
+            score=score,
+            text=self._texts[chunk_id],
+            metadata=self._metadata[chunk_id],
+        )
@@ -0,0 +1,61 @@
+# tests/ann_benchmark.py
+# Recall@k vs. latency of the IVF backend against exact search.
+# Run from the project root: python -m tests.ann_benchmark --size 200000 --nlist 512
+import argparse
+import time
+import numpy as np
+from src.memory.vector_index import VectorIndex
+from src.memory.ann_index import IVFIndex
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger("ANNBenchmark")
+
+def make_clustered_data(size: int, dim: int, n_topics: int, noise: float, rng: np.random.Generator) -> np.ndarray:
+    """Synthetic embeddings grouped around topics, closer to real chunk embeddings than uniform noise."""
+    topics = rng.normal(size=(n_topics, dim))
+    labels = rng.integers(0, n_topics, size=size)
+    return (topics[labels] + noise * rng.normal(size=(size, dim))).astype(np.float32)
+
+def timed_search(index: VectorIndex, queries: np.ndarray, top_k: int):
+    start = time.perf_counter()
+    results = [[r.id for r in index.search(q, top_k=top_k)] for q in queries]
+    latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    return results, latency_ms
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=256)
+    parser.add_argument("--noise", type=float, default=2.0, help="Spread of points around their topic")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    data = make_clustered_data(args.size, args.dim, n_topics=args.nlist * 2, noise=args.noise, rng=rng)
+    queries = data[rng.choice(args.size, args.queries, replace=False)] + args.noise * rng.normal(size=(args.queries, args.dim))
+    texts = [""] * args.size
+
+    exact = VectorIndex(dim=args.dim, initial_capacity=args.size)
+    exact.add(data, texts)
+    truth, exact_ms = timed_search(exact, queries, args.top_k)
+    logger.info(f"exact            recall@{args.top_k}=1.000  latency={exact_ms:.2f} ms/query")
+
+    start = time.perf_counter()
+    ivf = IVFIndex(dim=args.dim, nlist=args.nlist, initial_capacity=args.size)
+    ivf.add(data, texts)
+    logger.info(f"IVF build (nlist={args.nlist}) took {time.perf_counter() - start:.2f}s")
+
+    for nprobe in args.nprobe:
+        ivf.nprobe = nprobe
+        found, ivf_ms = timed_search(ivf, queries, args.top_k)
+        recall = np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+        logger.info(
+            f"ivf nprobe={nprobe:<4} recall@{args.top_k}={recall:.3f}  latency={ivf_ms:.2f} ms/query  "
+            f"speedup={exact_ms / ivf_ms:.1f}x"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import numpy as np
+from src.memory.ann_index import IVFIndex
+from src.memory.index_factory import create_vector_index
+from src.memory.vector_index import VectorIndex
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+async def main_test_ann_index():
+    rng = np.random.default_rng(0)
+    dim = 32
+
+    # 1. Below the training threshold the IVF index behaves like exact search
+    index = IVFIndex(dim=dim, nlist=8, nprobe=2, min_train_size=200)
+    small = rng.normal(size=(50, dim)).astype(np.float32)
+    index.add(small, [f"small {i}" for i in range(50)])
+    assert not index.is_trained, "Quantizer should not be trained on too few vectors."
+
+    # 2. Crossing the threshold trains the quantizer and assigns every row
+    centers = rng.normal(size=(8, dim)) * 4
+    clustered = (centers[rng.integers(0, 8, size=400)] + rng.normal(size=(400, dim))).astype(np.float32)
+    index.add(clustered, [f"clustered {i}" for i in range(400)])
+    assert index.is_trained, "Quantizer should be trained once enough vectors are added."
+    assert (index._lists[:len(index)] >= 0).all(), "Every row should belong to an inverted list."
+
+    # 3. A vector already in the index is found through its own list
+    query = clustered[7]
+    results = index.search(query, top_k=5)
+    assert results[0].text == "clustered 7", "Nearest neighbour of an indexed vector should be itself."
+    logger.info(f"IVF top-5: {[(r.text, round(r.score, 3)) for r in results]}")
+
+    # 4. Deleting keeps list assignments aligned with moved rows
+    index.delete([results[0].id])
+    assert all(r.text != "clustered 7" for r in index.search(query, top_k=5))
+
+    # Every live row is in exactly one list's row array, the one `_lists` names, through any mix of deletes and adds
+    for _ in range(5):
+        index.delete(rng.choice(index._ids[:len(index)], size=40, replace=False).tolist())
+        more = (centers[rng.integers(0, 8, size=30)] + rng.normal(size=(30, dim))).astype(np.float32)
+        index.add(more, ["more"] * 30)
+    members = [index._list_rows[l][:index._list_sizes[l]] for l in range(len(index._list_rows))]
+    assert sorted(np.concatenate(members).tolist()) == list(range(len(index)))
+    assert all((index._lists[rows] == l).all() for l, rows in enumerate(members))
+    probed = index._candidate_rows(VectorIndex._normalize(query))
+    assert 0 < len(probed) < len(index), "A query should only score its probed lists."
+
+    # 5. The factory honours the configured backend names
+    assert type(create_vector_index(dim=dim, backend="ivf")) is IVFIndex
+    try:
+        create_vector_index(dim=dim, backend="unknown")
+        raise AssertionError("Unknown backends should be rejected.")
+    except ValueError:
+        pass
+
+    logger.info("IVFIndex test PASSED.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(main_test_ann_index())
@@ -0,0 +1,59 @@
+import time
+import numpy as np
+from src.memory.answer_cache import SemanticAnswerCache
+from src.memory.vector_index import VectorIndex
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+async def main_test_answer_cache():
+    rng = np.random.default_rng(0)
+    index = VectorIndex(dim=16)
+    ids = index.add(rng.normal(size=(5, 16)), [f"chunk {i}" for i in range(5)])
+    question = rng.normal(size=16)
+    paraphrase = question + 0.05 * rng.normal(size=16)
+    unrelated = rng.normal(size=16)
+
+    cache = SemanticAnswerCache(similarity_threshold=0.95, max_entries=2, ttl_seconds=3600)
+    cache.store("What is CRAS?", question, ids[:3], "A research assistant.", index.version)
+
+    # 1. The same question, modulo case and spacing, skips embedding and retrieval
+    hit = cache.lookup_exact("  what is   CRAS? ", index.version)
+    assert hit is not None and hit.answer == "A research assistant."
+
+    # 2. A paraphrase hits only if it retrieved the same chunks
+    hit = cache.lookup_similar(paraphrase, reversed(ids[:3]), index.version)
+    assert hit is not None and hit.similarity >= 0.95, hit
+    assert cache.lookup_similar(paraphrase, ids[1:4], index.version) is None, "Different context must miss."
+    assert cache.lookup_similar(unrelated, ids[:3], index.version) is None, "Dissimilar question must miss."
+
+    # 3. Least recently used entries are evicted beyond max_entries
+    cache.store("Second?", unrelated, ids[:1], "two", index.version)
+    cache.lookup_exact("What is CRAS?", index.version)
+    cache.store("Third?", -unrelated, ids[:1], "three", index.version)
+    assert cache.lookup_exact("Second?", index.version) is None and len(cache) == 2
+
+    # 4. Changing the index drops every answer, and late answers for an old version are not stored
+    old_version = index.version
+    index.add(rng.normal(size=(1, 16)), ["new chunk"])
+    assert index.version != old_version
+    assert cache.lookup_exact("What is CRAS?", index.version) is None and len(cache) == 0
+    cache.store("Stale?", question, ids[:3], "stale", old_version)
+    assert len(cache) == 0
+    index.delete([ids[0]])
+    cache.store("Fresh?", question, ids[1:3], "fresh", index.version)
+    assert cache.lookup_exact("fresh?", index.version).answer == "fresh"
+
+    # 5. Entries expire after their TTL
+    short_lived = SemanticAnswerCache(ttl_seconds=0.01)
+    short_lived.store("Soon stale?", question, ids[1:3], "x", index.version)
+    time.sleep(0.02)
+    assert short_lived.lookup_exact("Soon stale?", index.version) is None
+
+    logger.info(f"Answer cache stats: {cache.stats()}")
+    logger.info("Semantic answer cache test PASSED.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(main_test_answer_cache())
@@ -0,0 +1,160 @@
+import asyncio
+import os
+import tempfile
+import time
+from src.external_services.fake_backends import FakeASRClient, FakeEmbeddingClient, FakeLLMClient, FakeTTSClient
+from src.external_services.llm_client import GenerationStats
+from src.external_services.model_executor import ModelExecutor, ModelTimeoutError
+from src.external_services.model_pool import ModelWarmPool
+from src.ingestion.document_parser import TextProcessor
+from src.ingestion.ingestion_cache import IngestionCache
+from src.interaction.rag_service import RAGService, Upload
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+class Heartbeat:
+    """Ticks every 10 ms and records the longest gap, i.e. the longest the event loop was blocked."""
+    def __init__(self):
+        self.max_gap = 0.0
+        self._task = None
+
+    async def _run(self):
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            self.max_gap = max(self.max_gap, now - last)
+            last = now
+
+    def __enter__(self):
+        self._task = asyncio.ensure_future(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+async def main_test_async_clients():
+    # 1. A model executor bounds its threads, times calls out, and drops calls given up on before they start
+    ran = []
+
+    def work(tag, seconds):
+        time.sleep(seconds)
+        ran.append(tag)
+        return tag
+
+    executor = ModelExecutor("test", max_workers=1)
+    start = time.perf_counter()
+    assert await asyncio.gather(executor.run(work, "a", 0.2), executor.run(work, "b", 0.2)) == ["a", "b"]
+    assert time.perf_counter() - start >= 0.38, "One worker runs one call at a time."
+    slow = asyncio.ensure_future(executor.run(work, "slow", 0.3))
+    await asyncio.sleep(0.02)
+    try:
+        await executor.run(work, "timed out", 0.0, timeout=0.1)
+        raise AssertionError("The queued call should time out.")
+    except ModelTimeoutError:
+        pass
+    waiting = asyncio.ensure_future(executor.run(work, "cancelled", 0.0))
+    await asyncio.sleep(0.02)
+    waiting.cancel()
+    await slow
+    await asyncio.sleep(0.05)
+    assert ran == ["a", "b", "slow"], f"Calls given up on must not run: {ran}"
+    assert executor.stats() == {"workers": 1, "queued": 0, "running": 0, "timed_out": 1}
+    executor.shutdown()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # 2. Every client's async API keeps the event loop free, and different models run at the same time
+        tts = FakeTTSClient(delay_seconds=0.3)
+        recording = os.path.join(work_dir, "recording.wav")
+        tts._synthesize_to_file("inspect the pump seal", recording) # 4 words, 1.2 s of audio
+        asr = FakeASRClient(realtime_factor=0.25)
+        embedder = FakeEmbeddingClient(seconds_per_text=0.1)
+        llm = FakeLLMClient(response_tokens=6, token_seconds=0.05)
+        with Heartbeat() as heartbeat:
+            start = time.perf_counter()
+            speech, transcript, embeddings, answer = await asyncio.gather(
+                tts.synthesize_speech("Replace the seal.", os.path.join(work_dir, "answer.wav")),
+                asr.transcribe(recording, "en"),
+                embedder.aembed_texts(["pump", "seal", "valve"]),
+                llm.generate_text("What needs replacing?"),
+            )
+            elapsed = time.perf_counter() - start
+        assert os.path.exists(speech) and transcript and embeddings.shape[0] == 3 and len(answer.split()) == 6
+        assert elapsed < 0.8, f"Four ~0.3 s calls on separate executors took {elapsed:.2f}s."
+        assert heartbeat.max_gap < 0.1, f"The event loop was blocked for {heartbeat.max_gap:.2f}s."
+
+        # 3. A generation is stopped when it times out or its consumer is cancelled
+        slow_llm = FakeLLMClient(response_tokens=100, token_seconds=0.05)
+        stats = GenerationStats()
+        try:
+            async for _ in slow_llm.stream_text("Tell me everything.", stats=stats, timeout=0.3):
+                pass
+            raise AssertionError("The generation should time out.")
+        except ModelTimeoutError:
+            pass
+        tokens_at_timeout = stats.generation_tokens
+        await asyncio.sleep(0.2)
+        assert 0 < tokens_at_timeout < 100 and stats.generation_tokens <= tokens_at_timeout + 1
+
+        stats = GenerationStats()
+
+        async def consume():
+            async for _ in slow_llm.stream_text("Tell me everything again.", stats=stats):
+                pass
+
+        task = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.3)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        tokens_at_cancel = stats.generation_tokens
+        await asyncio.sleep(0.2)
+        assert stats.generation_tokens <= tokens_at_cancel + 1, "Cancelling the consumer must stop decoding."
+
+        # 4. Chat keeps answering while a long recording is being transcribed and ingested
+        pool = ModelWarmPool(warm_up=False)
+        pool.register("embedding", FakeEmbeddingClient, eager=True)
+        pool.register("llm", lambda: FakeLLMClient(response_tokens=10, token_seconds=0.01), eager=True)
+        pool.register("asr", lambda: FakeASRClient(realtime_factor=0.15))
+        pool.register("tts", FakeTTSClient)
+        pool.start()
+        service = RAGService(
+            model_pool=pool, text_processor=TextProcessor(), ingestion_cache=IngestionCache(os.path.join(work_dir, "cache")),
+            persist=False, upload_dir=os.path.join(work_dir, "uploads"),
+        )
+        manual = ("The pump seal must be replaced every six months. Inspect the valve before each shift. " * 20).encode()
+        assert [e["type"] async for e in service.ingest([Upload("manual.txt", manual)], "s")] == ["processed", "done"]
+
+        meeting = os.path.join(work_dir, "meeting.wav")
+        FakeTTSClient()._synthesize_to_file("the team reviewed the pump maintenance schedule " * 5, meeting) # 12 s of audio
+        with open(meeting, "rb") as f:
+            meeting_bytes = f.read()
+        ingest_events = []
+
+        async def ingest():
+            async for event in service.ingest([Upload("meeting.wav", meeting_bytes)], "s"):
+                ingest_events.append(event)
+
+        ingest_start = time.perf_counter()
+        ingest_task = asyncio.ensure_future(ingest())
+        await asyncio.sleep(0.3)
+        chat_latencies = []
+        for question in ("How often is the pump seal replaced?", "When is the valve inspected?", "What must be replaced?"):
+            start = time.perf_counter()
+            events = [event async for event in service.chat(question, "s")]
+            chat_latencies.append(time.perf_counter() - start)
+            assert events[0]["sources"] == ["manual.txt"] and events[-1]["type"] == "done"
+        assert not ingest_task.done(), "The chats should finish while the recording is still being transcribed."
+        await ingest_task
+        ingest_seconds = time.perf_counter() - ingest_start
+        assert [e["type"] for e in ingest_events] == ["processed", "done"]
+        assert max(chat_latencies) < 0.5, f"Chat latencies during ingestion: {chat_latencies}"
+        logger.info(f"Ingestion took {ingest_seconds:.2f}s; chats during it took "
+                    f"{', '.join(f'{t * 1000:.0f} ms' for t in chat_latencies)}.")
+        service.close()
+
+    logger.info("Async clients test PASSED.")
+
+if __name__ == "__main__":
+    asyncio.run(main_test_async_clients())
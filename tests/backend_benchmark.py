@@ -0,0 +1,93 @@
+# tests/backend_benchmark.py
+# End-to-end ingest (text + audio) and chat latency with the selected model backends.
+# Run from the project root: python -m tests.backend_benchmark --docs 200 --audio 4 --queries 50
+# Every modality defaults to the deterministic fake backend, which measures the pipeline itself;
+# compare engines with e.g. --asr faster-whisper --llm llama-cpp --embedding onnx (any name in backends.py).
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from src.external_services.backends import create_client
+from src.ingestion.document_parser import TextProcessor
+from src.ingestion.pipeline import IngestionPipeline
+from src.memory.vector_index import VectorIndex
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger("BackendBenchmark")
+
+VOCABULARY = (
+    "pump valve seal pressure flow gauge motor bearing shaft housing filter inlet outlet inspect replace "
+    "schedule maintenance interval manual procedure safety operator shift report the a of and to in is"
+).split()
+
+def make_documents(directory: str, count: int, seed: int = 0):
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"doc_{i}.txt")
+        with open(path, "w") as f:
+            f.write("\n\n".join(
+                " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(40, 120))) + "." for _ in range(rng.randint(3, 12))
+            ))
+        paths.append(path)
+    return paths
+
+async def main_async(args):
+    asr = create_client("asr", args.asr)
+    llm = create_client("llm", args.llm)
+    tts = create_client("tts", args.tts)
+    embedder = create_client("embedding", args.embedding)
+    rng = random.Random(1)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        paths = make_documents(work_dir, args.docs)
+        start = time.perf_counter()
+        for i in range(args.audio):
+            # Fake ASR reads any file, so the TTS backend provides the recordings
+            script = " ".join(rng.choice(VOCABULARY) for _ in range(args.audio_words)) + "."
+            paths.append(await tts.synthesize_speech(script, os.path.join(work_dir, f"recording_{i}.wav")))
+        logger.info(f"Synthesized {args.audio} recording(s) in {time.perf_counter() - start:.2f}s with '{args.tts}'.")
+
+        index = VectorIndex(dim=embedder.dimension)
+        pipeline = IngestionPipeline(TextProcessor.from_settings(), embedder, index, asr_client=asr)
+        start = time.perf_counter()
+        results = await pipeline.run(paths)
+        elapsed = time.perf_counter() - start
+        await pipeline.close()
+        failed = [r for r in results if r.error]
+        logger.info(f"Ingested {len(paths) - len(failed)}/{len(paths)} file(s), {len(index)} chunks, in {elapsed:.2f}s.\n"
+                    f"{pipeline.report()}")
+        for result in failed[:5]:
+            logger.warning(result.error)
+
+        latencies = []
+        for _ in range(args.queries):
+            question = "What is the " + " ".join(rng.choice(VOCABULARY) for _ in range(6)) + "?"
+            start = time.perf_counter()
+            context = "\n".join(r.text for r in index.search(embedder.embed_query(question), top_k=3))
+            await llm.generate_text(f"Context:\n{context}\n\nQuestion: {question}", max_tokens=args.max_tokens)
+            latencies.append(time.perf_counter() - start)
+        if latencies:
+            latencies.sort()
+            logger.info(
+                f"Chat with '{args.llm}': median {statistics.median(latencies) * 1000:.1f} ms, "
+                f"p95 {latencies[int(0.95 * (len(latencies) - 1))] * 1000:.1f} ms over {len(latencies)} question(s)."
+            )
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest and chat throughput with the selected model backends")
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--audio", type=int, default=4, help="Recordings to synthesize and ingest")
+    parser.add_argument("--audio-words", type=int, default=400, help="Words per recording")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--max-tokens", type=int, default=128)
+    for modality in ("asr", "llm", "tts", "embedding"):
+        parser.add_argument(f"--{modality}", default="fake", help=f"{modality} backend (default: fake)")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main()
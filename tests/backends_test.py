@@ -0,0 +1,79 @@
+import os
+import tempfile
+import wave
+import numpy as np
+from src.external_services import backends
+from src.external_services.backends import available_backends, create_client, register_backend, resolve_backend
+from src.external_services.fake_backends import FakeASRClient, FakeEmbeddingClient, FakeLLMClient, FakeTTSClient
+from src.external_services.llm_client import GenerationStats
+from src.external_services.llm_scheduler import LLMScheduler
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+async def main_test_backends():
+    # 1. Every modality has a CPU engine and a fake; "auto" depends on the platform
+    for modality in ("asr", "llm", "tts", "embedding"):
+        assert "fake" in available_backends(modality)
+    is_apple_silicon = backends.is_apple_silicon
+    try:
+        backends.is_apple_silicon = lambda: False
+        assert [resolve_backend(m, "auto") for m in ("asr", "llm", "tts")] == ["faster-whisper", "llama-cpp", "piper"]
+        backends.is_apple_silicon = lambda: True
+        assert [resolve_backend(m, "auto") for m in ("asr", "llm", "tts")] == ["mlx", "mlx", "melo"]
+    finally:
+        backends.is_apple_silicon = is_apple_silicon
+    try:
+        resolve_backend("llm", "no-such-engine")
+        raise AssertionError("An unknown backend must be rejected.")
+    except ValueError as e:
+        assert "llama-cpp" in str(e)
+
+    # 2. Backends are created by name with keyword arguments, and custom ones can be registered
+    llm = create_client("llm", "fake", response_tokens=5)
+    assert isinstance(llm, FakeLLMClient)
+    register_backend("llm", "echo", lambda **kwargs: ("echo", kwargs))
+    assert create_client("llm", "echo", temperature=0) == ("echo", {"temperature": 0})
+
+    # 3. The fake LLM is deterministic and works standalone and behind the scheduler
+    stats = GenerationStats()
+    answer = await llm.generate_text("What is the pump pressure?")
+    assert answer == await llm.generate_text("What is the pump pressure?") and len(answer.split()) == 5
+    assert answer != await llm.generate_text("Who attended the meeting?")
+    scheduler = LLMScheduler(llm, max_batch_size=4)
+    assert await scheduler.generate("What is the pump pressure?", stats=stats) == answer
+    assert stats.generation_tokens == 5
+    scheduler.stop()
+
+    # 4. Fake embeddings are normalized, deterministic, and similar for texts sharing words
+    embedder = create_client("embedding", "fake", dim=64, precision="float32")
+    assert isinstance(embedder, FakeEmbeddingClient) and embedder.dimension == 64
+    vectors = embedder.embed_texts(["replace the pump seal", "replace the pump seal now", "quarterly budget review"])
+    assert vectors.shape == (3, 64) and np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+    assert np.array_equal(embedder.embed_query("replace the pump seal"), vectors[0])
+    assert create_client("embedding", "fake", dim=64, precision="int8").embed_texts(["a"]).dtype == np.int8
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # 5. Fake TTS writes a playable WAV, which fake ASR transcribes the same way whole or in segments
+        tts = create_client("tts", "fake")
+        assert isinstance(tts, FakeTTSClient)
+        path = await tts.synthesize_speech("Please inspect the valve before the next shift. " * 20,
+                                           os.path.join(work_dir, "speech", "answer.wav"))
+        with wave.open(path, "rb") as wav_file:
+            assert wav_file.getframerate() == 16000 and wav_file.getnframes() > 0
+
+        asr = create_client("asr", "fake")
+        assert isinstance(asr, FakeASRClient)
+        text = await asr.transcribe(path, language="en")
+        assert text and text == await asr.transcribe(path, language="en")
+        segments = [s async for s in asr.transcribe_stream(path, "en", content_hash="answer", workers=2)]
+        assert len(segments) > 1 and [s.index for s in segments] == list(range(len(segments)))
+        assert all(s.text for s in segments)
+
+    logger.info("Model backends test PASSED.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(main_test_backends())
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import numpy as np
+from src.ingestion.batch_ingest import ingest_directory, iter_source_files
+from src.memory.persistent_store import PersistentVectorStore
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+class HashingEmbeddingClient:
+    """Deterministic stand-in for EmbeddingClient so the test needs no model download."""
+    model_name = "hashing-test-model"
+
+    def embed_texts(self, texts):
+        return np.stack([np.random.default_rng(abs(hash(t)) % 2**32).normal(size=8) for t in texts]).astype(np.float32)
+
+async def main_test_batch_ingest():
+    with tempfile.TemporaryDirectory() as work_dir:
+        docs_dir = os.path.join(work_dir, "docs")
+        os.makedirs(os.path.join(docs_dir, "nested"))
+        for rel_path, body in [("a.txt", "alpha "), ("nested/b.txt", "bravo "), ("nested/copy_of_a.txt", "alpha ")]:
+            with open(os.path.join(docs_dir, rel_path), "w") as f:
+                f.write(body * 300)
+        with open(os.path.join(docs_dir, "ignored.docx"), "w") as f:
+            f.write("unsupported")
+
+        # 1. Only supported files are picked up, in a stable order
+        found = [os.path.relpath(p, docs_dir) for p in iter_source_files(docs_dir)]
+        assert found == ["a.txt", "nested/b.txt", "nested/copy_of_a.txt"], found
+
+        # 2. The first run ingests each distinct content once
+        kb = PersistentVectorStore(os.path.join(work_dir, "kb"), dim=8)
+        summary = await ingest_directory(docs_dir, kb, HashingEmbeddingClient(), cpu_workers=1)
+        assert summary["ingested"] == 2 and summary["skipped"] == 1 and summary["failed"] == 0, summary
+        assert sorted(kb.list_sources()) == ["a.txt", "nested/b.txt"]
+        chunk_count = len(kb)
+        kb.close()
+
+        # 3. A second run (e.g. after a crash) resumes: only new content is processed
+        with open(os.path.join(docs_dir, "nested", "c.txt"), "w") as f:
+            f.write("charlie " * 300)
+        kb = PersistentVectorStore(os.path.join(work_dir, "kb"), dim=8)
+        summary = await ingest_directory(docs_dir, kb, HashingEmbeddingClient(), cpu_workers=1)
+        assert summary["ingested"] == 1 and summary["skipped"] == 3, summary
+        assert len(kb) > chunk_count
+        kb.close()
+
+    logger.info("Batch ingestion test PASSED.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(main_test_batch_ingest())
@@ -0,0 +1,59 @@
+from src.ingestion.chunker import Chunk, TextSegment
+from src.ingestion.document_parser import TextProcessor
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+def make_pages(count):
+    return [
+        TextSegment(
+            text=" ".join(f"Page {page} sentence {i} describes item {page * 1000 + i}." for i in range(40)) + "\n\n",
+            page_number=page,
+        )
+        for page in range(1, count + 1)
+    ]
+
+async def main_test_chunker():
+    processor = TextProcessor()  # chunk_size=1000, chunk_overlap=200
+    pages = make_pages(30)
+    full_text = "".join(page.text for page in pages)
+
+    # 1. Chunks carry exact offsets, page ranges and the source id
+    chunks = list(processor.iter_chunks(pages, source_id="manual.pdf"))
+    for i, chunk in enumerate(chunks):
+        assert chunk.index == i and chunk.source_id == "manual.pdf"
+        assert full_text[chunk.start:chunk.end] == chunk.text, f"Offsets of chunk {i} are wrong."
+        assert f"Page {chunk.page_end} " in chunk.text
+    assert chunks[0].page_start == 1 and chunks[-1].page_end == 30
+    assert chunks[0].metadata() == {
+        "source": "manual.pdf", "chunk_index": 0, "start": 0, "end": chunks[0].end, "page_start": 1, "page_end": 1,
+    }
+
+    # 2. Same size/overlap semantics as chunk_text: bounded size, consecutive chunks overlap, no gaps
+    assert all(len(c.text) <= processor.chunk_size for c in chunks)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert not full_text[previous.end:chunk.start].strip(), "Only separators may fall between chunks."
+        assert previous.end - chunk.start <= processor.chunk_overlap
+    assert abs(len(chunks) - len(processor.chunk_text(full_text))) <= 2
+
+    # 3. Chunks are emitted before the input is exhausted
+    consumed = []
+    def page_stream():
+        for page in make_pages(30):
+            consumed.append(page.page_number)
+            yield page
+    first = next(processor.iter_chunks(page_stream()))
+    assert first.start == 0 and len(consumed) < 30, f"Consumed {len(consumed)} pages before the first chunk."
+
+    # 4. Plain strings work (no page numbers), and cached chunks round-trip without their source id
+    text_chunks = list(processor.iter_chunks(["just some text. " * 10]))
+    assert len(text_chunks) == 1 and text_chunks[0].page_start is None and "page_start" not in text_chunks[0].metadata()
+    restored = Chunk.from_dict(chunks[3].to_dict(), source_id="copy.pdf")
+    assert restored.text == chunks[3].text and restored.start == chunks[3].start and restored.source_id == "copy.pdf"
+
+    logger.info("Streaming chunker test PASSED.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(main_test_chunker())
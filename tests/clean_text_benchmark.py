@@ -0,0 +1,63 @@
+# tests/clean_text_benchmark.py
+# Throughput (MB/s) of TextProcessor.clean_text for each stem_method.
+# Run from the project root: python -m tests.clean_text_benchmark --size-mb 5 --n-process 1 4
+# Pass --file to benchmark a real transcript instead of synthetic text.
+import argparse
+import random
+import time
+from src.ingestion.document_parser import TextProcessor
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger("CleanTextBenchmark")
+
+def make_transcript(size_mb: float, seed: int = 0) -> str:
+    """Synthetic transcript-like text: short sentences, repeated phrases and filler words."""
+    rng = random.Random(seed)
+    vocabulary = (
+        "the a so um uh like we you they research model models training trained data dataset results "
+        "experiment experiments running ran runs analysis analyses memory retrieval question answers "
+        "is was were are be been being important interesting really very going think know mean"
+    ).split()
+    sentences, size = [], 0
+    while size < size_mb * 1024 * 1024:
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(4, 18))]
+        if rng.random() < 0.1:
+            words.insert(rng.randrange(len(words)), words[0])  # Stutters ("the the")
+        sentence = " ".join(words).capitalize() + rng.choice([".", ".", "?", "!"])
+        # Speakers repeat themselves; duplicate sentences are common in transcripts
+        if sentences and rng.random() < 0.05:
+            sentence = rng.choice(sentences[-50:])
+        sentences.append(sentence)
+        size += len(sentence) + 1
+    return "\n".join(sentences)
+
+def main():
+    parser = argparse.ArgumentParser(description="clean_text throughput per stem_method")
+    parser.add_argument("--file", help="Text file to clean instead of synthetic text")
+    parser.add_argument("--size-mb", type=float, default=2.0)
+    parser.add_argument("--methods", nargs="+", default=["none", "nltk_stem", "nltk_lem", "spacy"])
+    parser.add_argument("--n-process", type=int, nargs="+", default=[1], help="spaCy process counts to try")
+    parser.add_argument("--repeat", type=int, default=2, help="Runs per configuration; the best is reported")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = make_transcript(args.size_mb)
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+    logger.info(f"Cleaning {size_mb:.2f} MB of text")
+
+    processor = TextProcessor()
+    for method in args.methods:
+        for n_process in (args.n_process if method == "spacy" else [1]):
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                cleaned = processor.clean_text(text, stem_method=method, n_process=n_process)
+                best = min(best, time.perf_counter() - start)
+            label = f"{method} (n_process={n_process})" if method == "spacy" else method
+            logger.info(f"{label:<24} {size_mb / best:7.2f} MB/s  ({best:.2f}s, {len(cleaned) / len(text):.0%} of input kept)")
+
+if __name__ == "__main__":
+    main()
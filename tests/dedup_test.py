@@ -0,0 +1,78 @@
+import os
+import random
+import tempfile
+import numpy as np
+from src.ingestion.dedup import ChunkDeduplicator
+from src.ingestion.document_parser import TextProcessor
+from src.ingestion.pipeline import IngestionPipeline
+from src.memory.diversity import diversify, maximal_marginal_relevance
+from src.memory.vector_index import SearchResult, VectorIndex
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+class CountingEmbeddingClient:
+    model_name = "counting-test-model"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.texts = 0
+
+    def embed_texts(self, texts):
+        self.texts += len(texts)
+        return np.random.default_rng(len(texts)).normal(size=(len(texts), self.dim)).astype(np.float32)
+
+def paragraph(rng, words=80):
+    vocabulary = "pump valve seal pressure flow gauge motor bearing shaft housing filter inlet outlet".split()
+    return " ".join(rng.choice(vocabulary) + str(rng.randrange(50)) for _ in range(words))
+
+async def main_test_dedup():
+    rng = random.Random(0)
+
+    # 1. Exact repeats (ignoring case and spacing) and near-copies are caught; distinct text is kept
+    dedup = ChunkDeduplicator(threshold=0.8)
+    original = paragraph(rng)
+    words = original.split()
+    words[40] = "replaced"
+    assert not dedup.is_duplicate(original)
+    assert dedup.is_duplicate("  " + original.upper())
+    assert dedup.is_duplicate(" ".join(words)), "One changed word in 80 should be a near duplicate."
+    assert not dedup.is_duplicate(paragraph(rng))
+    assert dedup.exact_duplicates == 1 and dedup.near_duplicates == 1
+
+    # 2. A transcript full of repeated filler embeds far fewer chunks with deduplication on
+    dim = 8
+    transcript = "\n\n".join(paragraph(rng, 40) if i % 4 == 0 else "Yeah. Yeah. Okay. " * 12 for i in range(40))
+    embedded = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, "meeting.txt")
+        with open(path, "w") as f:
+            f.write(transcript)
+        for deduplicate in (False, True):
+            client = CountingEmbeddingClient(dim)
+            index = VectorIndex(dim=dim)
+            pipeline = IngestionPipeline(TextProcessor(chunk_size=300, chunk_overlap=50), client, index,
+                                         cpu_workers=1, deduplicate=deduplicate)
+            [result] = await pipeline.run([path])
+            await pipeline.close()
+            assert result.error is None and len(index) == result.chunk_count == client.texts
+            embedded[deduplicate] = client.texts
+        assert embedded[True] < embedded[False] * 0.7, f"Embedded {embedded} chunks."
+        assert pipeline.duplicate_chunks == embedded[False] - embedded[True]
+
+    # 3. MMR skips a near-copy of an already chosen result in favor of new information
+    base = np.array([1.0, 0.0, 0.0])
+    vectors = np.stack([base, base + [0.0, 0.05, 0.0], [0.6, 0.8, 0.0]]).astype(np.float32)
+    index = VectorIndex(dim=3)
+    ids = index.add(vectors, ["original", "near copy", "different"])
+    results = [SearchResult(id=i, score=s, text=t) for i, s, t in zip(ids, [0.95, 0.94, 0.8], ["original", "near copy", "different"])]
+    assert [r.text for r in diversify(index, results, top_k=2, lambda_mult=0.5)] == ["original", "different"]
+    assert [r.text for r in diversify(index, results, top_k=2, lambda_mult=1.0)] == ["original", "near copy"]
+    assert maximal_marginal_relevance(np.ones(3), VectorIndex._normalize(vectors), top_k=5) == [0, 2, 1]
+
+    logger.info("Chunk deduplication and MMR test PASSED.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(main_test_dedup())
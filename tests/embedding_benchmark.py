@@ -0,0 +1,81 @@
+# tests/embedding_benchmark.py
+# Sentences/sec of EmbeddingClient.embed_texts with and without length sorting, per batch size,
+# and the index memory and retrieval agreement of float16/int8 vectors against float32.
+# Run from the project root: python -m tests.embedding_benchmark --texts 2000 --batch-sizes 16 64 128
+# Add --workers 2 4 8 to compare the multi-process embedding pool on a many-core CPU box.
+import argparse
+import random
+import time
+import numpy as np
+from src.external_services.embedding_client import EmbeddingClient
+from src.external_services.embedding_pool import MultiProcessEmbeddingClient
+from src.memory.vector_index import VectorIndex, quantize
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger("EmbeddingBenchmark")
+
+def make_chunks(count: int, seed: int = 0):
+    """Chunk-like texts with a wide spread of lengths, from a sentence to a full chunk."""
+    rng = random.Random(seed)
+    vocabulary = (
+        "memory retrieval embedding model research question answer document chunk index vector "
+        "transcript speaker result experiment training data analysis the a of and to in is was"
+    ).split()
+    return [" ".join(rng.choice(vocabulary) for _ in range(rng.choice([8, 20, 60, 150]))) + "." for _ in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description="EmbeddingClient throughput and reduced-precision accuracy")
+    parser.add_argument("--texts", type=int, default=1000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[16, 64, 128])
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--workers", type=int, nargs="*", default=[], help="Embedding pool sizes to benchmark")
+    args = parser.parse_args()
+
+    texts = make_chunks(args.texts)
+    client = EmbeddingClient(device=args.device)
+    client.embed_texts(texts[:32])  # Warm-up
+
+    embeddings = None
+    for batch_size in args.batch_sizes:
+        for sort_by_length in (False, True):
+            client.sort_by_length = sort_by_length
+            start = time.perf_counter()
+            result = client.embed_texts(texts, batch_size=batch_size)
+            elapsed = time.perf_counter() - start
+            label = "sorted" if sort_by_length else "unsorted"
+            logger.info(f"batch={batch_size:<4} {label:<8} {len(texts) / elapsed:8.1f} sentences/s")
+            if embeddings is None:
+                embeddings = result
+            else:
+                assert np.allclose(result, embeddings, atol=1e-4), "Sorting must not change the embeddings."
+
+    for workers in args.workers:
+        with MultiProcessEmbeddingClient(num_workers=workers, batch_size=max(args.batch_sizes)) as pool:
+            pool.embed_texts(texts[:32 * workers])  # Warm-up
+            start = time.perf_counter()
+            result = pool.embed_texts(texts)
+            elapsed = time.perf_counter() - start
+        logger.info(f"pool workers={workers:<3} {len(texts) / elapsed:8.1f} sentences/s")
+        assert np.allclose(result, embeddings, atol=1e-4), "The pool must return the same embeddings."
+
+    # Retrieval with reduced-precision storage vs. float32, using held-out texts as queries
+    queries = np.asarray([client.embed_query(q) for q in make_chunks(args.queries, seed=1)])
+    reference = VectorIndex(dim=embeddings.shape[1], precision="float32")
+    reference.add(embeddings, texts)
+    expected = [{r.id for r in reference.search(q, top_k=args.top_k)} for q in queries]
+    for precision in ("float32", "float16", "int8"):
+        index = VectorIndex(dim=embeddings.shape[1], precision=precision)
+        index.add(quantize(embeddings, precision), texts)
+        overlap = np.mean([
+            len(expected[i] & {r.id for r in index.search(q, top_k=args.top_k)}) / args.top_k
+            for i, q in enumerate(queries)
+        ])
+        logger.info(
+            f"{precision:<8} index memory={index.memory_bytes / 1024:8.1f} KiB  "
+            f"top-{args.top_k} agreement with float32={overlap:.1%}"
+        )
+
+if __name__ == "__main__":
+    main()
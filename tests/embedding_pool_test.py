@@ -0,0 +1,88 @@
+import threading
+import time
+import numpy as np
+from src.external_services.embedding_pool import MultiProcessEmbeddingClient
+from src.external_services.query_cache import QueryEmbeddingCache
+from src.memory.vector_index import dequantize
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+DIM = 8
+
+def hash_embedding(text):
+    """Deterministic stand-in for a model: a normalized vector seeded by the text."""
+    vector = np.random.default_rng(sum(map(ord, text)) + len(text)).normal(size=DIM)
+    return (vector / np.linalg.norm(vector)).astype(np.float32)
+
+class HashingEncoder:
+    dimension = DIM
+
+    def encode_batch(self, texts):
+        if "boom" in texts:
+            raise ValueError("cannot embed 'boom'")
+        return np.stack([hash_embedding(t) for t in texts])
+
+class SlowEncoder(HashingEncoder):
+    def encode_batch(self, texts):
+        time.sleep(0.01 * len(texts))
+        return super().encode_batch(texts)
+
+class BrokenEncoder:
+    def __init__(self):
+        raise OSError("model files missing")
+
+async def main_test_embedding_pool():
+    texts = [f"chunk {i} " + "word " * (i % 17) for i in range(203)]
+
+    query_cache = QueryEmbeddingCache(max_entries=16, directory="")
+    with MultiProcessEmbeddingClient(num_workers=3, batch_size=16, client_factory=HashingEncoder, query_cache=query_cache) as pool:
+        assert pool.dimension == DIM
+
+        # 1. Rows come back in input order, identical to embedding each text on its own
+        embeddings = pool.embed_texts(texts)
+        assert embeddings.shape == (len(texts), DIM) and embeddings.dtype == np.float32
+        assert np.allclose(embeddings, np.stack([hash_embedding(t) for t in texts]))
+        assert np.allclose(pool.embed_query("a question"), hash_embedding("a question"))
+        assert np.allclose(pool.embed_query("A  question"), hash_embedding("a question"))
+        assert query_cache.stats()["memory_hits"] == 1, "A repeated query should skip the workers."
+
+        # 2. Work is sharded so every worker gets some, capped at batch_size
+        assert pool._shard_size(len(texts), 16) == 16 and pool._shard_size(20, 16) == 7
+
+        # 3. Reduced precision output, and empty input
+        compact = pool.embed_texts(texts[:10], precision="int8")
+        assert compact.dtype == np.int8 and np.allclose(dequantize(compact), embeddings[:10], atol=1 / 127)
+        assert pool.embed_texts([]).shape == (0, DIM)
+
+        # 4. A failing batch fails the call, and the pool keeps working afterwards
+        assert len(pool.embed_texts(texts[:5] + ["boom"])) == 0
+        assert np.allclose(pool.embed_texts(texts[:5]), embeddings[:5])
+
+    # 5. A query is answered between the shards of a large batch instead of after all of them
+    with MultiProcessEmbeddingClient(num_workers=2, batch_size=8, client_factory=SlowEncoder, query_cache=False) as pool:
+        batch = []
+        batch_thread = threading.Thread(target=lambda: batch.append(pool.embed_texts(texts * 2)))
+        batch_thread.start()
+        time.sleep(0.3)
+        start = time.perf_counter()
+        query = pool.embed_query("a question")
+        query_seconds = time.perf_counter() - start
+        assert batch_thread.is_alive(), "The batch should still be running."
+        batch_thread.join()
+        assert np.allclose(query, hash_embedding("a question")) and np.allclose(batch[0][:len(texts)], embeddings)
+        assert query_seconds < 0.5, f"The query waited {query_seconds:.2f}s behind the batch."
+
+    # 6. A worker that cannot load its model fails the constructor
+    try:
+        MultiProcessEmbeddingClient(num_workers=2, client_factory=BrokenEncoder, start_timeout=60)
+        raise AssertionError("Expected the pool to fail to start.")
+    except RuntimeError as e:
+        assert "model files missing" in str(e)
+
+    logger.info("Multi-process embedding pool test PASSED.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(main_test_embedding_pool())
@@ -0,0 +1,104 @@
+import tempfile
+import threading
+import time
+import numpy as np
+from src.memory.bm25_index import BM25Index
+from src.memory.diversity import diversify
+from src.memory.hybrid_index import HybridIndex, reciprocal_rank_fusion
+from src.memory.persistent_store import PersistentVectorStore
+from src.memory.vector_index import VectorIndex
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+def simple_tokenize(text):
+    """Lowercase words with punctuation removed; avoids needing the NLTK stopword corpus here."""
+    return ["".join(ch for ch in word if ch.isalnum()) for word in text.lower().split()]
+
+async def main_test_hybrid_search():
+    rng = np.random.default_rng(0)
+    dim = 16
+
+    # 1. BM25 favors rare terms and shorter documents, and supports deletes
+    bm25 = BM25Index()
+    bm25.add([0, 1, 2], [["pump", "manual"], ["pump", "pump", "valve", "manual", "index"], ["valve"]])
+    hits = bm25.search(["pump", "valve"], top_k=3)
+    assert [doc for doc, _ in hits][0] == 1 and len(hits) == 3
+    assert bm25.idf("index") > bm25.idf("pump")
+    assert bm25.delete([1, 7]) == 1 and 1 not in bm25
+    assert [doc for doc, _ in bm25.search(["pump"], top_k=3)] == [0]
+
+    # 2. Reciprocal rank fusion rewards ids ranked well by both lists
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 2, 9]], k=60)
+    assert fused[0][0] in (2, 3) and {chunk_id for chunk_id, _ in fused} == {1, 2, 3, 9}
+
+    # 3. An exact part number missed by vector search is recovered by the hybrid search
+    texts = [f"General notes on maintenance topic {i}." for i in range(200)]
+    texts[123] = "Replace the seal kit XR-200 every 500 hours."
+    vectors = rng.normal(size=(200, dim)).astype(np.float32)
+    index = HybridIndex(VectorIndex(dim=dim), tokenizer=simple_tokenize, candidates=10)
+    ids = index.add(vectors, texts, metadatas=[{"source": "manual.pdf"}] * 200)
+    query = rng.normal(size=dim)
+    assert 123 not in [r.id for r in index.search(query, top_k=3)], "Pick a query the vectors do not match."
+    results = index.search(query, top_k=3, query_text="What is the interval for XR-200?")
+    # Rank 1 of the BM25 list ties with rank 1 of the vector list
+    assert len(results) == 3 and 123 in [r.id for r in results[:2]]
+    hit = next(r for r in results if r.id == 123)
+    assert hit.text == texts[123] and hit.metadata == {"source": "manual.pdf"}
+
+    # 4. Deletes reach the BM25 index, and the wrapped store's API passes through
+    index.delete([ids[123]])
+    assert 123 not in [r.id for r in index.search(query, top_k=3, query_text="XR-200")]
+    assert index.ids_for_source("manual.pdf") == ids[:123] + ids[124:] and len(index) == 199
+
+    # 5. Over a persistent store, chunks written by another process are picked up before searching
+    with tempfile.TemporaryDirectory() as kb_dir:
+        writer = PersistentVectorStore(kb_dir, dim=dim)
+        writer.add(vectors[:50], texts[:50])
+        reader = HybridIndex(PersistentVectorStore(kb_dir, dim=dim, read_only=True), tokenizer=simple_tokenize)
+        assert len(reader.bm25) == 50
+        writer.add(vectors[123:124], texts[123:124])
+        results = reader.search(query, top_k=2, query_text="XR-200")
+        assert texts[123] in [r.text for r in results] and len(reader.bm25) == 51
+        reader.close()
+        writer.close()
+
+    # 6. Searches (with MMR) under the read lock never see a source half re-ingested by a writer
+    index = HybridIndex(VectorIndex(dim=dim), tokenizer=simple_tokenize)
+    index.add(vectors, texts, metadatas=[{"source": f"doc{i % 4}"} for i in range(200)])
+    stop = threading.Event()
+    errors = []
+
+    def reingest():
+        while not stop.is_set():
+            source = f"doc{rng.integers(4)}"
+            with index.lock.write():
+                index.delete(index.ids_for_source(source))
+                index.add(vectors[:50], texts[:50], metadatas=[{"source": source}] * 50)
+
+    def search():
+        while not stop.is_set():
+            try:
+                with index.lock.read():
+                    results = index.search(query, top_k=10, query_text="maintenance topic")
+                    diversify(index, results, 3)
+            except Exception as e:
+                errors.append(e)
+                return
+
+    threads = [threading.Thread(target=reingest)] + [threading.Thread(target=search) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(1.0)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    assert not errors, f"Concurrent search failed: {errors[0]!r}"
+    assert len(index) == 200
+
+    logger.info("Hybrid search test PASSED.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(main_test_hybrid_search())
@@ -0,0 +1,53 @@
+# tests/import_time_benchmark.py
+# Cold import time of modules that should stay cheap to import, checked against a budget.
+# Run from the project root: python -m tests.import_time_benchmark --budget 0.5
+# Exits non-zero if a module exceeds the budget or pulls in a heavy library at import.
+import argparse
+import statistics
+import subprocess
+import sys
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger("ImportTimeBenchmark")
+
+# Libraries that must only be loaded on first use
+HEAVY_MODULES = ["spacy", "nltk", "fitz", "pdfplumber", "langchain_text_splitters"]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+def time_import(module: str) -> tuple:
+    """Imports `module` in a fresh interpreter; returns (seconds, heavy modules loaded)."""
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        capture_output=True, text=True, check=True,
+    ).stdout.splitlines()
+    return float(output[-2]), [m for m in output[-1].split(",") if m]
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time budget check")
+    parser.add_argument("--modules", nargs="+", default=["src.ingestion.document_parser"])
+    parser.add_argument("--budget", type=float, default=0.5, help="Maximum median import time in seconds")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        runs = [time_import(module) for _ in range(args.repeat)]
+        median = statistics.median(seconds for seconds, _ in runs)
+        eager = runs[0][1]
+        status = "OK" if median <= args.budget and not eager else "OVER BUDGET"
+        logger.info(f"{module}: median {median * 1000:.0f} ms over {args.repeat} runs (budget {args.budget * 1000:.0f} ms) {status}")
+        if eager:
+            logger.error(f"{module} imports {', '.join(eager)} eagerly; load them on first use instead.")
+        failed = failed or status != "OK"
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
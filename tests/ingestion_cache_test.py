@@ -0,0 +1,46 @@
+import os
+import tempfile
+import numpy as np
+from src.ingestion.ingestion_cache import IngestionCache, hash_bytes, hash_file
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+async def main_test_ingestion_cache():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = IngestionCache(cache_dir)
+
+        # 1. Identical bytes hash identically, whether read from memory or disk
+        content = b"The quick brown fox jumps over the lazy dog."
+        file_path = os.path.join(cache_dir, "renamed_copy.txt")
+        with open(file_path, "wb") as f:
+            f.write(content)
+        content_hash = hash_bytes(content)
+        assert hash_file(file_path, block_size=7) == content_hash
+
+        # 2. Each stage round-trips its own value type
+        text_key = cache.make_key(content_hash, "txt")
+        assert cache.load("text", text_key) is None
+        cache.store("text", text_key, content.decode())
+        assert cache.load("text", text_key) == content.decode()
+
+        chunks_key = cache.make_key(content_hash, 1000, 200)
+        cache.store("chunks", chunks_key, ["chunk one", "chunk two"])
+        assert cache.load("chunks", chunks_key) == ["chunk one", "chunk two"]
+
+        embeddings = np.arange(6, dtype=np.float32).reshape(2, 3)
+        embeddings_key = cache.make_key(chunks_key, "all-MiniLM-L6-v2")
+        cache.store("embeddings", embeddings_key, embeddings)
+        assert np.array_equal(cache.load("embeddings", embeddings_key), embeddings)
+
+        # 3. Changing any stage parameter produces a different key
+        assert cache.make_key(content_hash, 1000, 200) != cache.make_key(content_hash, 500, 200)
+        assert cache.load("embeddings", cache.make_key(chunks_key, "another-model")) is None
+        assert (cache.hits, cache.misses) == (3, 2), f"Unexpected counters {cache.hits}/{cache.misses}"
+
+    logger.info("IngestionCache test PASSED.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(main_test_ingestion_cache())
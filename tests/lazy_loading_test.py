@@ -0,0 +1,49 @@
+import threading
+import time
+from src.ingestion import document_parser
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+async def main_test_lazy_loading():
+    # 1. Concurrent first calls run the loader exactly once and share its result
+    calls = []
+
+    @document_parser._load_once
+    def slow_loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(slow_loader())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1, f"Loader ran {len(calls)} times."
+    assert len(results) == 8 and all(r is results[0] for r in results)
+
+    # 2. A failed load is retried on the next call instead of caching the error
+    attempts = []
+
+    @document_parser._load_once
+    def flaky_loader():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("model not downloaded yet")
+        return "loaded"
+
+    try:
+        flaky_loader()
+        raise AssertionError("Expected the first load to fail.")
+    except OSError:
+        pass
+    assert flaky_loader() == "loaded" and len(attempts) == 2
+
+    logger.info("Lazy loading test PASSED.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(main_test_lazy_loading())
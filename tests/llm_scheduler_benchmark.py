@@ -0,0 +1,111 @@
+# tests/llm_scheduler_benchmark.py
+# Aggregate throughput and time-to-first-token of the LLM scheduler vs. number of concurrent users.
+# Run from the project root: python -m tests.llm_scheduler_benchmark --concurrency 1 2 4 8 16
+# By default two simulated backends are compared: a batched one (a decode step costs
+# a fixed overhead plus a small per-sequence cost, like a memory-bound GPU forward
+# pass) and a sequential one without step_batch that pays a full forward pass per
+# sequence per token.
+# Pass --real to load the configured LLM backend instead. Its step_batch (MLX) is
+# measured against the same model stepped one sequence at a time, so the gain from
+# batched decoding shows at each concurrency level.
+import argparse
+import asyncio
+import statistics
+import time
+from src.external_services.llm_client import GenerationStats
+from src.external_services.llm_scheduler import LLMScheduler, step_each
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger("LLMSchedulerBenchmark")
+
+class SimulatedBatchedBackend:
+    def __init__(self, step_ms: float, per_sequence_ms: float):
+        self.step_seconds = step_ms / 1000
+        self.per_sequence_seconds = per_sequence_ms / 1000
+
+    def iter_deltas(self, prompt, system_prompt=None, max_tokens=512, stats=None):
+        for i in range(max_tokens):
+            if stats is not None:
+                stats.generation_tokens = i + 1
+            yield "token "
+
+    def step_batch(self, iterators):
+        time.sleep(self.step_seconds + self.per_sequence_seconds * len(iterators))
+        return step_each(iterators)
+
+class InterleavedBackend:
+    """Hides a real backend's step_batch, so the scheduler steps its sequences one after another."""
+    def __init__(self, backend):
+        self.backend = backend
+        self.max_concurrent_sequences = getattr(backend, "max_concurrent_sequences", None)
+
+    def iter_deltas(self, prompt, system_prompt=None, max_tokens=512, stats=None):
+        return self.backend.iter_deltas(prompt, system_prompt=system_prompt, max_tokens=max_tokens, stats=stats)
+
+class SimulatedSequentialBackend:
+    """No step_batch: the scheduler interleaves sequences, and every token costs a whole decode step."""
+    def __init__(self, step_ms: float):
+        self.step_seconds = step_ms / 1000
+
+    def iter_deltas(self, prompt, system_prompt=None, max_tokens=512, stats=None):
+        for i in range(max_tokens):
+            time.sleep(self.step_seconds)
+            if stats is not None:
+                stats.generation_tokens = i + 1
+            yield "token "
+
+async def run_load(scheduler: LLMScheduler, concurrency: int, requests_per_user: int, max_tokens: int):
+    all_stats = []
+
+    async def user(user_id: int):
+        for i in range(requests_per_user):
+            stats = GenerationStats()
+            await scheduler.generate(f"User {user_id} question {i}: summarize the document.", max_tokens=max_tokens, stats=stats)
+            all_stats.append(stats)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(u) for u in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    tokens = sum(s.generation_tokens for s in all_stats)
+    ttft = statistics.median(s.time_to_first_token or 0.0 for s in all_stats)
+    return tokens / elapsed, ttft
+
+async def main_async(args):
+    if args.real:
+        from src.external_services.backends import create_llm_client
+        client = create_llm_client()
+        client.warm_up()
+        backends = {"interleaved": InterleavedBackend(client)}
+        if getattr(client, "step_batch", None) and getattr(client, "supports_batching", True):
+            backends["batched"] = client
+    else:
+        backends = {
+            "batched": SimulatedBatchedBackend(args.step_ms, args.per_sequence_ms),
+            "sequential": SimulatedSequentialBackend(args.step_ms),
+        }
+
+    for name, backend in backends.items():
+        for batch_size in (1, args.max_batch_size):
+            for concurrency in args.concurrency:
+                scheduler = LLMScheduler(backend, max_batch_size=batch_size, max_queued_requests=max(args.concurrency))
+                throughput, ttft = await run_load(scheduler, concurrency, args.requests_per_user, args.max_tokens)
+                scheduler.stop()
+                logger.info(
+                    f"{name:<10} batch={batch_size:<3} users={concurrency:<3} throughput={throughput:8.1f} tokens/s  "
+                    f"p50 TTFT={ttft * 1000:8.1f} ms  mean batch={scheduler.stats()['mean_batch_size']:.1f}"
+                )
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM scheduler throughput vs. concurrency")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--requests-per-user", type=int, default=3)
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--step-ms", type=float, default=20.0, help="Simulated fixed cost of one decode step")
+    parser.add_argument("--per-sequence-ms", type=float, default=1.0, help="Simulated extra cost per batched sequence")
+    parser.add_argument("--real", action="store_true", help="Benchmark the configured LLM backend (LLM_BACKEND)")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main()
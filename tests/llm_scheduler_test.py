@@ -0,0 +1,92 @@
+import asyncio
+import time
+from src.external_services.llm_client import GenerationStats
+from src.external_services.llm_scheduler import LLMScheduler, SchedulerOverloadedError
+from src.external_services.model_executor import ModelTimeoutError
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+class FakeBackend:
+    """Yields '<prompt>-<i> ' forever with a small per-token delay; the scheduler must stop it."""
+    def __init__(self):
+        self.closed = []
+
+    def iter_deltas(self, prompt, system_prompt=None, max_tokens=512, stats=None):
+        try:
+            i = 0
+            while True:
+                time.sleep(0.002)
+                i += 1
+                if stats is not None:
+                    stats.generation_tokens = i
+                yield f"{prompt}-{i} "
+        finally:
+            self.closed.append(prompt)
+
+async def collect(scheduler, prompt, max_tokens, stats=None):
+    return [delta async for delta in scheduler.stream(prompt, max_tokens=max_tokens, stats=stats)]
+
+async def main_test_llm_scheduler():
+    backend = FakeBackend()
+    scheduler = LLMScheduler(backend, max_batch_size=2, max_queued_requests=2)
+
+    # 1. Concurrent requests share the batch and each stops at its own max_tokens
+    stats = GenerationStats()
+    long_task = asyncio.create_task(collect(scheduler, "long", 40, stats))
+    short_task = asyncio.create_task(collect(scheduler, "short", 3))
+    short = await short_task
+    assert not long_task.done(), "A short request should not wait for a long one to finish."
+    long = await long_task
+    assert len(short) == 3 and len(long) == 40, (len(short), len(long))
+    assert stats.generation_tokens == 40 and stats.time_to_first_token is not None
+    counters = scheduler.stats()
+    assert counters["steps"] < counters["generated_tokens"], "Both sequences should be decoded in the same steps."
+    assert sorted(backend.closed) == ["long", "short"], "Finished sequences must be closed."
+
+    # 2. Abandoning a stream frees its slot for a waiting request
+    first = scheduler.stream("a", max_tokens=1000)
+    second = scheduler.stream("b", max_tokens=1000)
+    await first.__anext__()
+    await second.__anext__()
+    waiting = asyncio.create_task(collect(scheduler, "c", 5))
+    await asyncio.sleep(0.05)
+    assert not waiting.done(), "The batch is full, so 'c' has to wait."
+    await first.aclose()
+    assert len(await asyncio.wait_for(waiting, timeout=5)) == 5
+    assert "a" in backend.closed
+
+    await second.aclose()
+
+    # 3. Requests beyond the queue limit are rejected instead of piling up
+    small = LLMScheduler(FakeBackend(), max_batch_size=1, max_queued_requests=1)
+    blocker = small.stream("blocker", max_tokens=1000)
+    await blocker.__anext__()
+    queued = asyncio.create_task(collect(small, "queued", 5))
+    await asyncio.sleep(0)
+    try:
+        await collect(small, "overflow", 5)
+        raise AssertionError("Expected SchedulerOverloadedError")
+    except SchedulerOverloadedError:
+        pass
+    await blocker.aclose()
+    assert len(await asyncio.wait_for(queued, timeout=5)) == 5
+
+    # 4. A request that runs past its timeout raises and gives its slot to the next one
+    stats = GenerationStats()
+    try:
+        await small.generate("endless", max_tokens=100000, stats=stats, timeout=0.1)
+        raise AssertionError("Expected ModelTimeoutError")
+    except ModelTimeoutError:
+        pass
+    assert len(await asyncio.wait_for(collect(small, "next", 5), timeout=5)) == 5
+    assert "endless" in small.backend.closed and stats.generation_tokens < 100000
+    small.stop(timeout=5)
+
+    logger.info(f"Scheduler stats: {scheduler.stats()}")
+    scheduler.stop(timeout=5)
+    logger.info("LLM scheduler test PASSED.")
+
+if __name__ == "__main__":
+    asyncio.run(main_test_llm_scheduler())
@@ -0,0 +1,66 @@
+import time
+from dataclasses import dataclass
+from src.external_services import llm_client as llm_module
+from src.external_services.llm_client import GenerationStats, LLMClient
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+# --- Fake MLX backend: lets the streaming path run without mlx_lm or a model download ---
+@dataclass
+class FakeResponse:
+    text: str
+    prompt_tokens: int
+    generation_tokens: int
+
+class FakeTokenizer:
+    """Tokenizes on whitespace, assigning ids in order of first appearance."""
+    def __init__(self):
+        self.vocab = {}
+
+    def apply_chat_template(self, messages, tokenize=False, add_generation_prompt=True):
+        text = " ".join(m["content"] for m in messages)
+        if not tokenize:
+            return text
+        return [self.vocab.setdefault(word, len(self.vocab)) for word in text.split()]
+
+def fake_load(model_path):
+    return object(), FakeTokenizer()
+
+def fake_stream_generate(model, tokenizer, prompt, max_tokens=512, **kwargs):
+    words = ["Streaming ", "keeps ", "users ", "engaged ", "while ", "the ", "model ", "decodes."]
+    for i, word in enumerate(words[:max_tokens]):
+        time.sleep(0.01)  # Simulated per-token decode latency
+        yield FakeResponse(text=word, prompt_tokens=len(prompt), generation_tokens=i + 1)
+
+async def main_test_llm_stream():
+    llm_module.load = fake_load
+    llm_module.stream_generate = fake_stream_generate
+    client = LLMClient(model_path="fake/model", prompt_cache_bytes=0)
+
+    # 1. Deltas arrive incrementally and timing stats are filled in
+    stats = GenerationStats()
+    arrivals = []
+    async for delta in client.stream_text("Why stream?", system_prompt="Be brief.", stats=stats):
+        arrivals.append((time.perf_counter(), delta))
+    assert "".join(d for _, d in arrivals) == "Streaming keeps users engaged while the model decodes."
+    assert arrivals[-1][0] - arrivals[0][0] > 0.05, "Deltas should be delivered as they are produced, not all at the end."
+    assert stats.generation_tokens == 8 and stats.prompt_tokens == 4
+    assert stats.time_to_first_token < stats.total_seconds and stats.tokens_per_second > 0
+    logger.info(f"TTFT={stats.time_to_first_token:.3f}s, {stats.tokens_per_second:.1f} tokens/s")
+
+    # 2. Stopping early stops the producer thread
+    stream = client.stream_text("Why stream?", max_tokens=8)
+    first = await stream.__anext__()
+    await stream.aclose()
+    assert first == "Streaming "
+
+    # 3. generate_text still returns the full response
+    assert await client.generate_text("Why stream?", max_tokens=2) == "Streaming keeps "
+
+    logger.info("LLM streaming test PASSED.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(main_test_llm_stream())
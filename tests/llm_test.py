@@ -1,6 +1,7 @@
-
+import asyncio
 from mlx_lm import load
 from src.external_services.llm_client import LLMClient
+from src.external_services.llm_scheduler import LLMScheduler
 
 # Example Usage (for testing this file directly):
 async def main_test_llm():
@@ -14,6 +15,17 @@ async def main_test_llm():
             # If using a base model
             response = await llm_client.generate_text(prompt_text, max_tokens=512)
             print(f"\nLLM Response:\n{response}")
+
+            # Concurrent requests through the scheduler are decoded together by step_batch
+            scheduler = LLMScheduler(llm_client, max_batch_size=4)
+            questions = ["What is a vector index?", "Name three primary colors.", "What does RAG stand for?"]
+            answers = await asyncio.gather(*(scheduler.generate(q, max_tokens=64) for q in questions))
+            scheduler.stop()
+            assert all(answers), "Every batched request should get an answer."
+            if llm_client.supports_batching:
+                assert scheduler.stats()["mean_batch_size"] > 1, "Concurrent requests should share decode steps."
+            for question, answer in zip(questions, answers):
+                print(f"\n{question}\n{answer}")
         except Exception as e:
             print(f"Could not run LLM test: {e}")
     else:
@@ -21,5 +33,4 @@ async def main_test_llm():
 
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main_test_llm())
\ No newline at end of file
@@ -0,0 +1,70 @@
+import threading
+import time
+from src.external_services.fake_backends import FakeLLMClient
+from src.external_services.model_pool import FAILED, LOADING, NOT_LOADED, READY, ModelWarmPool
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+class SlowModel:
+    """Takes `load_seconds` to construct; records its warm-up calls."""
+    def __init__(self, name, load_seconds):
+        time.sleep(load_seconds)
+        self.name = name
+        self.warm_ups = 0
+        self.thread = threading.current_thread().name
+
+    def warm_up(self):
+        time.sleep(0.02)
+        self.warm_ups += 1
+
+async def main_test_model_pool():
+    # 1. Eager models load concurrently in the background; lazy ones wait for their first use
+    pool = ModelWarmPool(warm_up=True)
+    for name in ("embedding", "llm", "asr"):
+        pool.register(name, lambda name=name: SlowModel(name, 0.3), eager=name != "asr")
+    start = time.perf_counter()
+    pool.start()
+    assert time.perf_counter() - start < 0.1, "start() must not wait for the models."
+    assert pool.status("llm").state == LOADING and pool.status("asr").state == NOT_LOADED
+    embedding, llm = pool.get("embedding"), pool.get("llm")
+    elapsed = time.perf_counter() - start
+    assert elapsed < 0.55, f"Two 0.3s loads took {elapsed:.2f}s; they should overlap."
+    assert embedding.thread != llm.thread and embedding.warm_ups == llm.warm_ups == 1
+    assert pool.is_ready("llm") and pool.status("asr").state == NOT_LOADED
+
+    asr = pool.get("asr")
+    assert asr.name == "asr" and pool.get("asr") is asr, "A model is loaded once."
+    report = pool.profile_report()
+    assert all(name in report for name in ("embedding", "llm", "asr")) and "warm-up" in report
+    assert all(s.state == READY and s.load_seconds >= 0.3 and s.warmup_seconds > 0 for s in pool.statuses())
+    logger.info(f"Startup profile:\n{report}")
+
+    # 2. A failed load is reported, re-raised on get(), and retried by the next get()
+    attempts = []
+
+    def flaky_loader():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("model not downloaded yet")
+        return FakeLLMClient(response_tokens=3)
+
+    pool.register("tts", flaky_loader)
+    try:
+        pool.get("tts")
+        raise AssertionError("The failed load should be re-raised.")
+    except OSError:
+        pass
+    assert pool.status("tts").state == FAILED and "not downloaded" in pool.status("tts").error
+    client = pool.get("tts")
+    assert pool.status("tts").state == READY and len(attempts) == 2
+    # The retried client went through its own warm_up() (one decoded token) and answers normally
+    assert await client.generate_text("Hello") == await client.generate_text("Hello")
+    pool.close()
+
+    logger.info("Model warm pool test PASSED.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(main_test_model_pool())
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import numpy as np
+from fpdf import FPDF
+from src.ingestion.document_parser import TextProcessor
+from src.ingestion.pipeline import IngestionPipeline
+from src.memory.vector_index import VectorIndex
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+class CountingEmbeddingClient:
+    model_name = "counting-test-model"
+
+    def embed_texts(self, texts):
+        return np.ones((len(texts), 8), dtype=np.float32)
+
+def write_pdf(path, page_count):
+    pdf = FPDF()
+    pdf.set_font("Arial", size=11)
+    for page in range(1, page_count + 1):
+        pdf.add_page()
+        body = " ".join(f"Section {page}.{i} explains setting {page * 100 + i} in detail." for i in range(12))
+        pdf.multi_cell(0, 6, f"Page {page} of the manual. {body}")
+    pdf.output(path)
+
+async def main_test_pdf_stream():
+    processor = TextProcessor(chunk_size=300, chunk_overlap=60)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        pdf_path = os.path.join(work_dir, "manual.pdf")
+        write_pdf(pdf_path, page_count=9)
+
+        # 1. Pages are yielded one at a time with 1-based page numbers, by either engine
+        assert processor.count_pdf_pages(pdf_path) == 9
+        for engine in ("pymupdf", "pdfplumber"):
+            pages = list(processor.iter_pdf_pages(pdf_path, engine=engine))
+            assert [p.page_number for p in pages] == list(range(1, 10)), engine
+            assert "Page 3 of the manual" in pages[2].text
+        middle = list(processor.iter_pdf_pages(pdf_path, start_page=3, end_page=5))
+        assert [p.page_number for p in middle] == [4, 5]
+        assert processor.extract_text_from_pdf(pdf_path) == "".join(p.text for p in processor.iter_pdf_pages(pdf_path))
+
+        # 2. Streamed chunks respect chunk_size and cover the text in order with overlap
+        pages = [p.text for p in processor.iter_pdf_pages(pdf_path)]
+        full_text = "".join(pages)
+        chunks = list(processor.chunk_stream(pages, window=900))
+        assert all(len(c) <= processor.chunk_size for c in chunks)
+        position = 0
+        for chunk in chunks:
+            start = full_text.find(chunk, max(position - processor.chunk_size, 0))
+            assert 0 <= start <= position + 1, "Chunks must follow each other without gaps."
+            position = start + len(chunk)
+        assert position >= len(full_text.rstrip()) - 1
+        assert abs(len(chunks) - len(processor.chunk_text(full_text))) <= 2
+
+        # 3. The pipeline extracts page ranges in parallel and streams them into the chunker
+        index = VectorIndex(dim=8)
+        pipeline = IngestionPipeline(processor, CountingEmbeddingClient(), index, cpu_workers=2, pdf_pages_per_task=2)
+        [result] = await pipeline.run([pdf_path])
+        await pipeline.close()
+        assert result.error is None, result.error
+        assert result.chunk_count == len(list(processor.chunk_stream(pages))) and len(index) == result.chunk_count
+
+    logger.info("Streaming PDF extraction test PASSED.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(main_test_pdf_stream())
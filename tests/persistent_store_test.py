@@ -0,0 +1,141 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import numpy as np
+from src.memory.persistent_store import PersistentVectorStore
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+async def main_test_persistent_store():
+    rng = np.random.default_rng(0)
+    dim = 16
+
+    with tempfile.TemporaryDirectory() as kb_dir:
+        # 1. Write chunks, sources and a deletion, then close the store
+        store = PersistentVectorStore(kb_dir, dim=dim, search_block_size=4)
+        vectors = rng.normal(size=(10, dim)).astype(np.float32)
+        ids = store.add(vectors, [f"chunk {i}" for i in range(10)], metadatas=[{"source": "a.txt"}] * 10)
+        store.add_source("a.txt", chunk_count=10)
+        assert ids == list(range(10))
+        assert store.delete([3, 3, 42]) == 1, "Only live, known ids should be deleted."
+        store.close()
+
+        # 2. Reopening restores everything without re-embedding
+        store = PersistentVectorStore(kb_dir, dim=dim, search_block_size=4)
+        assert len(store) == 9 and store.list_sources() == ["a.txt"]
+        results = store.search(vectors[5], top_k=3)
+        assert results[0].id == 5 and results[0].metadata == {"source": "a.txt"}
+        assert all(r.id != 3 for r in store.search(vectors[3], top_k=9)), "Deleted chunks must not be returned."
+        logger.info(f"Reopened store search: {[(r.text, round(r.score, 3)) for r in results]}")
+
+        # 3. A read-only reader in the same directory sees rows committed later by the writer
+        reader = PersistentVectorStore(kb_dir, dim=dim, read_only=True)
+        version, matrix = reader.version, reader._matrix
+        reader.search(vectors[0], top_k=1)
+        assert reader.version == version, "Searching an unchanged store must not change its version."
+        assert reader._matrix is matrix, "Searching an unchanged store must not re-map its rows."
+        store.add(vectors[:1] * -1, ["late chunk"])
+        assert reader.search(-vectors[0], top_k=1)[0].text == "late chunk"
+        assert reader.version != version
+        try:
+            reader.add(vectors[:1], ["nope"])
+            raise AssertionError("Read-only stores must reject writes.")
+        except PermissionError:
+            pass
+        reader.close()
+
+        # 4. Embeddings appended without a committed chunk row are discarded on reopen
+        store.close()
+        with open(os.path.join(kb_dir, PersistentVectorStore.EMBEDDINGS_FILE), "ab") as f:
+            f.write(np.zeros(dim, dtype=np.float32).tobytes())
+        store = PersistentVectorStore(kb_dir, dim=dim)
+        assert len(store) == 10 and store.add(vectors[:1], ["after crash"]) == [11]
+        store.close()
+
+    with tempfile.TemporaryDirectory() as kb_dir:
+        # 5. Two writers on one directory (as the service and a batch ingest would be) take turns
+        first = PersistentVectorStore(kb_dir, dim=dim)
+        second = PersistentVectorStore(kb_dir, dim=dim)
+        assert first.add(vectors[:2], ["x-axis", "y-axis"]) == [0, 1]
+        assert second.add(vectors[2:3], ["z-axis"]) == [2], "A writer must not reuse ids committed by another."
+        assert first.add(vectors[3:4], ["w-axis"]) == [3]
+        assert first.search(vectors[2], top_k=1)[0].text == "z-axis"
+
+        # A writer that appended vectors but failed before committing leaves an orphaned tail
+        with open(os.path.join(kb_dir, PersistentVectorStore.EMBEDDINGS_FILE), "ab") as f:
+            f.write(np.ones((2, dim), dtype=np.float32).tobytes())
+        try:
+            second.add(vectors[4:5], [None]) # NOT NULL constraint fails after the vector was appended
+            raise AssertionError("A chunk without text must be rejected.")
+        except sqlite3.IntegrityError:
+            pass
+        assert first.add(vectors[5:6], ["v-axis"]) == [4], "The failed write must be rolled back."
+        hit = second.search(vectors[5], top_k=1)[0]
+        assert hit.text == "v-axis" and hit.score > 0.99, "Orphaned vectors must be dropped before appending."
+
+        written = []
+
+        def write(store, tag):
+            for i in range(20):
+                written.extend(store.add(rng.normal(size=(3, dim)).astype(np.float32), [f"{tag} {i}"] * 3))
+
+        threads = [threading.Thread(target=write, args=(store, tag)) for store, tag in ((first, "a"), (second, "b"))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(written) == list(range(5, 125)), "Concurrent writers must get distinct, consecutive ids."
+        first.close()
+        second.close()
+        store = PersistentVectorStore(kb_dir, dim=dim)
+        assert len(store) == 125
+        assert all(store.search(store.vectors_for([i])[0], top_k=1)[0].id == i for i in (0, 2, 4, 60, 124))
+        store.close()
+
+    # 6. The dimension comes from the first vectors added, is recorded, and rejects another model's embeddings
+    with tempfile.TemporaryDirectory() as kb_dir:
+        store = PersistentVectorStore(kb_dir)
+        assert store.dim is None and store.search(vectors[0], top_k=1) == []
+        store.add(vectors[:2], ["first", "second"])
+        assert store.dim == dim
+        try:
+            store.add(rng.normal(size=(1, dim * 2)).astype(np.float32), ["wider"])
+            raise AssertionError("Vectors of another dimension must be rejected.")
+        except ValueError:
+            pass
+        store.close()
+        store = PersistentVectorStore(kb_dir)
+        assert store.dim == dim and len(store) == 2
+        store.close()
+        try:
+            PersistentVectorStore(kb_dir, dim=dim * 2)
+            raise AssertionError("Opening with another model's dimension must be rejected.")
+        except ValueError as e:
+            assert str(dim) in str(e)
+
+    # 7. Queries from other threads run on their own connections and never see a write still in progress
+    with tempfile.TemporaryDirectory() as kb_dir:
+        store = PersistentVectorStore(kb_dir, dim=dim)
+        store.add_source("done.txt", 1)
+        seen = []
+        try:
+            with store._lock, store._write_transaction():
+                store._db.execute("INSERT INTO sources (name, chunk_count, added_at) VALUES ('pending.txt', 1, 0)")
+                reader = threading.Thread(target=lambda: seen.append(store.list_sources()))
+                reader.start()
+                reader.join()
+                raise RuntimeError("roll back")
+        except RuntimeError:
+            pass
+        assert seen == [["done.txt"]], seen
+        assert store.list_sources() == ["done.txt"]
+        store.close()
+
+    logger.info("PersistentVectorStore test PASSED.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(main_test_persistent_store())
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import tempfile
+import time
+import numpy as np
+from src.external_services.fake_backends import FakeASRClient
+from src.ingestion.document_parser import TextProcessor
+from src.ingestion.ingestion_cache import IngestionCache
+from src.ingestion.pipeline import IngestionPipeline, SourceFile
+from src.memory.vector_index import VectorIndex
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+class CountingEmbeddingClient:
+    """Deterministic stand-in for EmbeddingClient that records each batch it is given."""
+    model_name = "counting-test-model"
+
+    def __init__(self, dim: int, seconds_per_batch: float = 0.0):
+        self.dim = dim
+        self.seconds_per_batch = seconds_per_batch
+        self.batches = []
+
+    def embed_texts(self, texts):
+        self.batches.append(len(texts))
+        time.sleep(self.seconds_per_batch)
+        rng = np.random.default_rng(len(texts))
+        return rng.normal(size=(len(texts), self.dim)).astype(np.float32)
+
+async def main_test_pipeline():
+    dim = 8
+    with tempfile.TemporaryDirectory() as work_dir:
+        paths = []
+        for i in range(6):
+            path = os.path.join(work_dir, f"note_{i}.txt")
+            with open(path, "w") as f:
+                f.write(f"Note number {i}. " * 150)
+            paths.append(path)
+
+        index = VectorIndex(dim=dim)
+        embedding_client = CountingEmbeddingClient(dim)
+        pipeline = IngestionPipeline(
+            TextProcessor(),
+            embedding_client,
+            index,
+            cache=IngestionCache(os.path.join(work_dir, "cache")),
+            cpu_workers=2,
+            embed_batch_size=64,
+        )
+
+        # 1. Every file is indexed and chunks from several files share embedding batches
+        finished = []
+        results = await pipeline.run(paths, on_result=lambda r: finished.append(r.name))
+        assert [r.name for r in results] == [os.path.basename(p) for p in paths], "Results must keep input order."
+        assert all(r.error is None and r.chunk_count > 0 for r in results)
+        assert sorted(finished) == sorted(r.name for r in results)
+        assert len(index) == sum(r.chunk_count for r in results)
+        assert len(embedding_client.batches) < len(paths), "Embedding requests should be coalesced across files."
+        logger.info(f"Embedding batch sizes: {embedding_client.batches}")
+        logger.info(f"Stage report:\n{pipeline.report()}")
+
+        # 2. Re-ingesting the same content under the same name hits the cache and replaces old chunks
+        calls_before = len(embedding_client.batches)
+        cpu_pool = pipeline.pools.cpu_pool
+        results = await pipeline.run([SourceFile(path=paths[0])])
+        assert len(embedding_client.batches) == calls_before, "Cached embeddings should be reused."
+        assert pipeline.pools.cpu_pool is cpu_pool, "Later runs should reuse the worker processes."
+        assert len(index.ids_for_source("note_0.txt")) == results[0].chunk_count
+
+        # 3. Failures are reported per file without stopping the run
+        results = await pipeline.run([os.path.join(work_dir, "missing.txt")])
+        assert results[0].error is not None
+
+        # The pools are shut down off the event loop, which keeps running while a busy worker finishes
+        pipeline.pools.cpu_pool.submit(time.sleep, 0.5)
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        await pipeline.close()
+        ticker.cancel()
+        assert ticks > 10 and pipeline.pools.cpu_pool is None, ticks
+
+        # 4. A cached transcript (whole-file ASR) is only reused by the ASR model that produced it
+        recording = os.path.join(work_dir, "meeting.wav")
+        with open(recording, "wb") as f:
+            f.write(np.random.default_rng(0).integers(-3000, 3000, size=16000 * 40, dtype=np.int16).tobytes())
+        texts = {}
+        for model_name in ("whisper-a", "whisper-b", "whisper-a"):
+            index = VectorIndex(dim=dim)
+            audio_pipeline = IngestionPipeline(
+                TextProcessor(), embedding_client, index, asr_client=FakeASRClient(model_name=model_name),
+                cache=IngestionCache(os.path.join(work_dir, "cache")), cpu_workers=1, segmented_asr=False,
+            )
+            [result] = await audio_pipeline.run([recording])
+            await audio_pipeline.close()
+            assert result.error is None
+            chunk_texts = [index.get(chunk_id) for chunk_id in result.chunk_ids]
+            assert texts.setdefault(model_name, chunk_texts) == chunk_texts
+        assert texts["whisper-a"] != texts["whisper-b"], "Another ASR model must not get the first model's transcript."
+
+        # 5. A run that finishes first does not close the embedding batcher of one still going
+        index = VectorIndex(dim=dim)
+        shared = IngestionPipeline(
+            TextProcessor(), CountingEmbeddingClient(dim, seconds_per_batch=0.02), index, cpu_workers=1, embed_batch_size=4,
+        )
+        long_run = shared.run([SourceFile(path=path, name=f"long_{i}.txt") for i, path in enumerate(paths)])
+        short_run = shared.run([SourceFile(path=paths[0], name="short.txt")])
+        long, short = await asyncio.wait_for(asyncio.gather(long_run, short_run), timeout=60)
+        assert all(r.error is None and r.chunk_count > 0 for r in short + long)
+        assert len(index) == sum(r.chunk_count for r in short + long)
+        await shared.close()
+
+    logger.info("IngestionPipeline test PASSED.")
+
+if __name__ == "__main__":
+    asyncio.run(main_test_pipeline())
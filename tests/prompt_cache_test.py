@@ -0,0 +1,117 @@
+from dataclasses import dataclass
+import numpy as np
+from src.external_services import llm_client as llm_module
+from src.external_services.llm_client import GenerationStats, LLMClient
+from src.external_services.prompt_cache import PromptPrefixCache
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+# --- Fake KV cache and MLX functions: one "layer" whose offset counts processed tokens ---
+class FakeLayerCache:
+    def __init__(self):
+        self.offset = 0
+
+    @property
+    def state(self):
+        return [np.zeros(self.offset * 16, dtype=np.float32)]
+
+def fake_make_prompt_cache(model):
+    return [FakeLayerCache()]
+
+def fake_trim_prompt_cache(kv_cache, n):
+    for layer in kv_cache:
+        layer.offset -= n
+    return n
+
+def fake_can_trim_prompt_cache(kv_cache):
+    return True
+
+@dataclass
+class FakeResponse:
+    text: str
+    prompt_tokens: int
+    generation_tokens: int
+
+class FakeTokenizer:
+    def __init__(self):
+        self.vocab = {}
+
+    def apply_chat_template(self, messages, tokenize=False, add_generation_prompt=True):
+        words = " ".join(m["content"] for m in messages).split()
+        return [self.vocab.setdefault(word, len(self.vocab)) for word in words]
+
+def fake_stream_generate(model, tokenizer, prompt, max_tokens=512, prompt_cache=None, **kwargs):
+    # Prefill only the tokens it is given, then decode, extending the cache like mlx_lm does
+    prompt_cache[0].offset += len(prompt)
+    for i in range(max_tokens):
+        prompt_cache[0].offset += 1
+        yield FakeResponse(text=f"t{i} ", prompt_tokens=len(prompt), generation_tokens=i + 1)
+
+def make_cache(max_bytes=10_000):
+    return PromptPrefixCache(
+        max_bytes=max_bytes,
+        trim=fake_trim_prompt_cache,
+        can_trim=fake_can_trim_prompt_cache,
+        cache_length=lambda kv: kv[0].offset,
+        cache_nbytes=lambda kv: kv[0].offset * 64,
+        min_prefix_tokens=4,
+    )
+
+def filled(n_tokens):
+    kv = fake_make_prompt_cache(None)
+    kv[0].offset = n_tokens
+    return kv
+
+async def main_test_prompt_cache():
+    # 1. The longest shared prefix is reused and trimmed back to the divergence point
+    cache = make_cache()
+    system = list(range(10))
+    cache.store(system + [100, 101], filled(12))
+    kv, reused = cache.fetch(system + [200, 201, 202])
+    assert reused == 10 and kv[0].offset == 10, (reused, kv[0].offset)
+    assert len(cache) == 0, "A fetched entry is handed out exclusively."
+
+    # 2. Generated tokens are trimmed on store; an identical prompt leaves one token to process
+    cache.store(system + [200], filled(15))
+    kv, reused = cache.fetch(system + [200])
+    assert reused == 10 and kv[0].offset == 10
+
+    # 3. Short or unrelated prompts miss, and the memory cap evicts least recently used entries
+    assert cache.fetch([999, 998, 997, 996, 995]) == (None, 0)
+    small = make_cache(max_bytes=64 * 25)
+    small.store(list(range(10)), filled(10))
+    small.store(list(range(50, 60)), filled(10))
+    small.store(list(range(80, 90)), filled(10))
+    assert len(small) == 2 and small.fetch(list(range(12)))[0] is None, "Oldest entry should be evicted."
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1 and stats["saved_prefill_tokens"] == 20
+    logger.info(f"PromptPrefixCache stats: {stats}")
+
+    # 4. LLMClient skips prefill of the shared system prompt and context on the second turn
+    llm_module.load = lambda model_path: (object(), FakeTokenizer())
+    llm_module.stream_generate = fake_stream_generate
+    llm_module.make_prompt_cache = fake_make_prompt_cache
+    llm_module.trim_prompt_cache = fake_trim_prompt_cache
+    llm_module.can_trim_prompt_cache = fake_can_trim_prompt_cache
+    client = LLMClient(model_path="fake/model", prompt_cache_bytes=1_000_000)
+    system_prompt = " ".join(f"rule{i}" for i in range(40))
+    context = " ".join(f"fact{i}" for i in range(60))
+
+    first = GenerationStats()
+    await client.generate_text(f"{context} first question?", system_prompt=system_prompt, max_tokens=3)
+    async for _ in client.stream_text(f"{context} first question?", system_prompt=system_prompt, max_tokens=3, stats=first):
+        pass
+    second = GenerationStats()
+    async for _ in client.stream_text(f"{context} another question?", system_prompt=system_prompt, max_tokens=3, stats=second):
+        pass
+    assert second.cached_prompt_tokens == 100 and second.prompt_tokens == 102, second
+    assert client.prompt_cache_stats()["hit_rate"] > 0.5
+    logger.info(f"LLMClient prompt cache stats: {client.prompt_cache_stats()}")
+
+    logger.info("Prompt prefix cache test PASSED.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(main_test_prompt_cache())
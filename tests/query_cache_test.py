@@ -0,0 +1,48 @@
+import tempfile
+import numpy as np
+from src.external_services.query_cache import QueryEmbeddingCache
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+async def main_test_query_cache():
+    rng = np.random.default_rng(0)
+    first, second, third = (rng.normal(size=8).astype(np.float32) for _ in range(3))
+
+    # 1. Hits ignore case and spacing, but not the model
+    cache = QueryEmbeddingCache(max_entries=2, directory="")
+    assert cache.get("model-a", "What is MLX?") is None
+    cache.put("model-a", "What is MLX?", first)
+    assert np.array_equal(cache.get("model-a", "  what is   mlx? "), first)
+    assert cache.get("model-b", "What is MLX?") is None
+
+    # 2. Returned arrays are copies, so callers cannot corrupt the cache
+    cache.get("model-a", "What is MLX?")[0] = 100.0
+    assert np.array_equal(cache.get("model-a", "What is MLX?"), first)
+
+    # 3. Least recently used entries are evicted
+    cache.put("model-a", "second question", second)
+    cache.get("model-a", "What is MLX?")
+    cache.put("model-a", "third question", third)
+    assert len(cache) == 2 and cache.get("model-a", "second question") is None
+    stats = cache.stats()
+    assert stats["memory_hits"] == 4 and stats["misses"] == 3 and stats["disk_hits"] == 0
+
+    # 4. The disk tier survives a restart and refills the memory tier
+    with tempfile.TemporaryDirectory() as cache_dir:
+        QueryEmbeddingCache(max_entries=2, directory=cache_dir).put("model-a", "persisted", second)
+        restarted = QueryEmbeddingCache(max_entries=2, directory=cache_dir)
+        assert np.array_equal(restarted.get("model-a", "Persisted"), second)
+        assert np.array_equal(restarted.get("model-a", "persisted"), second)
+        assert restarted.stats()["disk_hits"] == 1 and restarted.stats()["memory_hits"] == 1
+
+        # A memory-less cache still serves from disk
+        disk_only = QueryEmbeddingCache(max_entries=0, directory=cache_dir)
+        assert np.array_equal(disk_only.get("model-a", "persisted"), second) and len(disk_only) == 0
+
+    logger.info("Query embedding cache test PASSED.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(main_test_query_cache())
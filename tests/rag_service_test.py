@@ -0,0 +1,152 @@
+import sqlite3
+import tempfile
+import threading
+import time
+from src.external_services.fake_backends import FakeASRClient, FakeEmbeddingClient, FakeLLMClient, FakeTTSClient
+from src.external_services.model_pool import ModelWarmPool
+from src.ingestion.document_parser import TextProcessor
+from src.ingestion.ingestion_cache import IngestionCache
+from src.interaction.api_client import RAGServiceClient, ServiceError
+from src.interaction.api_server import serve_in_background
+from src.interaction.rag_service import NO_CONTEXT_ANSWER, RAGService, Upload
+from src.memory.persistent_store import PersistentVectorStore
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+MANUAL = (
+    "The pump seal must be replaced every six months. Inspect the valve for leaks before each shift. "
+    "Record the pressure gauge reading in the maintenance report. "
+) * 20
+
+class FlakyStore(PersistentVectorStore):
+    """Fails to record sources named 'locked.txt', as a store held by a long batch ingest might, and notes the calling threads."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.recording_threads = []
+
+    def add_source(self, name, chunk_count, content_hash=None):
+        self.recording_threads.append(threading.current_thread())
+        if name == "locked.txt":
+            raise sqlite3.OperationalError("database is locked")
+        super().add_source(name, chunk_count, content_hash=content_hash)
+
+def fake_model_pool() -> ModelWarmPool:
+    pool = ModelWarmPool(warm_up=False)
+    pool.register("embedding", FakeEmbeddingClient, eager=True)
+    pool.register("llm", lambda: FakeLLMClient(response_tokens=20, token_seconds=0.03), eager=True)
+    pool.register("asr", FakeASRClient)
+    pool.register("tts", FakeTTSClient)
+    pool.start()
+    return pool
+
+async def main_test_rag_service():
+    with tempfile.TemporaryDirectory() as work_dir:
+        service = RAGService(
+            model_pool=fake_model_pool(),
+            text_processor=TextProcessor(),
+            ingestion_cache=IngestionCache(work_dir + "/cache"),
+            persist=False,
+            max_concurrent_chats=1,
+            max_queued_requests=1,
+            upload_dir=work_dir + "/uploads",
+        )
+        server = serve_in_background(service, host="127.0.0.1", port=0)
+        client = RAGServiceClient(f"http://127.0.0.1:{server.port}")
+        assert client.is_available()
+        assert not RAGServiceClient("http://127.0.0.1:1").is_available()
+
+        # 1. Ingest streams one event per file; content already ingested is skipped whatever its name
+        events = list(client.ingest([("manual.txt", MANUAL.encode()), ("copy.txt", MANUAL.encode())], session_id="alice"))
+        by_type = {event["type"]: event for event in events}
+        assert by_type["processed"]["name"] == "manual.txt" and by_type["processed"]["chunk_count"] > 0
+        assert by_type["skipped"] == {"type": "skipped", "name": "copy.txt", "duplicate_of": "manual.txt"}
+        assert events[-1]["type"] == "done"
+        # Without a persistent knowledge base, each session has its own documents
+        assert client.sources("alice") == ["manual.txt"] and client.sources("bob") == []
+
+        # 2. Search returns cited chunks
+        results = client.search("How often is the pump seal replaced?", session_id="alice", top_k=2)
+        assert 0 < len(results) <= 2 and results[0]["citation"] == "manual.txt" and "pump seal" in results[0]["text"]
+
+        # 3. Chat streams sources, then deltas, then stats; asking again is answered from the cache
+        events = list(client.chat("How often is the pump seal replaced?", session_id="alice"))
+        assert events[0] == {"type": "sources", "sources": ["manual.txt"]} and events[-1]["type"] == "done"
+        deltas = [event["text"] for event in events if event["type"] == "delta"]
+        assert len(deltas) == 20 and events[-1]["stats"]["generation_tokens"] == 20
+        events = list(client.chat("How often is the pump seal replaced?", session_id="alice"))
+        assert events[1]["text"] == "".join(deltas) and events[-1]["cached"]["similarity"] == 1.0
+        assert [e["text"] for e in client.chat("Any pump news?", session_id="bob") if e["type"] == "delta"] == [NO_CONTEXT_ANSWER]
+
+        # 4. Backpressure: one chat runs, one waits, and the next is turned away with 503 before any work
+        answers = []
+
+        def ask(question):
+            answers.append("".join(e.get("text", "") for e in client.chat(question, session_id="alice")))
+
+        threads = [threading.Thread(target=ask, args=(f"What does the maintenance report record, part {i}?",)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.2)
+        assert client.status()["queues"]["chat"] == {"active": 1, "waiting": 1, "rejected": 0}
+        try:
+            list(client.chat("Is the valve inspected?", session_id="alice"))
+            raise AssertionError("A chat beyond the queue limit must be rejected.")
+        except ServiceError as e:
+            assert e.busy and e.retry_after == 1
+        for thread in threads:
+            thread.join()
+        assert len(answers) == 2 and all(answers)
+        status = client.status()
+        assert status["queues"]["chat"]["rejected"] == 1 and status["llm_scheduler"]["completed_requests"] == 3
+
+        # 5. Speech, model status and malformed requests
+        assert client.speak("Replace the pump seal.")[:4] == b"RIFF"
+        assert {m["name"]: m["state"] for m in client.status()["models"]}["tts"] == "ready"
+        try:
+            list(client._events("/chat", {"session_id": "alice"}))
+            raise AssertionError("A chat without a question must be rejected.")
+        except ServiceError as e:
+            assert e.status == 400 and "question" in str(e)
+
+        # 6. A generation that runs past LLM_TIMEOUT_SECONDS ends with a retryable error event
+        timeout = settings.LLM_TIMEOUT_SECONDS
+        settings.LLM_TIMEOUT_SECONDS = 0.1
+        try:
+            events = list(client.chat("Where is the gauge reading recorded?", session_id="alice"))
+        finally:
+            settings.LLM_TIMEOUT_SECONDS = timeout
+        assert events[-1]["type"] == "error" and events[-1]["busy"], events[-1]
+        # The slot is freed at the scheduler's next decode step
+        deadline = time.perf_counter() + 1.0
+        while client.status()["llm_scheduler"]["active"] and time.perf_counter() < deadline:
+            time.sleep(0.02)
+        assert client.status()["llm_scheduler"]["active"] == 0, "A timed-out generation must give up its batch slot."
+        service.close()
+
+        # 7. Sources are recorded off the event loop; one that cannot be recorded fails alone, and uploads share pools
+        store = FlakyStore(work_dir + "/kb")
+        service = RAGService(
+            model_pool=fake_model_pool(),
+            text_processor=TextProcessor(),
+            knowledge_base=store,
+            ingestion_cache=IngestionCache(work_dir + "/cache"),
+            upload_dir=work_dir + "/uploads",
+        )
+        uploads = [Upload("locked.txt", MANUAL.encode()), Upload("notes.txt", MANUAL.upper().encode())]
+        events = {event.get("name"): event for event in [e async for e in service.ingest(uploads)]}
+        assert events["locked.txt"]["type"] == "failed" and "database is locked" in events["locked.txt"]["error"]
+        assert events["notes.txt"]["type"] == "processed" and events[None]["type"] == "done"
+        assert store.list_sources() == ["notes.txt"]
+        assert threading.main_thread() not in store.recording_threads
+        cpu_pool = service._ingestion_pools.cpu_pool
+        [e async for e in service.ingest([Upload("more.txt", MANUAL.lower().encode())])]
+        assert service._ingestion_pools.cpu_pool is cpu_pool, "Uploads should share the ingestion pools."
+        service.close()
+
+    logger.info("RAG service test PASSED.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(main_test_rag_service())
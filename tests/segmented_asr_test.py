@@ -0,0 +1,171 @@
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from src.external_services.model_executor import ModelTimeoutError
+from src.external_services.segmented_asr import SAMPLE_RATE, SegmentedTranscriber, split_on_silence
+from src.ingestion.document_parser import TextProcessor
+from src.ingestion.pipeline import IngestionPipeline
+from src.memory.vector_index import VectorIndex
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+WORDS = "pump valve seal gauge motor bearing shaft filter inlet outlet housing flange".split()
+
+def make_recording(burst_seconds, pause_seconds=1.0):
+    """Tone bursts separated by silence; burst i is at (200 + 100 * i) Hz so a fake ASR can tell them apart."""
+    parts = [np.zeros(int(pause_seconds * SAMPLE_RATE))]
+    for i, seconds in enumerate(burst_seconds):
+        t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        parts.append((0.3 * np.sin(2 * np.pi * (200 + 100 * i) * t) * 32767).astype(np.int16))
+        parts.append(np.zeros(int(pause_seconds * SAMPLE_RATE)))
+    return np.concatenate(parts).astype(np.int16)
+
+class FakeWhisper:
+    """Names the loudest tones in a window, one word per tone; optionally fails once on a chosen call."""
+
+    def __init__(self, delay=0.0, fail_on_call=None):
+        self.delay = delay
+        self.fail_on_call = fail_on_call
+        self.calls = 0
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio, language):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(self.delay)
+            if call == self.fail_on_call:
+                raise RuntimeError("Simulated crash mid-transcription.")
+            spectrum = np.abs(np.fft.rfft(audio))
+            frequencies = np.fft.rfftfreq(len(audio), 1 / SAMPLE_RATE)
+            tones = sorted({int(round((f - 200) / 100)) for f in frequencies[spectrum > spectrum.max() * 0.5]})
+            return {"text": " ".join(WORDS[i % len(WORDS)] for i in tones if i >= 0) + "."}
+        finally:
+            with self._lock:
+                self.running -= 1
+
+class FakeASRClient:
+    model_name = "fake-whisper"
+    quant = None
+
+    def __init__(self, audio, checkpoint_dir):
+        self.whisper = FakeWhisper(delay=0.05)
+        self.audio = audio
+        self.checkpoint_dir = checkpoint_dir
+
+    async def transcribe_stream(self, audio_file_path, language, executor=None, content_hash=None):
+        transcriber = SegmentedTranscriber(self.whisper.transcribe, workers=2, checkpoint_dir=self.checkpoint_dir,
+                                           max_seconds=5, audio_loader=lambda path: self.audio)
+        async for segment in transcriber.stream(audio_file_path, language, executor=executor, checkpoint_key=content_hash):
+            yield segment
+
+class CountingEmbeddingClient:
+    model_name = "counting-test-model"
+
+    def __init__(self, dim):
+        self.dim = dim
+
+    def embed_texts(self, texts):
+        return np.random.default_rng(len(texts)).normal(size=(len(texts), self.dim)).astype(np.float32)
+
+async def collect(transcriber, path="meeting.wav", key="meeting-hash", executor=None):
+    return [segment async for segment in transcriber.stream(path, "en", executor=executor, checkpoint_key=key)]
+
+async def main_test_segmented_asr():
+    bursts = [2, 3, 1.5, 4, 2, 12, 2.5, 3]
+    audio = make_recording(bursts)
+
+    # 1. Windows are cut in pauses, never exceed the limit, and a long burst without pauses is hard-cut
+    windows = split_on_silence(audio, max_seconds=5, min_silence_seconds=0.5, silence_db=-40)
+    assert all(w.end - w.start <= 5.0 + 1e-6 for w in windows)
+    assert [w.index for w in windows] == list(range(len(windows)))
+    assert all(a.end <= b.start for a, b in zip(windows, windows[1:]))
+    burst_starts = np.cumsum([1.0] + [b + 1.0 for b in bursts[:-1]])
+    for start, seconds in zip(burst_starts, bursts):
+        if seconds < 5:
+            assert any(w.start <= start and start + seconds <= w.end for w in windows), f"Burst at {start}s was split."
+    assert windows[0].start > 0 or windows[0].end <= 5, "Leading silence belongs to the first window at most."
+    assert not split_on_silence(np.zeros(SAMPLE_RATE * 3, dtype=np.int16)), "Silence alone needs no transcription."
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        checkpoint_dir = os.path.join(work_dir, "checkpoints")
+
+        # 2. Segments are transcribed concurrently within the bound and yielded in time order
+        whisper = FakeWhisper(delay=0.02)
+        transcriber = SegmentedTranscriber(whisper.transcribe, workers=3, checkpoint_dir="", max_seconds=5,
+                                           audio_loader=lambda path: audio)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            segments = await collect(transcriber, executor=executor)
+        assert [s.index for s in segments] == list(range(len(windows)))
+        assert [(s.start, s.end) for s in segments] == [(w.start, w.end) for w in windows]
+        assert 1 < whisper.max_running <= 3, f"Ran {whisper.max_running} segments at once."
+        full_text = " ".join(s.text for s in segments)
+        assert all(WORDS[i] in full_text for i in range(len(bursts)))
+
+        # 3. The first partial transcript arrives before the rest of the file is transcribed
+        whisper = FakeWhisper(delay=0.02)
+        transcriber = SegmentedTranscriber(whisper.transcribe, workers=2, checkpoint_dir="", max_seconds=5,
+                                           audio_loader=lambda path: audio)
+        stream = transcriber.stream("meeting.wav", "en")
+        first = await anext(stream)
+        assert first.index == 0 and whisper.calls < len(windows)
+        await stream.aclose()
+
+        # A window that hangs past the timeout fails the transcription instead of stalling it
+        transcriber = SegmentedTranscriber(FakeWhisper(delay=1.0).transcribe, workers=2, checkpoint_dir="", max_seconds=5,
+                                           audio_loader=lambda path: audio, timeout=0.1)
+        start = time.perf_counter()
+        try:
+            await collect(transcriber)
+            raise AssertionError("The hung window should time out.")
+        except ModelTimeoutError:
+            assert time.perf_counter() - start < 0.5
+
+        # 4. A crash keeps finished segments; the next run transcribes only the rest, then drops the checkpoint
+        crashing = FakeWhisper(fail_on_call=5)
+        transcriber = SegmentedTranscriber(crashing.transcribe, workers=1, checkpoint_dir=checkpoint_dir, max_seconds=5,
+                                           audio_loader=lambda path: audio)
+        try:
+            await collect(transcriber)
+            raise AssertionError("The simulated crash should propagate.")
+        except RuntimeError as e:
+            assert "Simulated crash" in str(e)
+        assert len(transcriber.checkpoint_for("meeting-hash").load()) == 4
+        resumed = FakeWhisper()
+        transcriber.transcribe_fn = resumed.transcribe
+        segments_after_resume = await collect(transcriber)
+        assert resumed.calls == len(windows) - 4
+        assert [s.text for s in segments_after_resume] == [s.text for s in segments]
+        assert not os.listdir(checkpoint_dir), "A completed transcription leaves no checkpoint behind."
+
+        # 5. The pipeline chunks and embeds audio from the streamed segments
+        path = os.path.join(work_dir, "meeting.wav")
+        with open(path, "wb") as f:
+            f.write(audio.tobytes())
+        asr_client = FakeASRClient(make_recording([3] * 12), checkpoint_dir)
+        index = VectorIndex(dim=8)
+        pipeline = IngestionPipeline(TextProcessor(chunk_size=60, chunk_overlap=10), CountingEmbeddingClient(8), index,
+                                     asr_client=asr_client, cpu_workers=1, asr_workers=1, segmented_asr=True, deduplicate=False)
+        [result] = await pipeline.run([path])
+        await pipeline.close()
+        assert result.error is None and result.chunk_count > 1 and len(index) == result.chunk_count
+        assert asr_client.whisper.calls == 12
+        assert asr_client.whisper.max_running == 2, "Windows of one recording should be transcribed two at a time."
+        assert pipeline.stats["transcribe"].items == 1
+        logger.info(f"Stage report:\n{pipeline.report()}")
+
+    logger.info("Segmented ASR test PASSED.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(main_test_segmented_asr())
@@ -0,0 +1,73 @@
+import tempfile
+import numpy as np
+from src.ingestion.chunker import TextSegment
+from src.ingestion.document_parser import TextProcessor
+from src.ingestion.token_length import TokenCounter, chunk_token_budget, truncation_report
+from src.memory.persistent_store import PersistentVectorStore
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+class FakeTokenizer:
+    """Word-piece-like tokenizer: every word is split into pieces of at most 4 characters."""
+    name_or_path = "fake-wordpiece"
+
+    def __init__(self):
+        self.calls = 0
+
+    def _ids(self, text):
+        return [0 for word in text.split() for _ in range(0, len(word), 4)]
+
+    def __call__(self, text, add_special_tokens=True):
+        self.calls += 1
+        if isinstance(text, str):
+            return {"input_ids": self._ids(text)}
+        return {"input_ids": [self._ids(t) for t in text]}
+
+async def main_test_token_chunking():
+    tokenizer = FakeTokenizer()
+    counter = TokenCounter(tokenizer)
+    budget = chunk_token_budget(max_seq_length=64)  # 62 tokens of text per chunk
+    processor = TextProcessor(chunk_size=budget, chunk_overlap=8, token_counter=counter)
+    pages = [
+        TextSegment(" ".join(f"Page {p} mentions internationalization and tokenization {i}." for i in range(30)) + "\n\n", p)
+        for p in range(1, 11)
+    ]
+    full_text = "".join(page.text for page in pages)
+
+    # 1. Every chunk fits the model's token budget, offsets still match the source text
+    chunks = list(processor.iter_chunks(pages, source_id="tokens.pdf"))
+    assert chunks and processor.length_unit == "tokens:fake-wordpiece"
+    for chunk in chunks:
+        assert counter(chunk.text) <= budget, f"Chunk {chunk.index} has {counter(chunk.text)} tokens."
+        assert full_text[chunk.start:chunk.end] == chunk.text
+    assert all(counter(c) <= budget for c in processor.chunk_text(full_text))
+
+    # 2. Lengths of repeated pieces are served from the cache
+    calls_before = tokenizer.calls
+    list(processor.iter_chunks(pages))
+    assert tokenizer.calls - calls_before < counter.count.cache_info().hits
+
+    # 3. Character-sized chunks of the same text overflow the budget; the report measures the loss
+    char_chunks = TextProcessor(chunk_size=1000, chunk_overlap=200).chunk_text(full_text)
+    report = truncation_report(char_chunks, counter, budget=budget, batch_size=4)
+    counts = [counter(c) for c in char_chunks]
+    assert report.chunks == len(char_chunks) and report.total_tokens == sum(counts)
+    assert report.truncated_chunks == sum(c > budget for c in counts) > 0
+    assert report.lost_tokens == sum(max(0, c - budget) for c in counts)
+    assert truncation_report((c.text for c in chunks), counter, budget=budget).lost_tokens == 0
+
+    # 4. The report can be run over the texts of a persisted knowledge base
+    with tempfile.TemporaryDirectory() as kb_dir:
+        store = PersistentVectorStore(kb_dir, dim=4)
+        ids = store.add([np.ones(4, dtype=np.float32)] * len(char_chunks), char_chunks)
+        store.delete(ids[:1])
+        assert list(store.iter_texts(batch_size=3)) == char_chunks[1:]
+        store.close()
+
+    logger.info("Token-aware chunking test PASSED.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(main_test_token_chunking())
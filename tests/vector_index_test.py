@@ -0,0 +1,61 @@
+import numpy as np
+from src.memory.vector_index import VectorIndex, dequantize, quantize
+from src.config import settings
+from src.utils.logger_config import setup_logger
+
+logger = setup_logger(__name__, level=settings.LOG_LEVEL.upper() if hasattr(settings, 'LOG_LEVEL') else 'INFO')
+
+async def main_test_vector_index():
+    rng = np.random.default_rng(0)
+    dim = 16
+
+    # 1. Adding vectors grows the index past its initial capacity
+    index = VectorIndex(dim=dim, initial_capacity=2)
+    vectors = rng.normal(size=(10, dim)).astype(np.float32)
+    texts = [f"chunk {i}" for i in range(10)]
+    ids = index.add(vectors, texts)
+    assert ids == list(range(10)), "Ids should be assigned sequentially."
+    assert len(index) == 10 and index.capacity == 16, "Index should double its capacity."
+    logger.info(f"Added {len(index)} vectors (capacity {index.capacity}).")
+
+    # 2. Search matches a brute-force cosine similarity ranking
+    query = rng.normal(size=dim)
+    expected = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+    results = index.search(query, top_k=3)
+    assert [r.id for r in results] == list(np.argsort(expected)[-3:][::-1]), "Top-k ranking is incorrect!"
+    assert np.isclose(results[0].score, expected.max(), atol=1e-5), "Scores should be cosine similarities."
+    logger.info(f"Top-3 results: {[(r.text, round(r.score, 3)) for r in results]}")
+
+    # 3. Deleting removes entries and keeps the remaining ones searchable
+    top_id = results[0].id
+    assert index.delete([top_id, 999]) == 1, "Only known ids should be removed."
+    assert len(index) == 9 and index.get(top_id) is None
+    assert top_id not in [r.id for r in index.search(query, top_k=9)], "Deleted ids must not be returned."
+    assert len(index.search(query, top_k=50)) == 9, "top_k larger than the index should return every entry."
+
+    # 4. float16/int8 storage cuts memory and keeps the ranking of clearly separated results
+    normalized = VectorIndex._normalize(vectors)
+    assert np.abs(dequantize(quantize(normalized, "int8")) - normalized).max() <= 0.5 / 127 + 1e-6
+    for precision, ratio in (("float16", 2), ("int8", 4)):
+        compact = VectorIndex(dim=dim, precision=precision, score_block_size=3)
+        compact.add(vectors, texts)
+        assert compact.memory_bytes * ratio == len(compact) * dim * 4
+        compact_results = compact.search(query, top_k=3)
+        assert compact_results[0].id == results[0].id, f"{precision} changed the best match."
+        assert abs(compact_results[0].score - results[0].score) < 0.02
+    with np.testing.assert_raises(ValueError):
+        VectorIndex(dim=dim, precision="int4")
+
+    # Without a dimension, the index is sized by the first vectors added
+    lazy = VectorIndex(initial_capacity=2)
+    assert lazy.search(query, top_k=3) == [] and lazy.memory_bytes == 0
+    lazy.add(vectors, texts)
+    assert lazy.dim == dim and lazy.search(query, top_k=1)[0].id == results[0].id
+    with np.testing.assert_raises(ValueError):
+        lazy.add(rng.normal(size=(1, dim + 1)), ["wrong size"])
+
+    logger.info("VectorIndex test PASSED.")
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(main_test_vector_index())